@@ -2,19 +2,48 @@ import os
 import json
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_file, has_request_context, stream_with_context
 from datetime import datetime, timedelta
 from functools import wraps
+from contextlib import contextmanager
 import io
-import requests
-import threading
+import re
+import tempfile
+import base64
 import time
-from apscheduler.schedulers.background import BackgroundScheduler
+import threading
 import atexit
+import hmac
+import hashlib
+import uuid
 import shutil
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from assets import init_assets
+from css_bundles import init_css_bundles
+from vendor_assets import init_vendor_assets
+from compression import CompressionMiddleware
+from fragments import init_fragments
+import template_cache
+import metrics
+from metrics import init_metrics
+import serialization
+import models
+import archive
+import content
+import sandbox
+import sitemaps
+import jobs
+import tenancy
+import invalidation
+import export
+import transfer
+import replication
+import journal
+import visitors
+import profiling
+from profiling import init_profiling
 
 # Create the Flask app
 app = Flask(__name__)
@@ -29,15 +58,179 @@ app.config['JSON_AS_ASCII'] = False
 app.config['SESSION_COOKIE_SECURE'] = True  # Use HTTPS in production
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+app.config['ASSET_FINGERPRINTING'] = os.environ.get('ASSET_FINGERPRINTING', 'true').lower() != 'false'
+app.config['CSS_BUNDLES'] = os.environ.get('CSS_BUNDLES', 'true').lower() != 'false'
+app.config['VENDOR_ASSETS'] = os.environ.get('VENDOR_ASSETS', 'true').lower() != 'false'
+app.config['FRAGMENT_CACHE'] = os.environ.get('FRAGMENT_CACHE', 'true').lower() != 'false'
+
+# Fingerprinted static URLs with long-lived caching
+init_assets(app)
+# Per-theme CSS bundles with inlined critical CSS
+init_css_bundles(app)
+# Self-hosted Bootstrap, Font Awesome and Poppins when vendored
+init_vendor_assets(app)
+# {% cache %} blocks for the project and skill lists
+init_fragments(app)
+# Compiled templates shared by all workers
+template_cache.init_template_cache(app)
+
+# Compress HTML, XML, JSON, CSS and JS responses
+if os.environ.get('COMPRESSION', 'true').lower() != 'false':
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app,
+        min_size=int(os.environ.get('COMPRESSION_MIN_SIZE', 500)),
+        level=int(os.environ.get('COMPRESSION_LEVEL', 6)),
+        cache_max_bytes=int(os.environ.get('COMPRESSION_CACHE_MB', 32)) * 1024 * 1024)
+
+# Tenant routing by host or path prefix (TENANT_ROUTING); outermost so the
+# app only ever sees a tenant's own paths
+tenancy.init_tenancy(app)
+
+# Per-endpoint request counts and latency histograms for /metrics
+init_metrics(app)
+# Opt-in cProfile capture of selected requests (PROFILING_ENABLED)
+init_profiling(app)
+# Background jobs (notifications, logging, message journal, backups, PDFs) run in the app context
+jobs.init_jobs(app)
+# Other workers' (and hosts') saves invalidate this worker's caches
+invalidation.init_invalidation(app)
+if replication.BACKUP_S3_BUCKET and not replication.enabled():
+    app.logger.warning("BACKUP_S3_BUCKET is set but boto3 is not installed; backups stay local only")
+
+# Cron jobs for backups and archiving; created by start_scheduler() in one
+# process only (the gunicorn arbiter, see gunicorn.conf.py)
+SCHEDULER = [None]
+SCHEDULER_PID = [None]
+RUNTIME_READY = set()  # tenants whose folders exist, checked once per process
+
+
+def data_file():
+    """data.json of the current tenant"""
+    return tenancy.tenant_path('data.json')
+
+
+def data_version():
+    """Version of the current tenant's data.json for cache keys, or None if missing
+
+    The invalidation bus version catches saves by any worker or host; the
+    file's mtime and size also catch edits made outside the app.
+    """
+    try:
+        stat = os.stat(data_file())
+    except OSError:
+        return None
+    return (invalidation.version(tenancy.tenant_key('data')), stat.st_mtime_ns, stat.st_size)
+
+
+def publish_change(name):
+    """Tell every worker that the current tenant's 'data' or 'config' changed"""
+    try:
+        invalidation.publish(tenancy.tenant_key(name))
+    except Exception as e:
+        app.logger.error(f"Error publishing invalidation: {str(e)}")
+
+
+@invalidation.subscribe
+def drop_stale_entries(key, version):
+    """Free a tenant's cached records and pages as soon as it changes anywhere"""
+    # Fragments and processed content are versioned by what they show, so
+    # they outlive changes to anything else
+    tenancy.CACHE.drop_tenant(tenancy.key_tenant(key), keep=('fragment', 'content'))
+
+
+# Backups kept in backups/ (and offsite ones listed) per tenant
+MAX_BACKUPS = 20
+
+
+def backup_dir():
+    return tenancy.tenant_path('backups')
+
+
+def upload_folder():
+    """Upload folder of the current tenant; tenants get a subfolder of static/"""
+    tenant = tenancy.current_tenant()
+    return os.path.join(app.config['UPLOAD_FOLDER'], tenant) if tenant else app.config['UPLOAD_FOLDER']
+
+
+def save_upload(file, filename):
+    """Store an uploaded file; returns the path kept in data.json"""
+    file.save(os.path.join(upload_folder(), filename))
+    return f"{upload_folder()}/{filename}"
+
+
+def ensure_directories():
+    """Create the upload, backup and security folders of the current tenant"""
+    tenant = tenancy.current_tenant()
+    if tenant in RUNTIME_READY:
+        return
+    for path in (upload_folder(), backup_dir(), tenancy.tenant_path('security')):
+        os.makedirs(path, exist_ok=True)
+    RUNTIME_READY.add(tenant)
 
-# Create upload directory
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs('backups', exist_ok=True)
 
-# Initialize APScheduler for automatic backups
-scheduler = BackgroundScheduler()
-scheduler.start()
-atexit.register(lambda: scheduler.shutdown())
+@app.before_request
+def prepare_runtime():
+    ensure_directories()
+
+
+def start_scheduler():
+    """Start the cron scheduler; its jobs only enqueue work for the job workers"""
+    if SCHEDULER[0] is not None:
+        return SCHEDULER[0]
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    jobs.AUTOSTART[0] = False
+    scheduler = BackgroundScheduler()
+    register_cron_jobs(scheduler)
+    scheduler.start()
+    SCHEDULER[0] = scheduler
+    SCHEDULER_PID[0] = os.getpid()
+    atexit.register(stop_scheduler)
+    return scheduler
+
+
+def stop_scheduler():
+    # Forked workers inherit the scheduler object but not its thread
+    scheduler = SCHEDULER[0]
+    if SCHEDULER_PID[0] == os.getpid() and scheduler is not None and scheduler.running:
+        scheduler.shutdown(wait=False)
+
+
+def reinit_after_fork():
+    """Forget the arbiter's scheduler in a forked worker; jobs and metrics reset themselves"""
+    SCHEDULER[0] = None
+    SCHEDULER_PID[0] = None
+    RUNTIME_READY.clear()
+
+
+def warm_up():
+    """Compile every template and render the public pages once, before taking traffic"""
+    started = time.monotonic()
+    template_cache.precompile(app)
+    # Any tenant's pages compile the same templates; the first will do
+    for tenant in tenancy.list_tenants()[:1]:
+        with tenancy.use_tenant(tenant):
+            paths = ['/', '/cv-preview']
+            projects = load_site_data().get('projects', [])
+            if projects and isinstance(projects[0], dict) and 'id' in projects[0]:
+                paths.append(f"/project/{projects[0]['id']}")
+            template_cache.warm_up(app, paths)
+    app.logger.info(f"Worker warmed up in {time.monotonic() - started:.2f}s")
+
+
+def start_background_services():
+    """Per-worker startup: folders, job worker pools and journal replay"""
+    if not tenancy.multi_tenant():
+        ensure_directories()
+    jobs.start_workers()
+    # Messages journaled before a restart still need to reach data.json
+    for tenant in tenancy.list_tenants():
+        with tenancy.use_tenant(tenant):
+            if journal.pending_messages():
+                jobs.enqueue('apply_message_journal')
+
+# Theme ids accepted by the settings page; each has static/themes/<id>.css
+VALID_THEMES = ['luxury-gold', 'modern-dark', 'clean-light', 'terracotta-red', 'vibrant-green', 'silver-grey']
 
 # Advanced Security System
 # Rate Limiting: Track requests per IP
@@ -47,7 +240,6 @@ RATE_LIMIT_WINDOW = 60  # Per 60 seconds
 
 # IP Logging for security tracking
 IP_LOG_FILE = 'security/ip_log.json'
-os.makedirs('security', exist_ok=True)
 
 def get_client_ip():
     """Get real client IP address"""
@@ -78,6 +270,9 @@ def check_rate_limit(endpoint='contact'):
 
 def log_ip_activity(activity_type, details=''):
     """Log IP activity for security tracking"""
+    # Demo sessions stay out of the production security log
+    if session.get('is_demo'):
+        return
     try:
         client_ip = get_client_ip()
         log_data = {
@@ -88,10 +283,19 @@ def log_ip_activity(activity_type, details=''):
             'user_agent': request.headers.get('User-Agent', 'Unknown')[:100]
         }
         
-        # Load existing logs
+        # Rewriting the log happens off the request path
+        jobs.enqueue('ip_log', log_data)
+    except Exception as e:
+        app.logger.error(f"Error logging IP activity: {str(e)}")
+
+
+@jobs.task('ip_log')
+def write_ip_log(log_data):
+    """Append an entry to the IP log, keeping the last 1000"""
+    log_file = tenancy.tenant_path(IP_LOG_FILE)
+    with journal.journal_lock('.ip_log.lock'):
         try:
-            with open(IP_LOG_FILE, 'r', encoding='utf-8') as f:
-                logs = json.load(f)
+            logs = serialization.load_file(log_file)
         except (FileNotFoundError, json.JSONDecodeError):
             logs = []
         
@@ -100,36 +304,86 @@ def log_ip_activity(activity_type, details=''):
         # Keep only last 1000 logs
         logs = logs[-1000:]
         
-        with open(IP_LOG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(logs, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        app.logger.error(f"Error logging IP activity: {str(e)}")
+        serialization.dump_file(log_file, logs)
 
-# Admin credentials (should be environment variables in production)
+# Admin credentials (should be environment variables in production).
+# ADMIN_PASSWORD_HASH takes a precomputed werkzeug hash; a plain
+# ADMIN_PASSWORD is hashed on first use instead of at import.
 ADMIN_CREDENTIALS = {
     'username':
     os.environ.get('ADMIN_USERNAME', 'admin'),
     'password_hash':
-    generate_password_hash(os.environ.get('ADMIN_PASSWORD', 'admin123'))
+    os.environ.get('ADMIN_PASSWORD_HASH'),
+    'password':
+    os.environ.get('ADMIN_PASSWORD', 'admin123')
 }
 
 # LIVE DEMO EDITION: Demo user credentials (restricted access for live preview)
 DEMO_USER_CREDENTIALS = {
     'username': 'demo_codexx',
-    'password_hash': generate_password_hash('Demo_2026!'),
+    'password_hash': os.environ.get('DEMO_PASSWORD_HASH'),
+    'password': 'Demo_2026!',
     'is_demo': True
 }
+CREDENTIALS_LOCK = threading.Lock()
+
+TELEGRAM_CONFIG_FILE = 'telegram_config.json'
+SMTP_CONFIG_FILE = 'smtp_config.json'
+
+
+def password_hash(credentials):
+    """Hash of a credential set's password, computed once per process"""
+    if not credentials.get('password_hash'):
+        with CREDENTIALS_LOCK:
+            if not credentials.get('password_hash'):
+                credentials['password_hash'] = generate_password_hash(credentials['password'])
+            credentials.pop('password', None)
+    return credentials['password_hash']
+
+
+def admin_credentials():
+    """Admin login of the current tenant (tenant.json), or the env-configured one"""
+    if not tenancy.current_tenant():
+        return ADMIN_CREDENTIALS
+    config = tenancy.load_config()
+    if not config.get('admin_password_hash'):
+        return {'username': None}
+    return {'username': config.get('admin_username'), 'password_hash': config['admin_password_hash']}
+
+
+def demo_login_enabled():
+    """The live demo login exists on the main site and on tenants that opt in"""
+    return not tenancy.current_tenant() or bool(tenancy.load_config().get('demo'))
+
+
+def load_config_file(name):
+    """A JSON config file of the current tenant, or None; cached until it changes"""
+    path = tenancy.tenant_path(name)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    version = (invalidation.version(tenancy.tenant_key('config')), stat.st_mtime_ns, stat.st_size)
+    config = tenancy.CACHE.get('config', name, version)
+    if config is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        tenancy.CACHE.put('config', name, version, config, stat.st_size)
+    return dict(config)
+
 
 # Telegram Bot Configuration helper functions
 def load_telegram_config():
     """Load Telegram configuration from file"""
     try:
-        if os.path.exists('telegram_config.json'):
-            with open('telegram_config.json', 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                return config.get('bot_token', ''), config.get('chat_id', '')
+        config = load_config_file(TELEGRAM_CONFIG_FILE)
+        if config is not None:
+            return config.get('bot_token', ''), config.get('chat_id', '')
     except (FileNotFoundError, json.JSONDecodeError, IOError) as e:
         app.logger.debug(f"Could not load Telegram config from file: {str(e)}")
+    # The operator's bot in the environment is not for tenants' messages
+    if tenancy.current_tenant():
+        return '', ''
     # Fallback to environment variables
     return os.environ.get('TELEGRAM_BOT_TOKEN', ''), os.environ.get('TELEGRAM_CHAT_ID', '')
 
@@ -138,19 +392,14 @@ def get_telegram_credentials():
     bot_token, chat_id = load_telegram_config()
     return bot_token, chat_id
 
-# Telegram Bot Configuration - loaded at startup
-TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID = get_telegram_credentials()
-TELEGRAM_ENABLED = bool(TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID)
-
 
 # SMTP Email Configuration helper functions
 def load_smtp_config():
     """Load SMTP configuration from file"""
     try:
-        if os.path.exists('smtp_config.json'):
-            with open('smtp_config.json', 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                return config
+        config = load_config_file(SMTP_CONFIG_FILE)
+        if config is not None:
+            return config
     except (FileNotFoundError, json.JSONDecodeError, IOError) as e:
         app.logger.debug(f"Could not load SMTP config: {str(e)}")
     return {}
@@ -159,14 +408,21 @@ def load_smtp_config():
 def save_smtp_config(config):
     """Save SMTP configuration to file"""
     try:
-        with open('smtp_config.json', 'w', encoding='utf-8') as f:
+        with open(tenancy.tenant_path(SMTP_CONFIG_FILE), 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
+        publish_change('config')
         return True
     except Exception as e:
         app.logger.error(f"Error saving SMTP config: {str(e)}")
         return False
 
 
+def record_notification_result(channel, success):
+    """Count a delivered or failed notification and pass the result through"""
+    metrics.inc('notifications_sent_total' if success else 'notification_failures_total', channel=channel)
+    return success
+
+
 def send_email(recipient, subject, body, html=False):
     """Send email using SMTP"""
     try:
@@ -185,15 +441,16 @@ def send_email(recipient, subject, body, html=False):
         else:
             msg.attach(MIMEText(body, 'plain'))
         
-        with smtplib.SMTP(smtp_config.get('host'), int(smtp_config.get('port'))) as server:
-            server.starttls()
-            server.login(smtp_config.get('email'), smtp_config.get('password'))
-            server.send_message(msg)
+        with metrics.timer('notification_duration_seconds', channel='email'):
+            with smtplib.SMTP(smtp_config.get('host'), int(smtp_config.get('port'))) as server:
+                server.starttls()
+                server.login(smtp_config.get('email'), smtp_config.get('password'))
+                server.send_message(msg)
         
-        return True
+        return record_notification_result('email', True)
     except Exception as e:
         app.logger.error(f"Error sending email: {str(e)}")
-        return False
+        return record_notification_result('email', False)
 
 
 def allowed_file(filename):
@@ -202,11 +459,115 @@ def allowed_file(filename):
         '.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 
+def next_record_id(data, kind):
+    """Next id for a message or client, never reusing archived ids"""
+    ids = [r.get('id', 0) for r in data.get(kind, [])]
+    return max(ids + [archive.max_archived_id(kind)]) + 1
+
+
+def demo_sandbox_id():
+    """Sandbox of the current demo session, or None outside demo sessions"""
+    if not has_request_context() or not session.get('is_demo'):
+        return None
+    if 'demo_sandbox' not in session:
+        session['demo_sandbox'] = sandbox.new_sandbox_id()
+    return session['demo_sandbox']
+
+
+# Tenants whose data lock the current thread holds
+DATA_LOCK_HELD = threading.local()
+
+
+def holds_data_lock():
+    return tenancy.current_tenant() in DATA_LOCK_HELD.__dict__.get('tenants', ())
+
+
+@contextmanager
+def data_lock():
+    """Hold the current tenant's data.json still across a load, change and save
+
+    Shared by threads and worker processes; nested use in one thread is a
+    no-op.
+    """
+    held = DATA_LOCK_HELD.__dict__.setdefault('tenants', set())
+    tenant = tenancy.current_tenant()
+    if tenant in held:
+        yield
+        return
+    with journal.journal_lock('.data.lock'):
+        held.add(tenant)
+        try:
+            yield
+        finally:
+            held.discard(tenant)
+
+
+def data_writer(f):
+    """Decorator for views that load, change and save data.json"""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if demo_sandbox_id():
+            # Sandboxes belong to one session
+            return f(*args, **kwargs)
+        with data_lock():
+            return f(*args, **kwargs)
+
+    return decorated_function
+
+
 def load_data():
+    """Load portfolio data; demo sessions see their own sandbox"""
+    sandbox_id = demo_sandbox_id()
+    if sandbox_id:
+        return sandbox.load(sandbox_id, build_demo_base)
+    return load_site_data()
+
+
+def save_data(data):
+    """Save portfolio data; demo sessions only write to their sandbox
+
+    Returns whether the data was written.
+    """
+    sandbox_id = demo_sandbox_id()
+    if sandbox_id:
+        try:
+            sandbox.save(sandbox_id, data, build_demo_base)
+        except sandbox.SandboxFull as e:
+            flash(f'⚠️ Demo mode: {e}. Log in again to start over.', 'warning')
+            return False
+        return True
+    return save_site_data(data)
+
+
+def load_site_data():
+    """Load portfolio data; the parsed document is cached until data.json changes
+
+    Code holding data_lock() is about to change and save the data, so it
+    gets a copy of its own. Everyone else shares the cached document and
+    must not modify it.
+    """
+    if holds_data_lock():
+        return read_site_data()
+    version = data_version()
+    document = tenancy.CACHE.get('document', 'data', version)
+    if document is None:
+        document = read_site_data()
+        if document:
+            # Stat before read: the document is never older than its version
+            tenancy.CACHE.put('document', 'data', version, document, version[2] if version else 0)
+    return document
+
+
+def read_site_data():
     """Load portfolio data from JSON file with error handling"""
     try:
-        with open('data.json', 'r', encoding='utf-8') as file:
-            return json.load(file)
+        with metrics.timer('storage_operation_seconds', operation='load_data'):
+            with open(data_file(), 'rb') as file:
+                raw = file.read()
+            metrics.inc('storage_reads_total', file='data.json')
+            metrics.inc('storage_read_bytes_total', len(raw), file='data.json')
+            return serialization.loads(raw)
     except FileNotFoundError:
         # Initialize with default structure
         default_data = {
@@ -233,43 +594,60 @@ def load_data():
                 'theme': 'luxury-gold'
             }
         }
-        save_data(default_data)
+        save_site_data(default_data)
         return default_data
     except json.JSONDecodeError:
-        flash('Error reading data file. Please check data.json format.',
-              'error')
+        if has_request_context():
+            flash('Error reading data file. Please check data.json format.',
+                  'error')
         return {}
 
 
-def save_data(data):
-    """Save portfolio data to JSON file with automatic backup"""
+def save_site_data(data):
+    """Save portfolio data to JSON file with automatic backup; returns whether it was written"""
     try:
-        if os.path.exists('data.json'):
-            create_backup(manual=False)
-
-        with open('data.json', 'w', encoding='utf-8') as file:
-            json.dump(data, file, ensure_ascii=False, indent=2)
+        with metrics.timer('storage_operation_seconds', operation='save_data'):
+            if os.path.exists(data_file()):
+                create_backup(manual=False)
+
+            written = serialization.dump_file(data_file(), data)
+            publish_change('data')
+        metrics.inc('storage_writes_total', file='data.json')
+        metrics.inc('storage_write_bytes_total', written, file='data.json')
+        return True
     except Exception as e:
         app.logger.error(f"Error saving data: {str(e)}")
-        flash('Error saving data. Please try again.', 'error')
+        if has_request_context():
+            flash('Error saving data. Please try again.', 'error')
+        return False
+
 
+def create_backup(manual=True, replicate=None):
+    """Create a backup of data.json to backups folder
 
-def create_backup(manual=True):
-    """Create a backup of data.json to backups folder"""
+    Manual backups, and scheduled ones (replicate=True), are also copied
+    offsite; the automatic backup taken before every save is not.
+    """
     try:
-        if not os.path.exists('data.json'):
+        if not os.path.exists(data_file()):
             return None
         
+        backup_started = time.perf_counter()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_filename = f'backup_{timestamp}.json'
-        backup_path = os.path.join('backups', backup_filename)
+        backup_path = os.path.join(backup_dir(), backup_filename)
         
-        with open('data.json', 'r', encoding='utf-8') as original:
+        # data.json is already in the compact form; copy its bytes as-is
+        with open(data_file(), 'rb') as original:
             backup_content = original.read()
-            with open(backup_path, 'w', encoding='utf-8') as backup:
-                backup.write(backup_content)
+        with open(backup_path, 'wb') as backup:
+            backup.write(backup_content)
         
-        file_size = os.path.getsize(backup_path) / 1024
+        file_size = len(backup_content) / 1024
+        metrics.inc('storage_reads_total', file='data.json')
+        metrics.inc('storage_read_bytes_total', len(backup_content), file='data.json')
+        metrics.inc('storage_writes_total', file='backup')
+        metrics.inc('storage_write_bytes_total', len(backup_content), file='backup')
         
         backup_info = {
             'filename': backup_filename,
@@ -279,9 +657,13 @@ def create_backup(manual=True):
         }
         
         save_backup_metadata(backup_info)
+        if replication.enabled() and (manual if replicate is None else replicate):
+            jobs.enqueue('replicate_backup', backup_filename, idempotency_key=f"replicate:{backup_filename}")
         
-        keep_recent_backups(max_backups=20)
+        keep_recent_backups(max_backups=MAX_BACKUPS)
         
+        metrics.inc('backups_total', type=backup_info['type'])
+        metrics.observe('backup_duration_seconds', time.perf_counter() - backup_started)
         return backup_info
     except Exception as e:
         app.logger.error(f"Error creating backup: {str(e)}")
@@ -291,17 +673,15 @@ def create_backup(manual=True):
 def save_backup_metadata(backup_info):
     """Save backup metadata to JSON file"""
     try:
-        metadata_file = 'backups/backups.json'
+        metadata_file = os.path.join(backup_dir(), 'backups.json')
         backups_list = []
         
         if os.path.exists(metadata_file):
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                backups_list = json.load(f)
+            backups_list = serialization.load_file(metadata_file)
         
         backups_list.append(backup_info)
         
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(backups_list, f, ensure_ascii=False, indent=2)
+        serialization.dump_file(metadata_file, backups_list)
     except Exception as e:
         app.logger.error(f"Error saving backup metadata: {str(e)}")
 
@@ -309,95 +689,194 @@ def save_backup_metadata(backup_info):
 def get_backups_list():
     """Get list of all backups with metadata"""
     try:
-        metadata_file = 'backups/backups.json'
+        metadata_file = os.path.join(backup_dir(), 'backups.json')
         if os.path.exists(metadata_file):
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                backups = json.load(f)
-                return sorted(backups, key=lambda x: x['timestamp'], reverse=True)
+            backups = serialization.load_file(metadata_file)
+            return sorted(backups, key=lambda x: x['timestamp'], reverse=True)
         return []
     except Exception as e:
         app.logger.error(f"Error reading backups list: {str(e)}")
         return []
 
 
-def keep_recent_backups(max_backups=20):
+@jobs.task('replicate_backup', queue='maintenance', max_attempts=5)
+def replicate_backup_job(filename):
+    """Copy a backup to the offsite bucket"""
+    path = os.path.join(backup_dir(), filename)
+    if not os.path.exists(path):
+        # Pruned before its turn came; a newer backup has its data
+        return True
+    try:
+        replication.upload(path)
+    except Exception:
+        metrics.inc('backup_replications_total', outcome='failed')
+        raise
+    metrics.inc('backup_replications_total', outcome='uploaded')
+    return True
+
+
+def offsite_backups():
+    """Offsite backups not kept locally, in the shape of backups.json entries"""
+    if not replication.enabled():
+        return []
+    # Listing the bucket is slow; the dashboard polls it at most once a minute
+    version = int(time.time() // 60)
+    remote = tenancy.CACHE.get('offsite_backups', 'list', version)
+    if remote is None:
+        try:
+            remote = replication.list_remote()
+        except Exception as e:
+            app.logger.error(f"Error listing offsite backups: {str(e)}")
+            return []
+        tenancy.CACHE.put('offsite_backups', 'list', version, remote, 200 * len(remote))
+    local = {backup['filename'] for backup in get_backups_list()}
+    # The newest ones, as many as are kept locally; the bucket's lifecycle rule expires the rest
+    return [{'filename': backup['filename'], 'timestamp': backup['modified'].isoformat(),
+             'size_kb': round(backup['size'] / 1024, 2), 'type': 'offsite'}
+            for backup in remote if backup['filename'] not in local][:MAX_BACKUPS]
+
+
+def local_backup_path(filename):
+    """Path of a backup, fetched from the offsite bucket if it isn't here; None if neither has it"""
+    backup_path = os.path.join(backup_dir(), filename)
+    if os.path.exists(backup_path) or not replication.enabled():
+        return backup_path if os.path.exists(backup_path) else None
+    try:
+        replication.fetch(filename, backup_path)
+    except Exception as e:
+        app.logger.error(f"Error fetching offsite backup {filename}: {str(e)}")
+        return None
+    metrics.inc('backup_replications_total', outcome='fetched')
+    return backup_path
+
+
+def keep_recent_backups(max_backups=MAX_BACKUPS):
     """Keep only the most recent backups"""
     try:
         backups = get_backups_list()
         if len(backups) > max_backups:
             to_delete = backups[max_backups:]
             for backup in to_delete:
-                backup_path = os.path.join('backups', backup['filename'])
+                backup_path = os.path.join(backup_dir(), backup['filename'])
                 if os.path.exists(backup_path):
                     os.remove(backup_path)
             
             updated_backups = backups[:max_backups]
-            with open('backups/backups.json', 'w', encoding='utf-8') as f:
-                json.dump(updated_backups, f, ensure_ascii=False, indent=2)
+            serialization.dump_file(os.path.join(backup_dir(), 'backups.json'), updated_backups)
     except Exception as e:
         app.logger.error(f"Error cleaning old backups: {str(e)}")
 
 
 def scheduled_backup():
-    """Scheduled backup job"""
+    """Scheduled backup of every tenant; the idempotency key keeps one job per hour"""
+    for tenant in tenancy.list_tenants():
+        with tenancy.use_tenant(tenant):
+            # Idle tenants already have a backup of what they hold
+            if tenant and not data_changed_since_backup():
+                continue
+            jobs.enqueue('backup', idempotency_key=f"backup:{datetime.now().strftime('%Y%m%d%H')}")
+
+
+def data_changed_since_backup():
+    """Whether data.json is newer than the latest backup"""
     try:
-        with app.app_context():
-            create_backup(manual=False)
-            app.logger.info("Scheduled backup created successfully")
-    except Exception as e:
-        app.logger.error(f"Scheduled backup failed: {str(e)}")
+        modified = os.path.getmtime(data_file())
+    except OSError:
+        return False
+    backups = get_backups_list()
+    if not backups:
+        return True
+    return datetime.fromtimestamp(modified) > datetime.fromisoformat(backups[0]['timestamp'])
+
+
+@jobs.task('backup', queue='maintenance')
+def backup_job(manual=False):
+    """Create a backup on the maintenance queue"""
+    backup_info = create_backup(manual=manual, replicate=True)
+    if backup_info:
+        app.logger.info("Scheduled backup created successfully")
+    return backup_info is not None
+
+
+def scheduled_archive():
+    """Nightly archive run of every tenant, queued once per day"""
+    for tenant in tenancy.list_tenants():
+        with tenancy.use_tenant(tenant):
+            jobs.enqueue('archive', idempotency_key=f"archive:{datetime.now().strftime('%Y%m%d')}")
 
 
-def reset_demo_data():
-    """Reset demo data to default state for Live Demo Edition"""
+@jobs.task('archive', queue='maintenance')
+def archive_job():
+    """Archive old records on the maintenance queue"""
+    archive_old_records()
+
+
+def archive_old_records():
+    """Move old read messages and finished clients to the archive"""
     try:
-        with app.app_context():
-            default_demo_data = {
-                'name': 'Demo Portfolio - Codexx',
-                'title': 'Web Developer & Designer',
-                'description': 'Experience the power of Codexx Portfolio Platform with this interactive demo',
-                'photo': 'static/assets/profile-placeholder.svg',
-                'about': 'Welcome to the Codexx Portfolio Platform! This is a live demo showcasing all the features available in our professional portfolio management system. Feel free to explore and customize this demo to see how your portfolio would look.',
-                'skills': [
-                    {'name': 'Web Development', 'level': 90},
-                    {'name': 'UI/UX Design', 'level': 85},
-                    {'name': 'JavaScript', 'level': 88},
-                    {'name': 'React.js', 'level': 85},
-                    {'name': 'Python', 'level': 80}
-                ],
-                'projects': load_data().get('projects', []),
-                'contact': {'email': 'demo@codexx.com', 'phone': '+1 234 567 8900', 'location': 'San Francisco, CA'},
-                'social': {},
-                'messages': [],
-                'visitors': {'total': 0, 'today': [], 'unique_ips': []},
-                'settings': {'theme': 'luxury-gold'},
-                'clients': []
-            }
-            with open('data.json', 'w', encoding='utf-8') as f:
-                json.dump(default_demo_data, f, ensure_ascii=False, indent=2)
+        with app.app_context(), data_lock():
+            data = load_data()
+            moved = archive.archive_old_records(data)
+            if moved:
+                save_data(data)
+                app.logger.info(f"Archived records: {moved}")
+            return moved
     except Exception as e:
-        app.logger.error(f"Demo data reset failed: {str(e)}")
-
-
-scheduler.add_job(
-    scheduled_backup,
-    'cron',
-    hour='*',
-    minute=0,
-    id='daily_backup',
-    name='Hourly backup',
-    replace_existing=True
-)
-
-scheduler.add_job(
-    reset_demo_data,
-    'cron',
-    hour='*',
-    minute=0,
-    id='demo_reset',
-    name='Demo data hourly reset',
-    replace_existing=True
-)
+        app.logger.error(f"Archiving failed: {str(e)}")
+        return {}
+
+
+# Starting point of every demo sandbox unless DEMO_BASE_FILE exists; the
+# real projects are shown so the demo looks like a live portfolio
+DEMO_DEFAULT_DATA = {
+    'name': 'Demo Portfolio - Codexx',
+    'title': 'Web Developer & Designer',
+    'description': 'Experience the power of Codexx Portfolio Platform with this interactive demo',
+    'photo': 'static/assets/profile-placeholder.svg',
+    'about': 'Welcome to the Codexx Portfolio Platform! This is a live demo showcasing all the features available in our professional portfolio management system. Feel free to explore and customize this demo to see how your portfolio would look.',
+    'skills': [
+        {'name': 'Web Development', 'level': 90},
+        {'name': 'UI/UX Design', 'level': 85},
+        {'name': 'JavaScript', 'level': 88},
+        {'name': 'React.js', 'level': 85},
+        {'name': 'Python', 'level': 80}
+    ],
+    'projects': [],
+    'contact': {'email': 'demo@codexx.com', 'phone': '+1 234 567 8900', 'location': 'San Francisco, CA'},
+    'social': {},
+    'messages': [],
+    'visitors': {'total': 0, 'today': [], 'unique_ips': []},
+    'settings': {'theme': 'luxury-gold'},
+    'clients': []
+}
+
+
+def build_demo_base():
+    """Shared base document of the demo sandboxes"""
+    return dict(DEMO_DEFAULT_DATA, projects=load_site_data().get('projects', []))
+
+
+def register_cron_jobs(scheduler):
+    """Hourly backup and nightly archive"""
+    scheduler.add_job(
+        scheduled_backup,
+        'cron',
+        hour='*',
+        minute=0,
+        id='daily_backup',
+        name='Hourly backup',
+        replace_existing=True
+    )
+
+    scheduler.add_job(
+        scheduled_archive,
+        'cron',
+        hour=3,
+        minute=30,
+        id='archive_old_records',
+        name='Daily archive of old messages and clients',
+        replace_existing=True
+    )
 
 
 def login_required(f):
@@ -405,7 +884,8 @@ def login_required(f):
 
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'admin_logged_in' not in session:
+        # A path-routed tenant shares the cookie with the others
+        if 'admin_logged_in' not in session or session.get('tenant') != tenancy.current_tenant():
             flash('Please login to access this page.', 'error')
             return redirect(url_for('dashboard_login'))
         return f(*args, **kwargs)
@@ -413,6 +893,32 @@ def login_required(f):
     return decorated_function
 
 
+def cached_page(f):
+    """Serve a public page from the tenant cache until the tenant's data.json changes"""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Logins, flashes and demo sandboxes live in the session; those pages are personal
+        if request.method != 'GET' or session:
+            return f(*args, **kwargs)
+        version = data_version()
+        if version is None:
+            return f(*args, **kwargs)
+        cached = tenancy.CACHE.get('page', request.url, version)
+        if cached is not None:
+            metrics.inc('page_cache_total', outcome='hit')
+            body, status = cached
+            return app.response_class(body, status=status, mimetype='text/html')
+        metrics.inc('page_cache_total', outcome='miss')
+        response = app.make_response(f(*args, **kwargs))
+        if response.status_code in (200, 404) and not response.direct_passthrough and not session:
+            body = response.get_data()
+            tenancy.CACHE.put('page', request.url, version, (body, response.status_code), len(body))
+        return response
+
+    return decorated_function
+
+
 def send_telegram_notification(message_text):
     """Send notification to Telegram"""
     # Get fresh credentials from config
@@ -449,12 +955,14 @@ def send_telegram_notification(message_text):
             'parse_mode': 'HTML'
         }
         
-        # Send in background thread to not block the request
-        response = requests.post(url, json=payload, timeout=5)
-        return response.status_code == 200
+        # Imported on first send; most processes never need it
+        import requests
+        with metrics.timer('notification_duration_seconds', channel='telegram'):
+            response = requests.post(url, json=payload, timeout=5)
+        return record_notification_result('telegram', response.status_code == 200)
     except Exception as e:
         app.logger.error(f"Error sending Telegram notification: {str(e)}")
-        return False
+        return record_notification_result('telegram', False)
 
 
 def send_telegram_event_notification(event_type, details=None):
@@ -491,133 +999,187 @@ def send_telegram_event_notification(event_type, details=None):
             'parse_mode': 'HTML'
         }
         
-        response = requests.post(url, json=payload, timeout=5)
-        return response.status_code == 200
+        import requests
+        with metrics.timer('notification_duration_seconds', channel='telegram'):
+            response = requests.post(url, json=payload, timeout=5)
+        return record_notification_result('telegram', response.status_code == 200)
     except Exception as e:
         app.logger.error(f"Error sending event notification: {str(e)}")
-        return False
+        return record_notification_result('telegram', False)
+
+
+@jobs.task('telegram', queue='notifications')
+def telegram_job(message_text):
+    """Deliver a Telegram notification; nothing to do when Telegram isn't set up"""
+    bot_token, chat_id = get_telegram_credentials()
+    if not bot_token or not chat_id:
+        return True
+    return send_telegram_notification(message_text)
+
+
+@jobs.task('telegram_event', queue='notifications')
+def telegram_event_job(event_type, details=None):
+    """Deliver an event notification; nothing to do when Telegram isn't set up"""
+    bot_token, chat_id = get_telegram_credentials()
+    if not bot_token or not chat_id:
+        return True
+    return send_telegram_event_notification(event_type, details)
+
+
+@jobs.task('email', queue='notifications')
+def email_job(recipient, subject, body, html=False):
+    """Deliver an email; nothing to do when SMTP isn't set up"""
+    smtp_config = load_smtp_config()
+    if not all([smtp_config.get('host'), smtp_config.get('port'),
+                smtp_config.get('email'), smtp_config.get('password')]):
+        return True
+    return send_email(recipient, subject, body, html=html)
 
 
 def send_event_notification_async(event_type, details=None):
     """Send event notification asynchronously"""
-    thread = threading.Thread(target=send_telegram_event_notification, args=(event_type, details))
-    thread.daemon = True
-    thread.start()
+    # Demo sandbox activity is not the owner's business
+    if demo_sandbox_id():
+        return
+    jobs.enqueue('telegram_event', event_type, details)
 
 
-def send_telegram_notification_async(name, email, message):
+def send_telegram_notification_async(message_text):
     """Send Telegram notification asynchronously"""
-    bot_token, chat_id = get_telegram_credentials()
-    if bot_token and chat_id:
-        thread = threading.Thread(target=send_telegram_notification, args=(name, email, message))
-        thread.daemon = True
-        thread.start()
+    if demo_sandbox_id():
+        return
+    jobs.enqueue('telegram', message_text)
 
 
 def save_message(name, email, message):
     """Save contact message and send notifications"""
-    data = load_data()
-    if 'messages' not in data:
-        data['messages'] = []
-
-    message_ids = [m.get('id', 0) for m in data.get('messages', [])]
-    new_id = max(message_ids) + 1 if message_ids else 1
-
     client_ip = get_client_ip()
-    new_message = {
-        'id': new_id,
-        'name': name,
-        'email': email,
-        'message': message,
-        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'read': False,
-        'ip': client_ip  # Log IP address
-    }
 
-    data['messages'].append(new_message)
-    save_data(data)
+    def build(new_id):
+        return models.Message(
+            id=new_id,
+            name=name,
+            email=email,
+            message=message,
+            date=datetime.now().replace(microsecond=0),
+            read=False,
+            ip=client_ip  # Log IP address
+        ).to_dict()
+
+    # Demo sessions keep their messages in the sandbox and notify nobody
+    if demo_sandbox_id():
+        data = load_data()
+        new_message = build(next_record_id(data, 'messages'))
+        data.setdefault('messages', []).append(new_message)
+        save_data(data)
+        return new_message['id']
+
+    # One durable append; the job below folds it into data.json
+    new_message = journal.append_message(
+        build, lambda: next_record_id(load_site_data(), 'messages') - 1)
+    jobs.enqueue('apply_message_journal')
     
     # Log the activity
     log_ip_activity('contact_message', f"From: {email}")
     
     # Send Telegram notifications
-    send_telegram_notification_async(name, email, message)
+    send_telegram_notification_async({'name': name, 'email': email, 'message': message})
     send_event_notification_async('new_message', f"📝 From: {name} ({email})\n💬 {message[:100]}...")
     
-    return new_id
+    return new_message['id']
+
+
+@jobs.task('apply_message_journal')
+def apply_message_journal():
+    """Move journaled contact messages into data.json"""
+    # Every other writer of data.json takes the same lock, so nothing saves
+    # over the messages once the journal no longer has them
+    with data_lock():
+        data = load_site_data()
+        if not data:
+            # Unreadable data.json; saving would leave only the messages
+            app.logger.error("Not applying the message journal: data.json could not be read")
+            return False
+        through_id = journal.apply_pending(data, lambda: next_record_id(data, 'messages'))
+        if through_id:
+            # The journal is the only copy until data.json has the messages
+            if not save_site_data(data):
+                return False
+            journal.discard_through(through_id)
+
+
+
+def typed_records(collection):
+    """Typed records of the data the current session sees"""
+    if demo_sandbox_id():
+        return models.to_records(load_data(), collection)
+    version = data_version()
+    return models.get_records(collection, load_site_data, version, size=version[2] if version else 0)
 
 
 def get_unread_messages_count():
     """Get count of unread messages"""
-    data = load_data()
-    return len(
-        [m for m in data.get('messages', []) if not m.get('read', False)])
+    return sum(1 for m in typed_records('messages') if not m.read)
 
 
 def track_visitor():
     """Track visitor with improved logic"""
-    data = load_data()
-    if 'visitors' not in data:
-        data['visitors'] = {'total': 0, 'today': [], 'unique_ips': []}
-
+    if request.environ.get('portfolio.warmup'):
+        # Worker warm-up renders are not visits
+        return get_visitor_count()
     visitor_ip = request.environ.get(
         'HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR', 'unknown'))
-    today = datetime.now().strftime('%Y-%m-%d')
+    if demo_sandbox_id():
+        data = load_data()
+        total = visitors.add_hit(data.setdefault('visitors', visitors.empty()), visitor_ip)
+        save_data(data)
+        return total
+    # Not save_data: a visit is no reason for a backup or a new data version
+    try:
+        return visitors.record_hit(visitor_ip, lambda: load_site_data().get('visitors'))
+    except (OSError, ValueError) as e:
+        app.logger.error(f"Error recording visit: {str(e)}")
+        return 0
 
-    data['visitors']['total'] = data['visitors'].get('total', 0) + 1
-    data['visitors']['today'] = [
-        v for v in data['visitors'].get('today', []) if v.get('date') == today
-    ]
-    data['visitors']['today'].append({
-        'ip':
-        visitor_ip,
-        'timestamp':
-        datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'date':
-        today
-    })
-
-    if isinstance(data['visitors'].get('unique_ips'), list):
-        unique_ips_set = set(data['visitors']['unique_ips'])
-    else:
-        unique_ips_set = set()
-    unique_ips_set.add(visitor_ip)
-    data['visitors']['unique_ips'] = list(unique_ips_set)
 
-    save_data(data)
-    
-    return data['visitors']['total']
+def visitor_counters():
+    """{'total', 'today', 'unique_ips'} of the current site or demo sandbox"""
+    if demo_sandbox_id():
+        return load_data().get('visitors') or visitors.empty()
+    try:
+        return visitors.load(lambda: load_site_data().get('visitors'))
+    except (OSError, ValueError) as e:
+        app.logger.error(f"Error loading visitor counts: {str(e)}")
+        return visitors.empty()
 
 
 def get_visitor_count():
     """Get total visitor count"""
-    data = load_data()
-    return data.get('visitors', {}).get('total', 0)
+    return visitor_counters().get('total', 0)
 
 
 def mark_message_as_read(message_id):
     """Mark message as read"""
-    data = load_data()
-    for message in data.get('messages', []):
-        if message.get('id') == message_id:
-            message['read'] = True
-            break
-    save_data(data)
+    with data_lock():
+        data = load_data()
+        for message in data.get('messages', []):
+            if message.get('id') == message_id:
+                message['read'] = True
+                break
+        save_data(data)
 
 
 def get_clients_stats():
     """Get clients statistics"""
-    data = load_data()
-    clients = data.get('clients', [])
+    clients = typed_records('clients')
 
     total_clients = len(clients)
-    active_clients = len([c for c in clients if c.get('status') == 'active'])
+    active_clients = len([c for c in clients if c.status == 'active'])
     completed_clients = len(
-        [c for c in clients if c.get('status') == 'completed'])
-    pending_clients = len([c for c in clients if c.get('status') == 'pending'])
+        [c for c in clients if c.status == 'completed'])
+    pending_clients = len([c for c in clients if c.status == 'pending'])
 
-    total_revenue = sum(
-        float(c.get('price', 0)) for c in clients if c.get('price'))
+    total_revenue = sum(c.price for c in clients if c.price)
 
     return {
         'total': total_clients,
@@ -686,13 +1248,106 @@ def file_too_large(e):
     return redirect(request.url)
 
 
+# Project cards on the home page; further pages load from /api/projects
+PROJECTS_PAGE_SIZE = int(os.environ.get('PROJECTS_PAGE_SIZE', 9))
+PROJECTS_API_MAX_LIMIT = 50
+# What /api/projects returns by default: enough for a card, not the content
+PROJECT_CARD_FIELDS = ('id', 'title', 'short_description', 'image_url', 'url', 'demo_url',
+                       'github_url', 'technologies', 'created_at', 'updated_at')
+
+
+def listed_projects(data):
+    return [p for p in data.get('projects', []) if isinstance(p, dict) and 'id' in p]
+
+
+def encode_cursor(position, project_id):
+    """Opaque cursor for the page after the project at position"""
+    return base64.urlsafe_b64encode(f"{position}:{project_id}".encode()).decode().rstrip('=')
+
+
+def cursor_start(cursor, projects):
+    """Index of the first project after a cursor; raises ValueError if it is malformed"""
+    try:
+        position, _, project_id = base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)).decode().partition(':')
+        position, project_id = int(position), int(project_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+    for index, project in enumerate(projects):
+        if project['id'] == project_id:
+            return index + 1
+    # The last project seen was deleted; the rest moved up by one
+    return max(position, 0)
+
+
+def project_page(projects, cursor=None, limit=PROJECTS_PAGE_SIZE):
+    """(projects, next cursor or None) for one page in display order"""
+    start = cursor_start(cursor, projects) if cursor else 0
+    page = projects[start:start + limit]
+    end = start + len(page)
+    next_cursor = encode_cursor(end - 1, page[-1]['id']) if page and end < len(projects) else None
+    return page, next_cursor
+
+
+def project_card(project, fields):
+    """The requested fields of a project, with its page and image URLs resolved"""
+    card = {}
+    for name in fields:
+        if name == 'url':
+            card[name] = url_for('project_detail', project_id=project['id'])
+        elif name == 'image_url':
+            image = project.get('image')
+            if image and image.startswith('static/'):
+                card[name] = url_for('static', filename=image.replace('static/', ''))
+            else:
+                card[name] = image or url_for('static', filename='assets/project-placeholder.svg')
+        elif name == 'short_description':
+            card[name] = project.get('short_description') or project.get('description', '')
+        else:
+            card[name] = project.get(name)
+    return card
+
+
 # Public routes
 @app.route('/')
 def index():
     """Main portfolio page"""
     data = load_data()
     track_visitor()
-    return render_template('index.html', data=data)
+    projects, next_cursor = project_page(listed_projects(data))
+    return render_template('index.html', data=data, projects=projects, next_cursor=next_cursor)
+
+
+@app.route('/api/projects')
+def api_projects():
+    """Project cards a page at a time: ?cursor=...&limit=...&fields=id,title,..."""
+    try:
+        limit = min(max(int(request.args.get('limit', PROJECTS_PAGE_SIZE)), 1), PROJECTS_API_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    fields = [name for name in request.args.get('fields', '').split(',') if name] or PROJECT_CARD_FIELDS
+    unknown = [name for name in fields if name not in PROJECT_CARD_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}",
+                        'fields': list(PROJECT_CARD_FIELDS)}), 400
+
+    projects = listed_projects(load_data())
+    try:
+        page, next_cursor = project_page(projects, request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = jsonify({'projects': [project_card(project, fields) for project in page],
+                        'next_cursor': next_cursor,
+                        'total': len(projects)})
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest()[:32])
+    # Revalidated every time; demo sessions see their own sandbox
+    response.cache_control.no_cache = True
+    if session:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    return response.make_conditional(request)
 
 
 @app.route('/catalog')
@@ -727,16 +1382,9 @@ def contact():
         try:
             save_message(name, email, message)
             
-            # Send Telegram notification
-            send_telegram_notification({
-                'name': name,
-                'email': email,
-                'message': message
-            })
-            
-            # Send email notification to admin
+            # Send email notification to admin (not for demo sandbox messages)
             smtp_config = load_smtp_config()
-            if smtp_config.get('email'):
+            if smtp_config.get('email') and not demo_sandbox_id():
                 email_subject = f'📬 New Contact Message from {name}'
                 email_body = f"""
                 <html>
@@ -754,7 +1402,7 @@ def contact():
                     </body>
                 </html>
                 """
-                send_email(smtp_config.get('email'), email_subject, email_body, html=True)
+                jobs.enqueue('email', smtp_config.get('email'), email_subject, email_body, html=True)
             
             flash('Thank you for your message! I will get back to you soon.',
                   'success')
@@ -770,6 +1418,7 @@ def contact():
 
 
 @app.route('/project/<int:project_id>')
+@cached_page
 def project_detail(project_id):
     """Project detail page"""
     data = load_data()
@@ -780,45 +1429,37 @@ def project_detail(project_id):
     if not project:
         return render_template('404.html'), 404
 
-    return render_template('project_detail.html', project=project, data=data)
+    return render_template('project_detail.html', project=project, data=data,
+                           project_content=content.rendered(project, app.static_folder))
+
+
+# Public URL of the site for sitemap.xml and robots.txt; tenants are under
+# it by path. Host-routed tenants have a host each, taken from the request.
+SITEMAP_BASE_URL = (os.environ.get('SITEMAP_BASE_URL') or export.EXPORT_BASE_URL).rstrip('/')
+
+
+def site_base_url():
+    """Canonical URL of the current site, without the trailing slash"""
+    if SITEMAP_BASE_URL and tenancy.TENANT_ROUTING != 'host':
+        return SITEMAP_BASE_URL + request.script_root
+    return request.url_root.rstrip('/')
 
 
 @app.route('/sitemap.xml')
-def sitemap():
-    """Generate dynamic sitemap for SEO"""
-    data = load_data()
-    base_url = request.url_root.rstrip('/')
-    
-    sitemap_entries = []
-    sitemap_entries.append({
-        'loc': f'{base_url}/',
-        'changefreq': 'weekly',
-        'priority': '1.0',
-        'lastmod': datetime.now().strftime('%Y-%m-%d')
-    })
-    
-    for project in data.get('projects', []):
-        sitemap_entries.append({
-            'loc': f"{base_url}/project/{project['id']}",
-            'changefreq': 'monthly',
-            'priority': '0.8',
-            'lastmod': project.get('created_at', datetime.now().strftime('%Y-%m-%d')).split()[0]
-        })
-    
-    sitemap_xml = ['<?xml version="1.0" encoding="UTF-8"?>']
-    sitemap_xml.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">')
-    
-    for entry in sitemap_entries:
-        sitemap_xml.append('<url>')
-        sitemap_xml.append(f'<loc>{entry["loc"]}</loc>')
-        sitemap_xml.append(f'<lastmod>{entry["lastmod"]}</lastmod>')
-        sitemap_xml.append(f'<changefreq>{entry["changefreq"]}</changefreq>')
-        sitemap_xml.append(f'<priority>{entry["priority"]}</priority>')
-        sitemap_xml.append('</url>')
-    
-    sitemap_xml.append('</urlset>')
-    
-    response = app.make_response('\n'.join(sitemap_xml))
+@app.route('/sitemap-<int:page>.xml')
+def sitemap(page=None):
+    """Sitemap (or sitemap index and its pages), regenerated only when content changes"""
+    base_url = site_base_url()
+    manifest = sitemaps.get_sitemap(base_url, data_version(), load_site_data)
+
+    name = 'sitemap.xml' if page is None else f'sitemap-{page}.xml'
+    if name not in manifest['files']:
+        return render_template('404.html'), 404
+    response = send_file(sitemaps.sitemap_path(base_url, name),
+                         mimetype='application/xml',
+                         etag=manifest['files'][name],
+                         conditional=True,
+                         max_age=3600)
     response.headers['Content-Type'] = 'application/xml; charset=utf-8'
     return response
 
@@ -835,7 +1476,7 @@ Disallow: /dashboard/
 Disallow: /static/
 Disallow: /*.json$
 
-Sitemap: """ + request.url_root.rstrip('/') + """/sitemap.xml
+Sitemap: """ + site_base_url() + """/sitemap.xml
 User-agent: GPTBot
 Disallow: /
 
@@ -847,6 +1488,67 @@ Disallow: /"""
     return response
 
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics aggregated across all workers"""
+    metrics_token = os.environ.get('METRICS_TOKEN', '')
+    # Metrics cover every tenant in the process, so tenant admins need the token
+    authorized = (session.get('admin_logged_in') and not session.get('is_demo')
+                  and not session.get('tenant') and not tenancy.current_tenant())
+    if metrics_token and hmac.compare_digest(request.headers.get('Authorization', ''),
+                                             f'Bearer {metrics_token}'):
+        authorized = True
+    if not authorized:
+        # Plain text: scrapers don't need the HTML error page
+        return 'Forbidden\n', 403, {'Content-Type': 'text/plain; charset=utf-8'}
+
+    totals = metrics.collect()
+    try:
+        # Every worker shares the job database, so its backlog is read here once
+        # instead of being summed over per-process gauges
+        for queue, counts in jobs.queue_stats().items():
+            for state in ('queued', 'delayed', 'running', 'dead'):
+                metrics.set_gauge(totals, 'job_queue_depth', counts[state], queue=queue, state=state)
+    except Exception as e:
+        app.logger.error(f"Error reading job queue depth: {str(e)}")
+    response = app.make_response(metrics.render_prometheus(totals))
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@app.route('/healthz')
+def healthz():
+    """Liveness probe: the worker is up and answering"""
+    return jsonify({'status': 'ok', 'pid': os.getpid()}), 200, {'Cache-Control': 'no-store'}
+
+
+@app.route('/readyz')
+def readyz():
+    """Readiness probe: storage is usable and the job queue answers"""
+    checks = {}
+    if tenancy.multi_tenant():
+        checks['tenants'] = ('ok' if os.access(tenancy.TENANTS_DIR, os.R_OK | os.W_OK)
+                             else f'{tenancy.TENANTS_DIR}/ is not writable')
+    else:
+        path = 'data.json' if os.path.exists('data.json') else '.'
+        checks['data'] = 'ok' if os.access(path, os.R_OK | os.W_OK) else 'data.json is not writable'
+        checks['backups'] = 'ok' if os.access('backups', os.W_OK) else 'backups/ is not writable'
+    try:
+        jobs.connection().execute('SELECT 1')
+        checks['jobs'] = 'ok'
+    except Exception as e:
+        checks['jobs'] = str(e)
+    try:
+        invalidation.poll()
+        checks['invalidation'] = invalidation.stats()['error'] or 'ok'
+    except Exception as e:
+        checks['invalidation'] = str(e)
+    ready = all(result == 'ok' for result in checks.values())
+    return (jsonify({'status': 'ready' if ready else 'unavailable', 'checks': checks}),
+            200 if ready else 503, {'Cache-Control': 'no-store'})
+
+
 @app.route('/favicon.ico')
 def favicon():
     """Serve favicon"""
@@ -865,6 +1567,10 @@ def view_backups():
 @login_required
 def create_manual_backup():
     """Create a manual backup"""
+    # DEMO MODE: Demo changes live in the session sandbox, not in data.json
+    if session.get('is_demo'):
+        flash('⚠️ Demo mode: Backups are disabled.', 'warning')
+        return redirect(url_for('dashboard_settings') + '#backups')
     try:
         backup_info = create_backup(manual=True)
         if backup_info:
@@ -880,6 +1586,7 @@ def create_manual_backup():
 
 @app.route('/backup/restore/<filename>', methods=['POST'])
 @login_required
+@data_writer
 def restore_backup(filename):
     """Restore a backup"""
     # DEMO MODE: Block backup restoration in demo mode
@@ -889,17 +1596,19 @@ def restore_backup(filename):
     
     try:
         filename = secure_filename(filename)
-        backup_path = os.path.join('backups', filename)
+        backup_path = local_backup_path(filename)
         
-        if not os.path.exists(backup_path):
+        if backup_path is None:
             flash('Backup file not found', 'error')
             return redirect(url_for('dashboard_settings') + '#backups')
         
-        if os.path.exists('data.json'):
-            recovery_backup = f'backups/recovery_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-            shutil.copy('data.json', recovery_backup)
+        if os.path.exists(data_file()):
+            recovery_backup = os.path.join(backup_dir(), f'recovery_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+            shutil.copy(data_file(), recovery_backup)
         
-        shutil.copy(backup_path, 'data.json')
+        shutil.copy(backup_path, data_file())
+        publish_change('data')
+        queue_public_renders()
         flash(f'✓ Portfolio restored from backup: {filename}', 'success')
         send_event_notification_async('backup_restored', f'Restored from: {filename}')
         return redirect(url_for('dashboard_settings') + '#backups')
@@ -915,13 +1624,16 @@ def download_backup(filename):
     """Download a backup file"""
     try:
         filename = secure_filename(filename)
-        backup_path = os.path.join('backups', filename)
+        backup_path = local_backup_path(filename)
         
-        if not os.path.exists(backup_path):
+        if backup_path is None:
             flash('Backup file not found', 'error')
             return redirect(url_for('dashboard_settings') + '#backups')
         
-        return send_file(backup_path, as_attachment=True, download_name=filename)
+        # Stored backups are compact; hand people an indented copy
+        pretty = serialization.dumps_pretty(serialization.load_file(backup_path))
+        return send_file(io.BytesIO(pretty), mimetype='application/json',
+                         as_attachment=True, download_name=filename)
     except Exception as e:
         app.logger.error(f"Error downloading backup: {str(e)}")
         flash('Error downloading backup', 'error')
@@ -939,7 +1651,7 @@ def delete_backup(filename):
     
     try:
         filename = secure_filename(filename)
-        backup_path = os.path.join('backups', filename)
+        backup_path = os.path.join(backup_dir(), filename)
         
         if not os.path.exists(backup_path):
             flash('Backup file not found', 'error')
@@ -949,8 +1661,7 @@ def delete_backup(filename):
         
         backups = get_backups_list()
         updated_backups = [b for b in backups if b['filename'] != filename]
-        with open('backups/backups.json', 'w', encoding='utf-8') as f:
-            json.dump(updated_backups, f, ensure_ascii=False, indent=2)
+        serialization.dump_file(os.path.join(backup_dir(), 'backups.json'), updated_backups)
         
         flash(f'✓ Backup deleted: {filename}', 'success')
     except Exception as e:
@@ -965,13 +1676,175 @@ def delete_backup(filename):
 def api_backups():
     """API endpoint to get backups list"""
     try:
-        backups = get_backups_list()
+        backups = sorted(get_backups_list() + offsite_backups(), key=lambda x: x['timestamp'], reverse=True)
         return jsonify(backups)
     except Exception as e:
         app.logger.error(f"Error fetching backups: {str(e)}")
         return jsonify([]), 500
 
 
+# Whole-site archives (transfer.py)
+TRANSFER_TOKEN = os.environ.get('TRANSFER_TOKEN', '')
+TRANSFER_CONFIG_FILES = (TELEGRAM_CONFIG_FILE, SMTP_CONFIG_FILE)
+
+
+def transfer_authorized():
+    """A tenant's own admin session (not the demo), or the TRANSFER_TOKEN bearer token"""
+    if (session.get('admin_logged_in') and not session.get('is_demo')
+            and session.get('tenant') == tenancy.current_tenant()):
+        return True
+    return bool(TRANSFER_TOKEN) and hmac.compare_digest(request.headers.get('Authorization', ''),
+                                                        f'Bearer {TRANSFER_TOKEN}')
+
+
+def referenced_uploads(raw):
+    """Names of the files in upload_folder() that data.json bytes refer to"""
+    pattern = re.escape(upload_folder() + '/') + r'([^"\\/?#]+)'
+    names = dict.fromkeys(re.findall(pattern, raw.decode('utf-8', 'replace')))
+    return [name for name in names if os.path.isfile(os.path.join(upload_folder(), name))]
+
+
+def site_archive(include_backups=False, include_config=False):
+    """(sources, manifest) of the current tenant for transfer.stream_archive"""
+    if not os.path.exists(data_file()):
+        # A tenant nobody has visited yet; this writes its default document
+        load_site_data()
+    with open(data_file(), 'rb') as f:
+        raw = f.read()
+    sources = [(f'uploads/{name}', os.path.join(upload_folder(), name)) for name in referenced_uploads(raw)]
+    metadata_file = os.path.join(backup_dir(), 'backups.json')
+    if os.path.exists(metadata_file):
+        with open(metadata_file, 'rb') as f:
+            sources.append(('backups/backups.json', f.read()))
+    if include_backups:
+        for filename in dict.fromkeys(secure_filename(backup['filename']) for backup in get_backups_list()):
+            if os.path.isfile(os.path.join(backup_dir(), filename)):
+                sources.append((f'backups/{filename}', os.path.join(backup_dir(), filename)))
+    if include_config:
+        for name in TRANSFER_CONFIG_FILES:
+            if os.path.isfile(tenancy.tenant_path(name)):
+                sources.append((f'config/{name}', tenancy.tenant_path(name)))
+    if visitors.stored():
+        # The counters live beside data.json; the archive carries them inside it
+        data = serialization.loads(raw)
+        data['visitors'] = visitors.load()
+        raw = serialization.dumps(data)
+    # Last, so an interrupted import never has data pointing at missing files
+    sources.append(('data.json', raw))
+    manifest = transfer.build_manifest(sources, tenant=tenancy.current_tenant(), upload_prefix=upload_folder())
+    return sources, manifest
+
+
+def archive_destination(name):
+    """Where an uploads/ or backups/ member of an archive goes, or None"""
+    section, _, filename = name.partition('/')
+    if filename != secure_filename(filename) or filename == 'backups.json':
+        return None
+    if section == 'uploads' and allowed_file(filename):
+        return os.path.join(upload_folder(), filename)
+    if section == 'backups' and filename.endswith('.json'):
+        return os.path.join(backup_dir(), filename)
+    return None
+
+
+def apply_site_archive(staging_dir, manifest):
+    """Put the staged data.json, backup metadata and config of an archive in place"""
+    metadata_file = os.path.join(staging_dir, 'backups', 'backups.json')
+    if os.path.exists(metadata_file):
+        backups = get_backups_list()
+        known = {backup['filename'] for backup in backups}
+        for backup in serialization.load_file(metadata_file):
+            filename = secure_filename(backup.get('filename', ''))
+            if filename and filename not in known and os.path.isfile(os.path.join(backup_dir(), filename)):
+                backups.append(backup)
+        serialization.dump_file(os.path.join(backup_dir(), 'backups.json'), backups)
+
+    configs = [name for name in TRANSFER_CONFIG_FILES if os.path.exists(os.path.join(staging_dir, 'config', name))]
+    for name in configs:
+        os.replace(os.path.join(staging_dir, 'config', name), tenancy.tenant_path(name))
+    if configs:
+        publish_change('config')
+
+    staged_data = os.path.join(staging_dir, 'data.json')
+    if os.path.exists(staged_data):
+        with data_lock():
+            with open(staged_data, 'rb') as f:
+                raw = f.read()
+            # Uploads land in this tenant's folder whatever the source called it
+            source_prefix = manifest.get('upload_prefix')
+            if source_prefix and source_prefix != upload_folder():
+                raw = raw.replace(f'"{source_prefix}/'.encode('utf-8'), f'"{upload_folder()}/'.encode('utf-8'))
+            data = serialization.loads(raw)
+            if not isinstance(data, dict):
+                raise transfer.ArchiveError('data.json is not a portfolio document')
+            if os.path.exists(data_file()):
+                recovery_backup = os.path.join(backup_dir(), f'recovery_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+                shutil.copy(data_file(), recovery_backup)
+            serialization.dump_file(data_file(), data)
+            # Contact messages journaled from now on must not reuse imported ids
+            journal.advance_sequence(next_record_id(data, 'messages') - 1)
+            if isinstance(data.get('visitors'), dict):
+                visitors.replace(data['visitors'])
+            publish_change('data')
+            if has_request_context():
+                queue_public_renders()
+
+
+def import_site_archive(fileobj):
+    """Unpack and apply an archive into the current tenant, yielding progress events"""
+    with tempfile.TemporaryDirectory(prefix='import-', dir=backup_dir()) as staging_dir:
+        for event in transfer.unpack_archive(fileobj, archive_destination, staging_dir):
+            if event.get('complete'):
+                apply_site_archive(staging_dir, event.pop('manifest'))
+            yield event
+
+
+@app.route('/dashboard/transfer/export')
+def transfer_export():
+    """Stream the whole site as a .tar.gz (?backups=1, ?config=1 to include those)"""
+    if not transfer_authorized():
+        return 'Forbidden\n', 403, {'Content-Type': 'text/plain; charset=utf-8'}
+    sources, manifest = site_archive(request.args.get('backups') == '1', request.args.get('config') == '1')
+    filename = f"portfolio-{tenancy.current_tenant() or 'site'}-{datetime.now().strftime('%Y%m%d_%H%M%S')}.tar.gz"
+    response = app.response_class(transfer.stream_archive(sources, manifest), mimetype='application/gzip')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@app.route('/dashboard/transfer/import', methods=['POST'])
+def transfer_import():
+    """Import an archive sent as the body or as the 'archive' file; streams NDJSON progress"""
+    if not transfer_authorized():
+        return 'Forbidden\n', 403, {'Content-Type': 'text/plain; charset=utf-8'}
+    request.max_content_length = transfer.TRANSFER_MAX_BYTES
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('archive')
+        if upload is None:
+            return jsonify({'error': 'No archive file'}), 400
+        source = upload.stream
+    else:
+        source = request.stream
+
+    # The body runs after the view returns; don't rely on the middleware's tenant
+    tenant = tenancy.current_tenant()
+
+    def progress():
+        with tenancy.use_tenant(tenant):
+            try:
+                for event in import_site_archive(source):
+                    yield serialization.dumps(event) + b'\n'
+            except (transfer.ArchiveError, ValueError, OSError) as e:
+                app.logger.error(f"Error importing archive: {str(e)}")
+                yield serialization.dumps({'error': str(e)}) + b'\n'
+                return
+            send_event_notification_async('backup_restored', 'Imported a site archive')
+
+    response = app.response_class(stream_with_context(progress()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
 # Admin routes
 @app.route('/dashboard/login', methods=['GET', 'POST'])
 def dashboard_login():
@@ -982,12 +1855,14 @@ def dashboard_login():
         client_ip = get_client_ip()
 
         # Check admin credentials
-        if (username == ADMIN_CREDENTIALS['username']
+        credentials = admin_credentials()
+        if (credentials['username'] and username == credentials['username']
                 and password and check_password_hash(
-                    ADMIN_CREDENTIALS['password_hash'], password)):
+                    password_hash(credentials), password)):
             session['admin_logged_in'] = True
             session['username'] = username
             session['is_demo'] = False
+            session['tenant'] = tenancy.current_tenant()
             # Log successful login
             log_ip_activity('login_success', f"User: {username}")
             # Send login notification
@@ -995,12 +1870,14 @@ def dashboard_login():
             flash('Login successful', 'success')
             return redirect(url_for('dashboard'))
         # Check demo user credentials (LIVE DEMO EDITION)
-        elif (username == DEMO_USER_CREDENTIALS['username']
+        elif (demo_login_enabled() and username == DEMO_USER_CREDENTIALS['username']
                 and password and check_password_hash(
-                    DEMO_USER_CREDENTIALS['password_hash'], password)):
+                    password_hash(DEMO_USER_CREDENTIALS), password)):
             session['admin_logged_in'] = True
             session['username'] = username
             session['is_demo'] = True
+            session['tenant'] = tenancy.current_tenant()
+            session['demo_sandbox'] = sandbox.new_sandbox_id()
             # Log demo login
             log_ip_activity('login_success', f"Demo User: {username}")
             flash('✓ Demo login successful - Some features are disabled', 'info')
@@ -1016,6 +1893,8 @@ def dashboard_login():
 @app.route('/dashboard/logout')
 def dashboard_logout():
     """Admin logout"""
+    if session.get('demo_sandbox'):
+        sandbox.discard(session['demo_sandbox'])
     session.clear()
     flash('Logout successful', 'success')
     return redirect(url_for('dashboard_login'))
@@ -1032,7 +1911,7 @@ def dashboard():
         'messages': len(data.get('messages', [])),
         'unread_messages': get_unread_messages_count(),
         'visitors': get_visitor_count(),
-        'today_visitors': len(data.get('visitors', {}).get('today', []))
+        'today_visitors': len(visitor_counters().get('today', []))
     }
     return render_template('dashboard/index.html', data=data, stats=stats)
 
@@ -1048,8 +1927,65 @@ def documentation():
         return render_template('404.html'), 404
 
 
+@app.route('/dashboard/profiles')
+@login_required
+def dashboard_profiles():
+    """List profiled requests, slowest first"""
+    return render_template('dashboard/profiles.html',
+                           profiles=profiling.list_profiles(),
+                           profiling_enabled=profiling.PROFILING_ENABLED,
+                           sample_rate=profiling.PROFILE_SAMPLE_RATE)
+
+
+@app.route('/dashboard/jobs')
+@login_required
+def dashboard_jobs():
+    """Background job queue status, recent jobs and dead letters"""
+    status = request.args.get('status', '')
+    queue = request.args.get('queue', '')
+    if status not in jobs.STATUSES:
+        status = ''
+    tenant = tenancy.current_tenant()
+    return render_template('dashboard/jobs.html',
+                           stats=jobs.queue_stats(tenant=tenant),
+                           recent_jobs=jobs.list_jobs(status=status or None, queue=queue or None,
+                                                      tenant=tenant),
+                           dead_letters=jobs.dead_letters(tenant=tenant),
+                           statuses=jobs.STATUSES,
+                           status=status,
+                           queue=queue,
+                           pending_messages=len(journal.pending_messages()))
+
+
+@app.route('/dashboard/jobs/retry/<job_id>', methods=['POST'])
+@login_required
+def dashboard_jobs_retry(job_id):
+    """Queue a dead-lettered job again"""
+    if session.get('is_demo'):
+        flash('⚠️ Demo mode: Job management is disabled.', 'warning')
+    elif jobs.retry_dead_letter(job_id, tenant=tenancy.current_tenant()):
+        flash('✓ Job queued again', 'success')
+    else:
+        flash('Job not found', 'error')
+    return redirect(url_for('dashboard_jobs'))
+
+
+@app.route('/dashboard/jobs/delete/<job_id>', methods=['POST'])
+@login_required
+def dashboard_jobs_delete(job_id):
+    """Drop a dead-lettered job"""
+    if session.get('is_demo'):
+        flash('⚠️ Demo mode: Job management is disabled.', 'warning')
+    elif jobs.pop_dead_letter(job_id, tenant=tenancy.current_tenant()):
+        flash('✓ Job removed', 'success')
+    else:
+        flash('Job not found', 'error')
+    return redirect(url_for('dashboard_jobs'))
+
+
 @app.route('/dashboard/settings', methods=['GET', 'POST'])
 @login_required
+@data_writer
 def dashboard_settings():
     """Dashboard settings page"""
     data = load_data()
@@ -1059,10 +1995,10 @@ def dashboard_settings():
             data['settings'] = {}
         
         selected_theme = request.form.get('theme', 'luxury-gold')
-        valid_themes = ['luxury-gold', 'modern-dark', 'clean-light', 'terracotta-red', 'vibrant-green', 'silver-grey']
-        if selected_theme in valid_themes:
+        if selected_theme in VALID_THEMES:
             data['settings']['theme'] = selected_theme
             save_data(data)
+            queue_public_renders()
             flash(f'Theme changed to {selected_theme.replace("-", " ").title()} successfully', 'success')
         else:
             flash('Invalid theme selected', 'error')
@@ -1119,6 +2055,8 @@ def dashboard_telegram():
     if not bot_token or not chat_id:
         flash('Please provide both Bot Token and Chat ID', 'error')
         return redirect(url_for('dashboard_settings'))
+
+    import requests
     
     try:
         # Test connection to Telegram API
@@ -1143,7 +2081,7 @@ def dashboard_telegram():
             return redirect(url_for('dashboard_settings'))
         
         # Save to file since we can't modify env vars directly
-        settings_file = 'telegram_config.json'
+        settings_file = tenancy.tenant_path(TELEGRAM_CONFIG_FILE)
         telegram_config = {
             'bot_token': bot_token,
             'chat_id': chat_id,
@@ -1152,6 +2090,7 @@ def dashboard_telegram():
         
         with open(settings_file, 'w') as f:
             json.dump(telegram_config, f)
+        publish_change('config')
         
         flash('✅ Telegram notifications configured successfully! Check your Telegram for a test message.', 'success')
         
@@ -1262,6 +2201,8 @@ def telegram_test_connection():
         return jsonify({'success': False, 'error': 'Telegram not configured'})
     
     try:
+        import requests
+
         # Send test message
         test_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
         test_payload = {
@@ -1282,6 +2223,7 @@ def telegram_test_connection():
 
 @app.route('/dashboard/general', methods=['GET', 'POST'])
 @login_required
+@data_writer
 def dashboard_general():
     """Edit general information"""
     data = load_data()
@@ -1291,15 +2233,16 @@ def dashboard_general():
         data['title'] = request.form.get('title', '')
         data['description'] = request.form.get('description', '')
 
-        if 'photo' in request.files:
+        # Demo uploads would land in production storage; they are ignored
+        if 'photo' in request.files and not session.get('is_demo'):
             file = request.files['photo']
             if file and file.filename and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
                 filename = f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                data['photo'] = f"static/assets/uploads/{filename}"
+                data['photo'] = save_upload(file, filename)
 
         save_data(data)
+        queue_public_renders()
         flash('General information saved successfully', 'success')
         return redirect(url_for('dashboard_general'))
 
@@ -1308,6 +2251,7 @@ def dashboard_general():
 
 @app.route('/dashboard/about', methods=['GET', 'POST'])
 @login_required
+@data_writer
 def dashboard_about():
     """Edit about section"""
     data = load_data()
@@ -1315,6 +2259,7 @@ def dashboard_about():
     if request.method == 'POST':
         data['about'] = request.form.get('about', '')
         save_data(data)
+        queue_public_renders()
         flash('About section saved successfully', 'success')
         return redirect(url_for('dashboard_about'))
 
@@ -1323,6 +2268,7 @@ def dashboard_about():
 
 @app.route('/dashboard/skills', methods=['GET', 'POST'])
 @login_required
+@data_writer
 def dashboard_skills():
     """Edit skills section"""
     data = load_data()
@@ -1334,16 +2280,14 @@ def dashboard_skills():
 
         for name, level in zip(skill_names, skill_levels):
             if name.strip():
-                skills.append({
-                    'name':
-                    name.strip(),
-                    'level':
-                    int(level)
-                    if level.isdigit() and 0 <= int(level) <= 100 else 0
-                })
+                skills.append(models.coerce('skills', {
+                    'name': name.strip(),
+                    'level': level
+                }))
 
         data['skills'] = skills
         save_data(data)
+        queue_public_renders()
         flash('Skills saved successfully', 'success')
         return redirect(url_for('dashboard_skills'))
 
@@ -1358,8 +2302,19 @@ def dashboard_projects():
     return render_template('dashboard/projects.html', data=data)
 
 
+def submitted_content_format():
+    """Content format picked in the project form"""
+    content_format = request.form.get('content_format', 'html')
+    if content_format not in content.CONTENT_FORMATS:
+        content_format = 'html'
+    if content_format == 'markdown' and not content.markdown_available():
+        flash('Markdown needs the markdown package; the content is shown as plain text.', 'warning')
+    return content_format
+
+
 @app.route('/dashboard/projects/add', methods=['GET', 'POST'])
 @login_required
+@data_writer
 def dashboard_add_project():
     """Add new project"""
     if request.method == 'POST':
@@ -1369,13 +2324,12 @@ def dashboard_add_project():
         new_id = max(project_ids) + 1 if project_ids else 1
 
         image_path = "static/assets/project-placeholder.svg"
-        if 'image' in request.files:
+        if 'image' in request.files and not session.get('is_demo'):
             file = request.files['image']
             if file and file.filename and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
                 filename = f"project_{new_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                image_path = f"static/assets/uploads/{filename}"
+                image_path = save_upload(file, filename)
 
         technologies = [
             tech.strip() for tech in request.form.getlist('technologies[]')
@@ -1383,24 +2337,31 @@ def dashboard_add_project():
         ]
         short_desc = request.form.get('short_description', '').strip()
         full_content = request.form.get('content', '').strip()
-
-        new_project = {
-            'id': new_id,
-            'title': request.form.get('title', '').strip(),
-            'short_description': short_desc,
-            'content': full_content,
-            'description': short_desc,
-            'image': image_path,
-            'demo_url': request.form.get('demo_url', '').strip() or '#',
-            'github_url': request.form.get('github_url', '').strip() or '#',
-            'technologies': technologies
-        }
+        content_format = submitted_content_format()
+
+        new_project = models.Project(
+            id=new_id,
+            title=request.form.get('title', '').strip(),
+            short_description=short_desc,
+            content=full_content,
+            content_format=content_format,
+            description=short_desc,
+            image=image_path,
+            demo_url=request.form.get('demo_url', '').strip() or '#',
+            github_url=request.form.get('github_url', '').strip() or '#',
+            technologies=technologies,
+            created_at=datetime.now().replace(microsecond=0),
+            updated_at=datetime.now().replace(microsecond=0)
+        ).to_dict()
+        # Sanitised HTML, excerpt and reading time, so views do no processing
+        content.apply(new_project, app.static_folder)
 
         if 'projects' not in data:
             data['projects'] = []
         data['projects'].append(new_project)
 
         save_data(data)
+        queue_public_renders()
         flash('Project added successfully', 'success')
         return redirect(url_for('dashboard_projects'))
 
@@ -1410,6 +2371,7 @@ def dashboard_add_project():
 @app.route('/dashboard/projects/edit/<int:project_id>',
            methods=['GET', 'POST'])
 @login_required
+@data_writer
 def dashboard_edit_project(project_id):
     """Edit existing project"""
     data = load_data()
@@ -1428,25 +2390,29 @@ def dashboard_edit_project(project_id):
         project['title'] = request.form.get('title', '').strip()
         project['short_description'] = short_desc
         project['content'] = full_content
+        project['content_format'] = submitted_content_format()
         project['description'] = short_desc
         project['demo_url'] = request.form.get('demo_url', '').strip() or '#'
         project['github_url'] = request.form.get('github_url',
                                                  '').strip() or '#'
 
-        if 'image' in request.files:
+        if 'image' in request.files and not session.get('is_demo'):
             file = request.files['image']
             if file and file.filename and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
                 filename = f"project_{project_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                project['image'] = f"static/assets/uploads/{filename}"
+                project['image'] = save_upload(file, filename)
 
         project['technologies'] = [
             tech.strip() for tech in request.form.getlist('technologies[]')
             if tech.strip()
         ]
+        project['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        content.apply(project, app.static_folder)
+        project.update(models.coerce('projects', project))
 
         save_data(data)
+        queue_public_renders()
         flash('Project updated successfully', 'success')
         return redirect(url_for('dashboard_projects'))
 
@@ -1455,6 +2421,7 @@ def dashboard_edit_project(project_id):
 
 @app.route('/dashboard/projects/delete/<int:project_id>')
 @login_required
+@data_writer
 def dashboard_delete_project(project_id):
     """Delete project"""
     data = load_data()
@@ -1462,12 +2429,14 @@ def dashboard_delete_project(project_id):
         p for p in data.get('projects', []) if p.get('id') != project_id
     ]
     save_data(data)
+    queue_public_renders()
     flash('Project deleted successfully', 'success')
     return redirect(url_for('dashboard_projects'))
 
 
 @app.route('/dashboard/contact', methods=['GET', 'POST'])
 @login_required
+@data_writer
 def dashboard_contact():
     """Edit contact information"""
     data = load_data()
@@ -1481,6 +2450,7 @@ def dashboard_contact():
         data['contact']['location'] = request.form.get('location', '')
 
         save_data(data)
+        queue_public_renders()
         flash('Contact information saved successfully', 'success')
         return redirect(url_for('dashboard_contact'))
 
@@ -1489,6 +2459,7 @@ def dashboard_contact():
 
 @app.route('/dashboard/social', methods=['GET', 'POST'])
 @login_required
+@data_writer
 def dashboard_social():
     """Edit social media links"""
     data = load_data()
@@ -1507,6 +2478,7 @@ def dashboard_social():
         data['social']['dribbble'] = request.form.get('dribbble', '')
 
         save_data(data)
+        queue_public_renders()
         flash('Social media links saved successfully', 'success')
         return redirect(url_for('dashboard_social'))
 
@@ -1547,6 +2519,7 @@ def dashboard_view_message(message_id):
 
 @app.route('/dashboard/messages/delete/<int:message_id>')
 @login_required
+@data_writer
 def dashboard_delete_message(message_id):
     """Delete message"""
     data = load_data()
@@ -1560,6 +2533,7 @@ def dashboard_delete_message(message_id):
 
 @app.route('/dashboard/messages/convert/<int:message_id>')
 @login_required
+@data_writer
 def dashboard_convert_message_to_client(message_id):
     """Convert message to client"""
     data = load_data()
@@ -1574,25 +2548,18 @@ def dashboard_convert_message_to_client(message_id):
     if 'clients' not in data:
         data['clients'] = []
 
-    client_ids = [c.get('id', 0) for c in data.get('clients', [])]
-    new_id = max(client_ids) + 1 if client_ids else 1
-
-    new_client = {
-        'id': new_id,
-        'name': message.get('name', ''),
-        'email': message.get('email', ''),
-        'phone': '',
-        'company': '',
-        'project_title': '',
-        'project_description': message.get('message', ''),
-        'status': 'lead',
-        'price': '',
-        'deadline': '',
-        'start_date': datetime.now().strftime('%Y-%m-%d'),
-        'notes': '',
-        'payment_status': 'pending',
-        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    }
+    new_id = next_record_id(data, 'clients')
+
+    new_client = models.Client(
+        id=new_id,
+        name=message.get('name', ''),
+        email=message.get('email', ''),
+        project_description=message.get('message', ''),
+        status='lead',
+        start_date=datetime.now().strftime('%Y-%m-%d'),
+        payment_status='pending',
+        created_at=datetime.now().replace(microsecond=0)
+    ).to_dict()
 
     data['clients'].append(new_client)
     save_data(data)
@@ -1601,8 +2568,83 @@ def dashboard_convert_message_to_client(message_id):
     return redirect(url_for('dashboard_edit_client', client_id=new_id))
 
 
+@app.route('/dashboard/archive')
+@login_required
+def dashboard_archive():
+    """Search archived messages and clients"""
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind', '')
+    if kind not in archive.ARCHIVE_KINDS:
+        kind = ''
+    month = request.args.get('month', '')
+    results = []
+    if query or kind or month:
+        results = archive.search_archive(query, kind or None, month or None)
+    return render_template('dashboard/archive.html',
+                           segments=archive.list_segments(),
+                           results=results,
+                           query=query,
+                           kind=kind,
+                           month=month,
+                           message_days=archive.ARCHIVE_MESSAGE_DAYS,
+                           client_days=archive.ARCHIVE_CLIENT_DAYS)
+
+
+@app.route('/dashboard/archive/run', methods=['POST'])
+@login_required
+def dashboard_archive_run():
+    """Archive old records now instead of waiting for the nightly job"""
+    if session.get('is_demo'):
+        flash('⚠️ Demo mode: Archiving is disabled.', 'warning')
+        return redirect(url_for('dashboard_archive'))
+
+    moved = archive_old_records()
+    if moved:
+        flash(f"✓ Archived {moved.get('messages', 0)} messages and {moved.get('clients', 0)} clients", 'success')
+    else:
+        flash('Nothing to archive', 'info')
+    return redirect(url_for('dashboard_archive'))
+
+
+@app.route('/dashboard/archive/restore/<kind>/<int:record_id>', methods=['POST'])
+@login_required
+@data_writer
+def dashboard_archive_restore(kind, record_id):
+    """Move an archived message or client back into data.json"""
+    if session.get('is_demo'):
+        flash('⚠️ Demo mode: Archive restore is disabled.', 'warning')
+        return redirect(url_for('dashboard_archive'))
+    if kind not in archive.ARCHIVE_KINDS:
+        flash('Unknown archive type', 'error')
+        return redirect(url_for('dashboard_archive'))
+
+    record = archive.find_record(kind, record_id)
+    if record is None:
+        flash('Archived record not found', 'error')
+        return redirect(url_for('dashboard_archive'))
+
+    data = load_data()
+    if not data:
+        # data.json could not be read (already flashed); keep the archived copy
+        return redirect(url_for('dashboard_archive'))
+    if not any(r.get('id') == record_id for r in data.get(kind, [])):
+        record['restored_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        data.setdefault(kind, []).append(record)
+        if not save_data(data):
+            # save_data flashed the error; the archive still holds the record
+            return redirect(url_for('dashboard_archive'))
+    # Only drop the archived copy once data.json has it again
+    archive.take_record(kind, record_id)
+
+    flash('✓ Record restored from the archive', 'success')
+    if kind == 'messages':
+        return redirect(url_for('dashboard_view_message', message_id=record_id))
+    return redirect(url_for('dashboard_view_client', client_id=record_id))
+
+
 @app.route('/dashboard/clients')
 @login_required
+@data_writer
 def dashboard_clients():
     """List all clients"""
     data = load_data()
@@ -1621,56 +2663,45 @@ def dashboard_clients():
 
 @app.route('/dashboard/clients/add', methods=['GET', 'POST'])
 @login_required
+@data_writer
 def dashboard_add_client():
     """Add new client"""
     if request.method == 'POST':
+        if not models.valid_price(request.form.get('price', '').strip()):
+            flash('Price must be a number such as 1500 or 1500.50', 'error')
+            return render_template('dashboard/add_client.html'), 400
         data = load_data()
 
         if 'clients' not in data:
             data['clients'] = []
 
-        client_ids = [c.get('id', 0) for c in data.get('clients', [])]
-        new_id = max(client_ids) + 1 if client_ids else 1
-
-        new_client = {
-            'id':
-            new_id,
-            'name':
-            request.form.get('name', '').strip(),
-            'email':
-            request.form.get('email', '').strip(),
-            'phone':
-            request.form.get('phone', '').strip(),
-            'company':
-            request.form.get('company', '').strip(),
-            'project_title':
-            request.form.get('project_title', '').strip(),
-            'project_description':
-            request.form.get('project_description', '').strip(),
-            'status':
-            request.form.get('status', 'lead'),
-            'price':
-            request.form.get('price', '').strip(),
-            'deadline':
-            request.form.get('deadline', '').strip(),
-            'start_date':
-            request.form.get('start_date', '').strip()
-            or datetime.now().strftime('%Y-%m-%d'),
-            'notes':
-            request.form.get('notes', '').strip(),
-            'payment_status':
-            request.form.get('payment_status', 'pending'),
-            'created_at':
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'status_updated_at':
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
+        new_id = next_record_id(data, 'clients')
+
+        now = datetime.now().replace(microsecond=0)
+        new_client = models.Client(
+            id=new_id,
+            name=request.form.get('name', '').strip(),
+            email=request.form.get('email', '').strip(),
+            phone=request.form.get('phone', '').strip(),
+            company=request.form.get('company', '').strip(),
+            project_title=request.form.get('project_title', '').strip(),
+            project_description=request.form.get('project_description', '').strip(),
+            status=request.form.get('status', 'lead'),
+            price=models.parse_price(request.form.get('price', '').strip()),
+            deadline=request.form.get('deadline', '').strip(),
+            start_date=request.form.get('start_date', '').strip()
+            or now.strftime('%Y-%m-%d'),
+            notes=request.form.get('notes', '').strip(),
+            payment_status=request.form.get('payment_status', 'pending'),
+            created_at=now,
+            status_updated_at=now
+        ).to_dict()
 
         data['clients'].append(new_client)
         save_data(data)
         
         # Send Telegram notification for new lead
-        send_telegram_notification(
+        send_telegram_notification_async(
             f"📊 <b>New Lead Added</b>\n\n"
             f"👤 {new_client['name']}\n"
             f"📧 {new_client['email']}\n"
@@ -1686,6 +2717,7 @@ def dashboard_add_client():
 
 @app.route('/dashboard/clients/edit/<int:client_id>', methods=['GET', 'POST'])
 @login_required
+@data_writer
 def dashboard_edit_client(client_id):
     """Edit existing client"""
     data = load_data()
@@ -1697,6 +2729,9 @@ def dashboard_edit_client(client_id):
         return redirect(url_for('dashboard_clients'))
 
     if request.method == 'POST':
+        if not models.valid_price(request.form.get('price', '').strip()):
+            flash('Price must be a number such as 1500 or 1500.50', 'error')
+            return render_template('dashboard/edit_client.html', client=client), 400
         old_status = client.get('status', 'lead')
         new_status = request.form.get('status', 'lead')
         
@@ -1723,7 +2758,7 @@ def dashboard_edit_client(client_id):
                 'in-progress': '⚙️',
                 'delivered': '✅'
             }
-            send_telegram_notification(
+            send_telegram_notification_async(
                 f"{status_emoji.get(new_status, '📊')} <b>Client Status Updated</b>\n\n"
                 f"👤 {client['name']}\n"
                 f"📋 {client['project_title']}\n"
@@ -1732,6 +2767,7 @@ def dashboard_edit_client(client_id):
                 f"📝 {client['notes'][:100] if client['notes'] else 'N/A'}"
             )
 
+        client.update(models.coerce('clients', client))
         save_data(data)
         flash('Client updated successfully', 'success')
         return redirect(url_for('dashboard_clients'))
@@ -1756,6 +2792,7 @@ def dashboard_view_client(client_id):
 
 @app.route('/dashboard/clients/delete/<int:client_id>')
 @login_required
+@data_writer
 def dashboard_delete_client(client_id):
     """Delete client"""
     data = load_data()
@@ -1777,12 +2814,21 @@ def dashboard_change_password():
         confirm_password = request.form.get('confirm_password')
 
         if not current_password or not check_password_hash(
-                ADMIN_CREDENTIALS['password_hash'], current_password):
+                password_hash(admin_credentials()), current_password):
             flash('Current password is incorrect', 'error')
         elif new_password != confirm_password:
             flash('New password and confirmation do not match', 'error')
         elif not new_password or len(new_password) < 8:
             flash('New password must be at least 8 characters long', 'error')
+        elif tenancy.current_tenant():
+            config = tenancy.load_config()
+            config['admin_password_hash'] = generate_password_hash(new_password)
+            tenancy.save_config(config)
+            publish_change('config')
+            flash('Password changed successfully. Please login again.',
+                  'success')
+            session.clear()
+            return redirect(url_for('dashboard_login'))
         else:
             ADMIN_CREDENTIALS['password_hash'] = generate_password_hash(
                 new_password)
@@ -1795,30 +2841,131 @@ def dashboard_change_password():
 
 
 @app.route('/cv-preview')
+@cached_page
 def cv_preview():
     """CV preview page"""
     data = load_data()
     return render_template('cv_preview.html', data=data)
 
 
+# Rendered CV PDFs, named by a digest of the data the CV shows
+CV_CACHE_DIR = os.environ.get('CV_CACHE_DIR', os.path.join('cache', 'cv'))
+CV_CACHE_KEEP = 5
+CV_FIELDS = ('name', 'title', 'description', 'photo', 'about', 'skills',
+             'projects', 'contact', 'social', 'settings')
+
+
+def cv_digest(data):
+    """Digest of the parts of data.json that appear on the CV"""
+    cv_data = {key: data.get(key) for key in CV_FIELDS}
+    return hashlib.sha256(serialization.dumps(cv_data)).hexdigest()[:16]
+
+
+def cv_cache_dir():
+    return tenancy.tenant_path(CV_CACHE_DIR)
+
+
+def cv_pdf_path(digest):
+    # Absolute: send_file resolves relative paths against the app, not the cwd
+    return os.path.abspath(os.path.join(cv_cache_dir(), f'cv-{digest}.pdf'))
+
+
+def render_cv_pdf(data, base_url):
+    """Render the CV to PDF bytes; needs a request context for url_for"""
+    import weasyprint
+
+    html_content = render_template('cv_preview.html',
+                                   data=data,
+                                   pdf_mode=True)
+    with metrics.timer('pdf_render_seconds'):
+        return weasyprint.HTML(string=html_content, base_url=base_url).write_pdf()
+
+
+def store_cv_pdf(digest, pdf):
+    """Cache a rendered CV, keeping the most recent few"""
+    os.makedirs(cv_cache_dir(), exist_ok=True)
+    path = cv_pdf_path(digest)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(pdf)
+    os.replace(tmp_path, path)
+    cached = sorted((os.path.join(cv_cache_dir(), name) for name in os.listdir(cv_cache_dir())
+                     if name.endswith('.pdf')), key=os.path.getmtime, reverse=True)
+    for old_path in cached[CV_CACHE_KEEP:]:
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+
+
+@jobs.task('render_cv_pdf', queue='maintenance', max_attempts=3)
+def render_cv_pdf_job(base_url):
+    """Pre-render the CV PDF so downloads are served from the cache"""
+    data = load_data()
+    digest = cv_digest(data)
+    if os.path.exists(cv_pdf_path(digest)):
+        return True
+    try:
+        with app.test_request_context(base_url=base_url):
+            pdf = render_cv_pdf(data, base_url)
+    except ImportError:
+        # Nothing to do without weasyprint; downloads report it
+        return True
+    store_cv_pdf(digest, pdf)
+    if export.STATIC_EXPORT:
+        # The export queued with the save may have run before the PDF existed
+        jobs.enqueue('export_site', base_url, idempotency_key=f"export:cv:{digest}")
+    return True
+
+
+def export_public_site(base_url):
+    """Write the public pages of the current data as static files"""
+    data = load_site_data()
+    return export.export_site(app, base_url, data, upload_folder(), cv_pdf_path(cv_digest(data)))
+
+
+@jobs.task('export_site', queue='maintenance', max_attempts=3)
+def export_site_job(base_url):
+    """Bring the static export up to date after a save"""
+    summary = export_public_site(base_url)
+    app.logger.info(f"Static export: {len(summary['written'])} files written")
+    return True
+
+
+def queue_public_renders():
+    """Queue a CV render (and static export) for the data just saved"""
+    if demo_sandbox_id():
+        return
+    try:
+        data_digest = cv_digest(load_data())
+        jobs.enqueue('render_cv_pdf', request.url_root, delay=5,
+                     idempotency_key=f"cv:{data_digest}")
+        if export.STATIC_EXPORT:
+            jobs.enqueue('export_site', request.url_root, delay=5,
+                         idempotency_key=f"export:{':'.join(map(str, data_version() or ()))}")
+    except Exception as e:
+        app.logger.error(f"Error queueing CV render: {str(e)}")
+
+
 @app.route('/download-cv')
 def download_cv():
     """Download CV as PDF"""
     try:
-        import weasyprint
-
         data = load_data()
-        html_content = render_template('cv_preview.html',
-                                       data=data,
-                                       pdf_mode=True)
-
-        pdf_buffer = io.BytesIO()
-        html = weasyprint.HTML(string=html_content, base_url=request.url_root)
-        html.write_pdf(pdf_buffer)
-        pdf_buffer.seek(0)
-
         filename = data.get("name", "CV").replace(' ', '_')
-        return send_file(pdf_buffer,
+        digest = cv_digest(data)
+
+        # Pre-rendered by the render_cv_pdf job after dashboard edits
+        if os.path.exists(cv_pdf_path(digest)):
+            return send_file(cv_pdf_path(digest),
+                             mimetype='application/pdf',
+                             as_attachment=True,
+                             download_name=f'{filename}_CV.pdf')
+
+        pdf = render_cv_pdf(data, request.url_root)
+        if not demo_sandbox_id():
+            store_cv_pdf(digest, pdf)
+        return send_file(io.BytesIO(pdf),
                          mimetype='application/pdf',
                          as_attachment=True,
                          download_name=f'{filename}_CV.pdf')
@@ -1836,4 +2983,7 @@ def download_cv():
 
 if __name__ == '__main__':
     debug_mode = os.environ.get('FLASK_ENV') == 'development'
+    # Under gunicorn these run from the hooks in gunicorn.conf.py
+    start_scheduler()
+    start_background_services()
     app.run(host='0.0.0.0', port=5000, debug=debug_mode)
@@ -0,0 +1,216 @@
+"""Monthly gzip archive segments for old messages and finished clients.
+
+Read messages older than ``ARCHIVE_MESSAGE_DAYS`` and clients that have
+been delivered/completed for ``ARCHIVE_CLIENT_DAYS`` move out of data.json
+into ``<ARCHIVE_DIR>/<kind>-<YYYY-MM>.json.gz``. ``index.json`` keeps the
+record count of each segment and the highest id ever archived per kind,
+so ids of new records never collide with archived ones. Segments stay
+searchable and single records can be restored into data.json.
+"""
+import os
+import uuid
+import gzip
+import fcntl
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+
+import serialization
+import tenancy
+from models import parse_datetime
+
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', 'archive')
+ARCHIVE_MESSAGE_DAYS = int(os.environ.get('ARCHIVE_MESSAGE_DAYS', 90))
+ARCHIVE_CLIENT_DAYS = int(os.environ.get('ARCHIVE_CLIENT_DAYS', 30))
+ARCHIVE_CLIENT_STATUSES = ('delivered', 'completed')
+INDEX_FILE = 'index.json'
+LOCK_FILE = '.archive.lock'
+
+# kind: field holding the record's date
+ARCHIVE_KINDS = {
+    'messages': 'date',
+    'clients': 'status_updated_at'
+}
+
+
+def archive_dir():
+    """Archive directory of the current tenant"""
+    return tenancy.tenant_path(ARCHIVE_DIR)
+
+
+@contextmanager
+def archive_lock():
+    """Serialise archive writers across threads and worker processes"""
+    directory = archive_dir()
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def record_datetime(kind, record):
+    """When a record was sent or last changed status, or None"""
+    value = parse_datetime(record.get(ARCHIVE_KINDS[kind]) or record.get('created_at'))
+    return value if isinstance(value, datetime) else None
+
+
+def archive_age_start(kind, record):
+    """Date the archive age counts from; a restore restarts the clock"""
+    when = record_datetime(kind, record)
+    restored = parse_datetime(record.get('restored_at'))
+    if isinstance(restored, datetime) and (when is None or restored > when):
+        return restored
+    return when
+
+
+def is_archivable(kind, record, now):
+    """Old read messages and clients finished long enough ago"""
+    when = archive_age_start(kind, record)
+    if when is None:
+        return False
+    if kind == 'messages':
+        return bool(record.get('read')) and when < now - timedelta(days=ARCHIVE_MESSAGE_DAYS)
+    return record.get('status') in ARCHIVE_CLIENT_STATUSES and \
+        when < now - timedelta(days=ARCHIVE_CLIENT_DAYS)
+
+
+def segment_filename(kind, month):
+    """Segment file name for a kind and YYYY-MM month"""
+    return f"{kind}-{month}.json.gz"
+
+
+def read_segment(kind, month):
+    """Records stored in a segment"""
+    try:
+        with gzip.open(os.path.join(archive_dir(), segment_filename(kind, month)), 'rb') as f:
+            return serialization.loads(f.read())
+    except FileNotFoundError:
+        return []
+
+
+def write_segment(kind, month, records):
+    """Replace a segment atomically; an empty segment is removed"""
+    path = os.path.join(archive_dir(), segment_filename(kind, month))
+    if not records:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with gzip.open(tmp_path, 'wb', compresslevel=9) as f:
+        f.write(serialization.dumps(records))
+    os.replace(tmp_path, path)
+
+
+def load_index():
+    """{'segments': {filename: {...}}, 'max_ids': {kind: id}}"""
+    try:
+        index = serialization.load_file(os.path.join(archive_dir(), INDEX_FILE))
+    except (FileNotFoundError, ValueError):
+        index = {}
+    index.setdefault('segments', {})
+    index.setdefault('max_ids', {})
+    return index
+
+
+def save_index(index):
+    """Write index.json atomically"""
+    serialization.dump_file(os.path.join(archive_dir(), INDEX_FILE), index)
+
+
+def max_archived_id(kind):
+    """Highest id ever archived for a kind (0 if none)"""
+    return load_index()['max_ids'].get(kind, 0)
+
+
+def archive_old_records(data, now=None):
+    """Move archivable records out of a loaded data.json into segments.
+
+    Returns {kind: moved count}. The caller saves ``data`` afterwards;
+    segments are written first so a crash in between leaves a duplicate
+    rather than losing records.
+    """
+    now = now or datetime.now()
+    moved = {}
+    with archive_lock():
+        index = load_index()
+        for kind in ARCHIVE_KINDS:
+            keep, by_month = [], {}
+            for record in data.get(kind, []):
+                if is_archivable(kind, record, now):
+                    by_month.setdefault(record_datetime(kind, record).strftime('%Y-%m'), []).append(record)
+                else:
+                    keep.append(record)
+            if not by_month:
+                continue
+
+            for month, records in by_month.items():
+                existing = read_segment(kind, month)
+                archived_ids = {r.get('id') for r in existing}
+                combined = existing + [r for r in records if r.get('id') not in archived_ids]
+                write_segment(kind, month, combined)
+                index['segments'][segment_filename(kind, month)] = {
+                    'kind': kind, 'month': month, 'count': len(combined)}
+                highest = max((r.get('id', 0) for r in records), default=0)
+                index['max_ids'][kind] = max(index['max_ids'].get(kind, 0), highest)
+
+            data[kind] = keep
+            moved[kind] = sum(len(records) for records in by_month.values())
+        if moved:
+            save_index(index)
+    return moved
+
+
+def list_segments():
+    """Segments newest month first"""
+    segments = load_index()['segments'].values()
+    return sorted(segments, key=lambda s: (s['month'], s['kind']), reverse=True)
+
+
+def search_archive(query='', kind=None, month=None, limit=200):
+    """Archived records whose text fields contain query, newest segments first"""
+    query = query.strip().lower()
+    results = []
+    for segment in list_segments():
+        if (kind and segment['kind'] != kind) or (month and segment['month'] != month):
+            continue
+        for record in read_segment(segment['kind'], segment['month']):
+            if query and not any(query in str(value).lower() for value in record.values()):
+                continue
+            results.append({'kind': segment['kind'], 'month': segment['month'], 'record': record})
+            if len(results) >= limit:
+                return results
+    return results
+
+
+def find_record(kind, record_id):
+    """An archived record by id, or None"""
+    for segment in list_segments():
+        if segment['kind'] != kind:
+            continue
+        for record in read_segment(kind, segment['month']):
+            if record.get('id') == record_id:
+                return record
+    return None
+
+
+def take_record(kind, record_id):
+    """Remove a record from its segment and return it, or None if not archived"""
+    with archive_lock():
+        index = load_index()
+        for filename, segment in list(index['segments'].items()):
+            if segment['kind'] != kind:
+                continue
+            records = read_segment(kind, segment['month'])
+            remaining = [r for r in records if r.get('id') != record_id]
+            if len(remaining) == len(records):
+                continue
+            write_segment(kind, segment['month'], remaining)
+            if remaining:
+                segment['count'] = len(remaining)
+            else:
+                del index['segments'][filename]
+            save_index(index)
+            return next(r for r in records if r.get('id') == record_id)
+    return None
@@ -0,0 +1,207 @@
+"""Static asset fingerprinting and cache-friendly static file serving.
+
+``url_for('static', filename='css/style.css')`` is rewritten to
+``/static/css/style.<hash>.css``. Fingerprinted URLs are served with a
+one-year ``immutable`` Cache-Control header, and precompressed ``.br`` /
+``.gz`` siblings produced by ``python assets.py`` are used when the client
+accepts them.
+"""
+import os
+import re
+import json
+import gzip
+import hashlib
+import mimetypes
+
+from flask import request, send_from_directory, abort
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSET_MANIFEST_NAME = 'asset-manifest.json'
+ASSET_HASH_LENGTH = 10
+ASSET_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+ASSET_DEFAULT_MAX_AGE = 60 * 60
+
+# Text assets worth precompressing; images and fonts are already compressed
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.xml', '.html', '.ico', '.map'}
+PRECOMPRESSED_ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+GENERATED_SUFFIXES = ('.gz', '.br')
+
+FINGERPRINT_PATTERN = re.compile(
+    r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{%d})(?P<ext>\.[A-Za-z0-9]+)$' % ASSET_HASH_LENGTH)
+
+# {relative_path: (mtime_ns, size, digest)}
+ASSET_DIGESTS = {}
+
+
+def file_digest(path):
+    """Compute the short content hash of a file"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()[:ASSET_HASH_LENGTH]
+
+
+def asset_digest(static_folder, filename):
+    """Get the content hash of a static file, cached until it changes on disk"""
+    path = safe_join(static_folder, filename)
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    cached = ASSET_DIGESTS.get(filename)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    digest = file_digest(path)
+    ASSET_DIGESTS[filename] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def fingerprinted_name(filename, digest):
+    """Insert the digest before the extension: css/style.css -> css/style.<digest>.css"""
+    stem, ext = os.path.splitext(filename)
+    if not ext:
+        return filename
+    return f"{stem}.{digest}{ext}"
+
+
+def split_fingerprint(filename):
+    """Split a fingerprinted name into (original_name, digest), or (None, None)"""
+    match = FINGERPRINT_PATTERN.match(filename)
+    if not match:
+        return None, None
+    return match.group('stem') + match.group('ext'), match.group('digest')
+
+
+def load_asset_manifest(static_folder):
+    """Preload digests computed at build time so workers skip hashing on boot"""
+    manifest_path = os.path.join(static_folder, ASSET_MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0
+
+    for filename, entry in manifest.get('assets', {}).items():
+        ASSET_DIGESTS[filename] = (entry['mtime_ns'], entry['size'], entry['digest'])
+    return len(manifest.get('assets', {}))
+
+
+def accepted_encodings():
+    """Content codings the client accepts, in our preference order"""
+    accept = request.accept_encodings
+    return [(coding, suffix) for coding, suffix in PRECOMPRESSED_ENCODINGS if accept[coding]]
+
+
+def init_assets(app):
+    """Install static URL fingerprinting and the caching static file view"""
+    static_folder = app.static_folder
+    load_asset_manifest(static_folder)
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint, values):
+        if endpoint != 'static' or not app.config.get('ASSET_FINGERPRINTING', True):
+            return
+        filename = values.get('filename')
+        if not filename:
+            return
+        digest = asset_digest(static_folder, filename)
+        if digest:
+            values['filename'] = fingerprinted_name(filename, digest)
+
+    def serve_static(filename):
+        """Serve static files, long-cached when requested by content hash"""
+        max_age = ASSET_DEFAULT_MAX_AGE
+        immutable = False
+
+        if not os.path.isfile(safe_join(static_folder, filename) or ''):
+            original, digest = split_fingerprint(filename)
+            if not original:
+                abort(404)
+            current = asset_digest(static_folder, original)
+            if current is None:
+                abort(404)
+            filename = original
+            # A stale hash still gets the current file, just not cached forever
+            immutable = current == digest
+
+        if immutable:
+            max_age = ASSET_IMMUTABLE_MAX_AGE
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        served_name, encoding = filename, None
+        if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            for coding, suffix in accepted_encodings():
+                candidate = safe_join(static_folder, filename + suffix)
+                # Ignore variants older than the source; they are from a previous build
+                if candidate and os.path.isfile(candidate) and \
+                        os.path.getmtime(candidate) >= os.path.getmtime(safe_join(static_folder, filename)):
+                    served_name, encoding = filename + suffix, coding
+                    break
+
+        response = send_from_directory(static_folder, served_name,
+                                       mimetype=mimetype, max_age=max_age)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        if immutable:
+            response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = serve_static
+
+
+def build_assets(static_folder):
+    """Hash every static file and write precompressed variants next to text assets"""
+    manifest = {'assets': {}}
+    compressed = 0
+
+    for root, dirs, files in os.walk(static_folder):
+        for name in sorted(files):
+            if name == ASSET_MANIFEST_NAME or name.endswith(GENERATED_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            stat = os.stat(path)
+            digest = file_digest(path)
+            manifest['assets'][filename] = {
+                'digest': digest,
+                'path': fingerprinted_name(filename, digest),
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size
+            }
+
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            with open(path, 'rb') as f:
+                content = f.read()
+            variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append(('.br', brotli.compress(content, quality=11)))
+            for suffix, body in variants:
+                # Only keep a variant when it actually saves bytes
+                if len(body) < len(content):
+                    with open(path + suffix, 'wb') as f:
+                        f.write(body)
+                    compressed += 1
+
+    with open(os.path.join(static_folder, ASSET_MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    return len(manifest['assets']), compressed
+
+
+if __name__ == '__main__':
+    total, compressed = build_assets(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+    print(f"Fingerprinted {total} static files, wrote {compressed} precompressed variants")
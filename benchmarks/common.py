@@ -0,0 +1,84 @@
+"""Shared helpers for the benchmark scripts."""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(durations, wall_time, errors=0):
+    """Latency percentiles (ms) and throughput for a list of durations in seconds"""
+    ordered = sorted(durations)
+    count = len(ordered)
+    return {
+        'count': count,
+        'errors': errors,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'mean_ms': round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        'throughput_per_s': round(count / wall_time, 2) if wall_time else 0.0
+    }
+
+
+def run_timed(func, iterations, time_budget):
+    """Call func repeatedly, stopping at iterations or after time_budget seconds"""
+    durations = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - call_started)
+        if time.perf_counter() - started > time_budget:
+            break
+    return summarize(durations, time.perf_counter() - started)
+
+
+def make_workspace(data, prefix='portfolio-bench-'):
+    """Temporary working directory holding data.json plus empty backups/ and security/"""
+    workspace = tempfile.mkdtemp(prefix=prefix)
+    os.makedirs(os.path.join(workspace, 'backups'), exist_ok=True)
+    os.makedirs(os.path.join(workspace, 'security'), exist_ok=True)
+    os.makedirs(os.path.join(workspace, 'static', 'assets', 'uploads'), exist_ok=True)
+    with open(os.path.join(workspace, 'data.json'), 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return workspace
+
+
+def remove_workspace(workspace):
+    """Delete a workspace created by make_workspace()"""
+    shutil.rmtree(workspace, ignore_errors=True)
+
+
+def parse_scales(value):
+    """'10,1k,100k' -> [10, 1000, 100000]"""
+    scales = []
+    for part in value.split(','):
+        part = part.strip().lower()
+        if part.endswith('k'):
+            scales.append(int(float(part[:-1]) * 1000))
+        elif part:
+            scales.append(int(part))
+    return scales
+
+
+def write_results(results, output):
+    """Print results as JSON and optionally save them for later comparison"""
+    text = json.dumps(results, indent=2)
+    print(text)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
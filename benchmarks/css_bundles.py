@@ -0,0 +1,130 @@
+"""Compare stylesheet requests and bytes with and without theme bundles.
+
+Renders the public pages twice, once with the original separate
+stylesheets and once with the bundled/critical-CSS head, and reports the
+render-blocking requests, async requests and local CSS bytes as JSON.
+
+    python benchmarks/css_bundles.py
+"""
+import os
+import re
+import sys
+import json
+import gzip
+from html.parser import HTMLParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_PROJECT = {
+    'id': 1,
+    'title': 'Sample Project',
+    'short_description': 'Benchmark project',
+    'description': 'Benchmark project',
+    'content': '<p>Benchmark content</p>',
+    'image': 'static/assets/project-placeholder.svg',
+    'demo_url': '#',
+    'github_url': '#',
+    'technologies': ['Python', 'Flask']
+}
+
+
+class HeadStylesParser(HTMLParser):
+    """Collect stylesheet links and inline styles from a rendered page"""
+
+    def __init__(self):
+        super().__init__()
+        self.blocking = []
+        self.deferred = []
+        self.inline_bytes = 0
+        self.in_noscript = False
+        self.in_style = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'noscript':
+            self.in_noscript = True
+        elif tag == 'style':
+            self.in_style = True
+        elif tag == 'link' and not self.in_noscript:
+            rel = attrs.get('rel', '')
+            if rel == 'stylesheet':
+                self.blocking.append(attrs.get('href'))
+            elif rel == 'preload' and attrs.get('as') == 'style':
+                self.deferred.append(attrs.get('href'))
+
+    def handle_endtag(self, tag):
+        if tag == 'noscript':
+            self.in_noscript = False
+        elif tag == 'style':
+            self.in_style = False
+
+    def handle_data(self, data):
+        if self.in_style:
+            self.inline_bytes += len(data.encode('utf-8'))
+
+
+def local_css_bytes(app, hrefs):
+    """Raw and gzip size of stylesheets served from /static"""
+    from assets import split_fingerprint
+    raw = compressed = 0
+    for href in hrefs:
+        if not href or not href.startswith('/static/'):
+            continue
+        filename = href[len('/static/'):]
+        path = os.path.join(app.static_folder, filename)
+        if not os.path.isfile(path):
+            path = os.path.join(app.static_folder, split_fingerprint(filename)[0])
+        with open(path, 'rb') as f:
+            content = f.read()
+        raw += len(content)
+        compressed += len(gzip.compress(content))
+    return raw, compressed
+
+
+def measure(app, template, context, bundles):
+    """Render a page and summarise its stylesheet loading"""
+    from flask import render_template
+    app.config['CSS_BUNDLES'] = bundles
+    with app.test_request_context('/'):
+        html = render_template(template, **context)
+
+    head = html[:html.find('</head>')]
+    parser = HeadStylesParser()
+    parser.feed(head)
+    blocking_raw, blocking_gz = local_css_bytes(app, parser.blocking)
+    deferred_raw, deferred_gz = local_css_bytes(app, parser.deferred)
+    origins = {re.sub(r'^(https?://[^/]+).*$', r'\1', h) for h in parser.blocking + parser.deferred
+               if h and h.startswith('http')}
+    return {
+        'render_blocking_requests': len(parser.blocking),
+        'async_requests': len(parser.deferred),
+        'third_party_origins': len(origins),
+        'inline_css_bytes': parser.inline_bytes,
+        'blocking_local_css_bytes': blocking_raw,
+        'blocking_local_css_gzip_bytes': blocking_gz,
+        'async_local_css_bytes': deferred_raw,
+        'async_local_css_gzip_bytes': deferred_gz
+    }
+
+
+def main():
+    from css_bundles import build_css_bundles
+    from app import app, load_data
+    build_css_bundles()
+    data = load_data()
+    pages = {
+        'index': ('index.html', {'data': data}),
+        'project_detail': ('project_detail.html',
+                           {'data': data, 'project': (data.get('projects') or [SAMPLE_PROJECT])[0]})
+    }
+    results = {}
+    for page, (template, context) in pages.items():
+        results[page] = {
+            'before': measure(app, template, context, bundles=False),
+            'after': measure(app, template, context, bundles=True)
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Generate synthetic data.json documents at a given scale.
+
+    python benchmarks/datagen.py --scale 1000 --output /tmp/data-1k.json
+
+The scale is the number of messages, clients, visitor hits and projects.
+"""
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from common import parse_scales
+
+CLIENT_STATUSES = ['lead', 'negotiation', 'in-progress', 'delivered', 'active', 'completed', 'pending']
+TECHNOLOGIES = ['Python', 'Flask', 'JavaScript', 'React', 'PostgreSQL', 'Docker', 'CSS', 'Vue.js']
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+         'incididunt ut labore et dolore magna aliqua').split()
+
+
+def sentence(rng, words):
+    """Random filler text"""
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def generate_data(scale, seed=42):
+    """A data.json document with `scale` messages, clients, visitor hits and projects"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    today = now.strftime('%Y-%m-%d')
+
+    projects = []
+    for i in range(1, scale + 1):
+        created = now - timedelta(days=rng.randint(0, 900))
+        projects.append({
+            'id': i,
+            'title': f"Project {i}",
+            'short_description': sentence(rng, 12),
+            'content': '<p>' + ' '.join(sentence(rng, 15) for _ in range(6)) + '</p>',
+            'description': sentence(rng, 12),
+            'image': 'static/assets/project-placeholder.svg',
+            'demo_url': '#',
+            'github_url': f"https://github.com/example/project-{i}",
+            'technologies': rng.sample(TECHNOLOGIES, 3),
+            'created_at': created.strftime('%Y-%m-%d %H:%M:%S')
+        })
+
+    messages = []
+    for i in range(1, scale + 1):
+        sent = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+        messages.append({
+            'id': i,
+            'name': f"Visitor {i}",
+            'email': f"visitor{i}@example.com",
+            'message': sentence(rng, 30),
+            'date': sent.strftime('%Y-%m-%d %H:%M:%S'),
+            'read': rng.random() < 0.7,
+            'ip': f"10.{i % 256}.{(i // 256) % 256}.{rng.randint(1, 254)}"
+        })
+
+    clients = []
+    for i in range(1, scale + 1):
+        created = now - timedelta(days=rng.randint(0, 700))
+        clients.append({
+            'id': i,
+            'name': f"Client {i}",
+            'email': f"client{i}@example.com",
+            'phone': f"+1 555 {rng.randint(1000000, 9999999)}",
+            'company': f"Company {i % 97}",
+            'project_title': f"Engagement {i}",
+            'project_description': sentence(rng, 20),
+            'status': rng.choice(CLIENT_STATUSES),
+            'price': str(rng.randint(100, 20000)),
+            'deadline': (created + timedelta(days=60)).strftime('%Y-%m-%d'),
+            'start_date': created.strftime('%Y-%m-%d'),
+            'notes': sentence(rng, 10),
+            'payment_status': rng.choice(['pending', 'partial', 'completed']),
+            'created_at': created.strftime('%Y-%m-%d %H:%M:%S'),
+            'status_updated_at': created.strftime('%Y-%m-%d %H:%M:%S')
+        })
+
+    visits = []
+    for i in range(scale):
+        visits.append({
+            'ip': f"172.{i % 256}.{(i // 256) % 256}.{i % 250 + 1}",
+            'timestamp': f"{today} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+            'date': today
+        })
+
+    return {
+        'name': 'Benchmark Portfolio',
+        'title': 'Web Developer & Designer',
+        'description': 'Synthetic portfolio used by the benchmark suite',
+        'photo': 'static/assets/profile-placeholder.svg',
+        'about': sentence(rng, 60),
+        'skills': [{'name': tech, 'level': rng.randint(50, 100)} for tech in TECHNOLOGIES],
+        'projects': projects,
+        'contact': {'email': 'bench@example.com', 'phone': '+1 555 0100', 'location': 'Benchmark City'},
+        'social': {'github': 'https://github.com/example', 'linkedin': ''},
+        'messages': messages,
+        'visitors': {
+            'total': scale,
+            'today': visits,
+            'unique_ips': sorted({v['ip'] for v in visits})
+        },
+        'settings': {'theme': 'luxury-gold'},
+        'clients': clients
+    }
+
+
+if __name__ == '__main__':
+    import json
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='1000', help='records per collection, e.g. 10, 1k, 100k')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(generate_data(parse_scales(args.scale)[0], args.seed), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,254 @@
+"""Concurrent load test of the hot routes.
+
+Drives the app through Flask's WSGI test client (in-process) and/or a
+local gunicorn started on a free port, against a synthetic data.json in a
+temporary working directory. Reports p50/p95/p99 latency, throughput and
+error counts per route as JSON. Gunicorn runs once per ``--profiles``
+entry, so the shipped gunicorn.conf.py can be compared with the old
+Procfile and render.yaml commands.
+
+    python benchmarks/load.py --mode wsgi,gunicorn --scale 1k --concurrency 8 --requests 200
+    python benchmarks/load.py --mode gunicorn --profiles procfile,render,shipped
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import itertools
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from common import BASE_DIR, make_workspace, remove_workspace, summarize, parse_scales, write_results
+from datagen import generate_data
+
+ADMIN_USERNAME = 'bench-admin'
+ADMIN_PASSWORD = 'bench-admin-password'
+
+# name: (method, path, requires login)
+ROUTES = {
+    'index': ('GET', '/', False),
+    'contact': ('POST', '/contact', False),
+    'project_detail': ('GET', '/project/1', False),
+    'sitemap': ('GET', '/sitemap.xml', False),
+    'download_cv': ('GET', '/download-cv', False),
+    'dashboard': ('GET', '/dashboard', True),
+    'dashboard_messages': ('GET', '/dashboard/messages', True),
+    'dashboard_clients': ('GET', '/dashboard/clients', True),
+    'dashboard_projects': ('GET', '/dashboard/projects', True)
+}
+
+# name: gunicorn arguments; os.devnull keeps gunicorn.conf.py out of the old setups
+GUNICORN_PROFILES = {
+    'procfile': ['--config', os.devnull],
+    'render': ['--config', os.devnull, '--workers', '4', '--timeout', '120'],
+    'shipped': ['--config', os.path.join(BASE_DIR, 'gunicorn.conf.py')]
+}
+
+# Unique client addresses keep POST /contact under the per-IP rate limit
+ADDRESSES = itertools.count(1)
+ADDRESSES_LOCK = threading.Lock()
+
+
+def next_address():
+    """A fresh IP for X-Forwarded-For"""
+    with ADDRESSES_LOCK:
+        n = next(ADDRESSES)
+    return f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}"
+
+
+def contact_form(n):
+    """Form fields for a contact submission"""
+    return {'name': f"Load Test {n}", 'email': f"load{n}@example.com",
+            'message': 'Benchmark message sent by benchmarks/load.py', 'website': ''}
+
+
+def run_load(send, login, route_names, concurrency, total, warmup=5):
+    """Fire `total` requests per route from `concurrency` threads after `warmup` untimed ones"""
+    results = {}
+    # Threads log in once when they start, outside the timed requests
+    pool = ThreadPoolExecutor(max_workers=concurrency, initializer=login)
+    barrier = threading.Barrier(concurrency)
+    list(pool.map(lambda _: barrier.wait(), range(concurrency)))
+    for name in route_names:
+        for n in range(warmup):
+            send(name, total + n)
+        durations = []
+        errors = [0]
+        lock = threading.Lock()
+
+        def one(n, name=name):
+            started = time.perf_counter()
+            try:
+                ok = send(name, n)
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                durations.append(elapsed)
+                if not ok:
+                    errors[0] += 1
+
+        started = time.perf_counter()
+        list(pool.map(one, range(total)))
+        results[name] = summarize(durations, time.perf_counter() - started, errors[0])
+    pool.shutdown()
+    return results
+
+
+def is_success(name, status_code):
+    """5xx is always an error; a redirect on a dashboard page means the login was lost"""
+    if status_code >= 500:
+        return False
+    return not (ROUTES[name][2] and 300 <= status_code < 400)
+
+
+def wsgi_sender(app):
+    """(send, login) backed by one logged-in test client per thread"""
+    local = threading.local()
+
+    def login():
+        local.client = app.test_client()
+        local.client.post('/dashboard/login', base_url='https://localhost',
+                          data={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+
+    def client():
+        if not hasattr(local, 'client'):
+            login()
+        return local.client
+
+    def send(name, n):
+        method, path, _ = ROUTES[name]
+        environ = {'HTTP_X_FORWARDED_FOR': next_address()}
+        if method == 'POST':
+            response = client().post(path, base_url='https://localhost', data=contact_form(n),
+                                     environ_base=environ)
+        else:
+            response = client().get(path, base_url='https://localhost', environ_base=environ)
+        response.close()
+        return is_success(name, response.status_code)
+
+    return send, login
+
+
+def free_port():
+    """An unused local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(workspace, port, profile, workers, threads):
+    """Launch gunicorn serving app:app from the workspace; wait until it answers"""
+    command = [sys.executable, '-m', 'gunicorn'] + GUNICORN_PROFILES[profile] + [
+        '--chdir', workspace, '--pythonpath', BASE_DIR, '--bind', f"127.0.0.1:{port}",
+        '--log-level', 'warning', 'app:app']
+    # The shipped config reads its sizing from the environment
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads))
+    process = subprocess.Popen(command, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start within 30 seconds')
+
+
+def http_sender(base_url):
+    """(send, login) backed by one logged-in requests session per thread"""
+    import requests
+    local = threading.local()
+
+    def login():
+        local.session = requests.Session()
+        response = local.session.post(f"{base_url}/dashboard/login", allow_redirects=False,
+                                      data={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+        # The session cookie is Secure; send it explicitly over plain HTTP
+        cookie = response.cookies.get('session')
+        if cookie:
+            local.session.headers['Cookie'] = f"session={cookie}"
+
+    def session():
+        if not hasattr(local, 'session'):
+            login()
+        return local.session
+
+    def send(name, n):
+        method, path, _ = ROUTES[name]
+        headers = {'X-Forwarded-For': next_address()}
+        if method == 'POST':
+            response = session().post(base_url + path, data=contact_form(n), headers=headers,
+                                      allow_redirects=False, timeout=60)
+        else:
+            response = session().get(base_url + path, headers=headers, allow_redirects=False, timeout=60)
+        return is_success(name, response.status_code)
+
+    return send, login
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', default='wsgi,gunicorn', help='wsgi, gunicorn or both')
+    parser.add_argument('--scale', default='1k', help='records per collection in data.json')
+    parser.add_argument('--routes', default=','.join(ROUTES), help='comma separated route names')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--warmup', type=int, default=5, help='untimed requests per route first')
+    parser.add_argument('--profiles', default='shipped',
+                        help=f"gunicorn setups to compare: {', '.join(GUNICORN_PROFILES)}")
+    parser.add_argument('--workers', type=int, default=2, help='worker processes for the shipped profile')
+    parser.add_argument('--threads', type=int, default=4, help='threads per worker for the shipped profile')
+    parser.add_argument('--output', help='also write the JSON results to this file')
+    args = parser.parse_args()
+
+    scale = parse_scales(args.scale)[0]
+    route_names = [r for r in args.routes.split(',') if r in ROUTES]
+    modes = [m.strip() for m in args.mode.split(',') if m.strip()]
+    os.environ['ADMIN_USERNAME'] = ADMIN_USERNAME
+    os.environ['ADMIN_PASSWORD'] = ADMIN_PASSWORD
+
+    results = {'scale': scale, 'concurrency': args.concurrency,
+               'requests_per_route': args.requests, 'modes': {}}
+
+    if 'wsgi' in modes:
+        workspace = make_workspace(generate_data(scale))
+        original_cwd = os.getcwd()
+        os.chdir(workspace)
+        try:
+            import app as app_module
+            results['modes']['wsgi'] = run_load(*wsgi_sender(app_module.app), route_names,
+                                                args.concurrency, args.requests, args.warmup)
+        finally:
+            os.chdir(original_cwd)
+            remove_workspace(workspace)
+
+    if 'gunicorn' in modes:
+        results['modes']['gunicorn'] = {}
+        for profile in [p.strip() for p in args.profiles.split(',') if p.strip() in GUNICORN_PROFILES]:
+            workspace = make_workspace(generate_data(scale))
+            port = free_port()
+            try:
+                process = start_gunicorn(workspace, port, profile, args.workers, args.threads)
+            except (RuntimeError, OSError) as e:
+                results['modes']['gunicorn'][profile] = {'error': str(e)}
+            else:
+                try:
+                    results['modes']['gunicorn'][profile] = run_load(
+                        *http_sender(f"http://127.0.0.1:{port}"), route_names,
+                        args.concurrency, args.requests, args.warmup)
+                finally:
+                    process.terminate()
+                    process.wait(timeout=30)
+            remove_workspace(workspace)
+
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
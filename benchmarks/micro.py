@@ -0,0 +1,92 @@
+"""Micro-benchmarks for the storage and request helpers in app.py.
+
+Each scale runs against its own synthetic data.json in a temporary
+working directory, so the real data, backups and security logs are never
+touched. Results are printed as JSON (and optionally written to a file)
+with p50/p95/p99 latencies and calls per second.
+
+    python benchmarks/micro.py --scales 10,1k,100k --output micro.json
+"""
+import os
+import time
+import argparse
+
+from common import make_workspace, remove_workspace, run_timed, parse_scales, write_results
+from datagen import generate_data
+
+BENCHMARKS = ['load_data', 'save_data', 'track_visitor', 'check_rate_limit',
+              'get_clients_stats', 'create_backup']
+
+
+def bench_scale(app_module, scale, iterations, time_budget):
+    """Run every micro-benchmark against a data.json of the given scale"""
+    app = app_module.app
+    data = generate_data(scale)
+    workspace = make_workspace(data)
+    original_cwd = os.getcwd()
+    os.chdir(workspace)
+    try:
+        results = {'data_json_bytes': os.path.getsize('data.json')}
+
+        results['load_data'] = run_timed(app_module.load_data, iterations, time_budget)
+
+        loaded = app_module.load_data()
+        with app.test_request_context('/'):
+            results['save_data'] = run_timed(lambda: app_module.save_data(loaded), iterations, time_budget)
+
+        with app.test_request_context('/', environ_base={'REMOTE_ADDR': '198.51.100.7'}):
+            results['track_visitor'] = run_timed(app_module.track_visitor, iterations, time_budget)
+
+        # One tracked IP per record, each with a partly filled window
+        now = time.time()
+        app_module.RATE_LIMIT_REQUESTS.clear()
+        for i in range(scale):
+            app_module.RATE_LIMIT_REQUESTS[f"203.0.{i // 256 % 256}.{i % 256}"] = [
+                (now - j, 'contact') for j in range(i % app_module.RATE_LIMIT_MAX_REQUESTS)]
+        with app.test_request_context('/') as ctx:
+            counter = [0]
+
+            def check():
+                counter[0] += 1
+                i = counter[0] % max(scale, 1)
+                ctx.request.environ['REMOTE_ADDR'] = f"203.0.{i // 256 % 256}.{i % 256}"
+                app_module.check_rate_limit('contact')
+
+            results['check_rate_limit'] = run_timed(check, iterations, time_budget)
+        app_module.RATE_LIMIT_REQUESTS.clear()
+
+        results['get_clients_stats'] = run_timed(app_module.get_clients_stats, iterations, time_budget)
+
+        with app.app_context():
+            results['create_backup'] = run_timed(app_module.create_backup, iterations, time_budget)
+        return results
+    finally:
+        os.chdir(original_cwd)
+        remove_workspace(workspace)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='10,1k,100k', help='comma separated record counts')
+    parser.add_argument('--iterations', type=int, default=200, help='max calls per benchmark')
+    parser.add_argument('--time-budget', type=float, default=10.0,
+                        help='stop a benchmark after this many seconds')
+    parser.add_argument('--output', help='also write the JSON results to this file')
+    args = parser.parse_args()
+
+    # app.py creates its folders relative to the working directory on import
+    scratch = make_workspace(generate_data(0))
+    os.chdir(scratch)
+    import app as app_module
+
+    results = {'benchmarks': BENCHMARKS, 'iterations': args.iterations, 'scales': {}}
+    try:
+        for scale in parse_scales(args.scales):
+            results['scales'][str(scale)] = bench_scale(app_module, scale, args.iterations, args.time_budget)
+    finally:
+        remove_workspace(scratch)
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
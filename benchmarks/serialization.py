@@ -0,0 +1,68 @@
+"""Compare JSON backends and the indented vs compact on-disk format.
+
+For each scale, parses and serialises a synthetic data.json with every
+installed backend and reports timings plus file sizes as JSON.
+
+    python benchmarks/serialization.py --scales 10,1k,100k
+"""
+import json
+import argparse
+
+from common import run_timed, parse_scales, write_results
+from datagen import generate_data
+
+
+def backends():
+    """{name: (loads, dumps_compact)} for every installed backend"""
+    available = {
+        'json': (json.loads,
+                 lambda obj: json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    }
+    try:
+        import orjson
+        available['orjson'] = (orjson.loads, lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS))
+    except ImportError:
+        pass
+    try:
+        import msgspec
+        available['msgspec'] = (msgspec.json.Decoder().decode, msgspec.json.Encoder().encode)
+    except ImportError:
+        pass
+    return available
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='10,1k,100k', help='comma separated record counts')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--time-budget', type=float, default=10.0)
+    parser.add_argument('--output', help='also write the JSON results to this file')
+    args = parser.parse_args()
+
+    results = {'scales': {}}
+    for scale in parse_scales(args.scales):
+        data = generate_data(scale)
+        indented = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        scale_results = {
+            'indented_bytes': len(indented),
+            'indented_json_dumps': run_timed(
+                lambda: json.dumps(data, ensure_ascii=False, indent=2), args.iterations, args.time_budget)
+        }
+        available = backends()
+        reference = available['json'][1](data)
+        for name, (loads, dumps) in available.items():
+            compact = dumps(data)
+            assert loads(compact) == data == loads(indented)
+            scale_results[name] = {
+                'compact_bytes': len(compact),
+                'identical_to_stdlib': compact == reference,
+                'serialize': run_timed(lambda: dumps(data), args.iterations, args.time_budget),
+                'parse_compact': run_timed(lambda: loads(compact), args.iterations, args.time_budget),
+                'parse_indented': run_timed(lambda: loads(indented), args.iterations, args.time_budget)
+            }
+        results['scales'][str(scale)] = scale_results
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Startup benchmark: import time of app.py and gunicorn worker boot time.
+
+Each import is measured in a fresh interpreter (inside a temporary
+working directory with a synthetic data.json), so module caches never
+carry over. Worker boot is the time from launching gunicorn with
+gunicorn.conf.py until the first request to / succeeds. ``--importtime``
+adds the slowest modules from ``python -X importtime``.
+
+    python benchmarks/startup.py --runs 10 --scale 1k --importtime
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+import urllib.request
+import urllib.error
+
+from common import BASE_DIR, make_workspace, remove_workspace, summarize, parse_scales, write_results
+from datagen import generate_data
+from load import free_port
+
+IMPORT_SNIPPET = (
+    "import sys, time; sys.path.insert(0, {base!r}); started = time.perf_counter(); "
+    "import app; print(time.perf_counter() - started)"
+)
+
+
+def measure_import(workspace, runs):
+    """Seconds spent in `import app`, one fresh interpreter per run"""
+    durations = []
+    started = time.perf_counter()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SNIPPET.format(base=BASE_DIR)],
+                                cwd=workspace, capture_output=True, text=True, check=True)
+        durations.append(float(output.stdout.strip().splitlines()[-1]))
+    return summarize(durations, time.perf_counter() - started)
+
+
+def slowest_imports(workspace, limit=15):
+    """Modules with the highest cumulative import time (microseconds)"""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                             IMPORT_SNIPPET.format(base=BASE_DIR)],
+                            cwd=workspace, capture_output=True, text=True, check=True)
+    rows = []
+    for line in output.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        rows.append({'module': name.strip(), 'cumulative_us': int(cumulative)})
+    return sorted(rows, key=lambda row: row['cumulative_us'], reverse=True)[:limit]
+
+
+def wait_until_serving(process, url, timeout=60):
+    """Poll url until it answers 200; returns False if gunicorn exits or times out"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.02)
+    return False
+
+
+def measure_worker_boot(workspace, runs, workers):
+    """Seconds from launching gunicorn to the first successful request"""
+    durations = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(runs):
+        port = free_port()
+        command = [sys.executable, '-m', 'gunicorn', '--config', os.path.join(BASE_DIR, 'gunicorn.conf.py'),
+                   '--chdir', workspace, '--pythonpath', BASE_DIR, '--bind', f"127.0.0.1:{port}",
+                   '--workers', str(workers), '--log-level', 'warning', 'app:app']
+        launched = time.perf_counter()
+        process = subprocess.Popen(command, env=os.environ.copy())
+        try:
+            if wait_until_serving(process, f"http://127.0.0.1:{port}/"):
+                durations.append(time.perf_counter() - launched)
+            else:
+                errors += 1
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    if not durations:
+        return {'error': 'gunicorn did not serve a request (is it installed?)', 'errors': errors}
+    result = summarize(durations, time.perf_counter() - started, errors)
+    result['workers'] = workers
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='imports and gunicorn launches to time')
+    parser.add_argument('--scale', default='1k', help='records per collection in data.json')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--skip-gunicorn', action='store_true', help='only measure the import')
+    parser.add_argument('--importtime', action='store_true', help='list the slowest imported modules')
+    parser.add_argument('--output', help='also write the JSON results to this file')
+    args = parser.parse_args()
+
+    scale = parse_scales(args.scale)[0]
+    workspace = make_workspace(generate_data(scale))
+    results = {'scale': scale, 'runs': args.runs}
+    try:
+        results['import_app'] = measure_import(workspace, args.runs)
+        if args.importtime:
+            results['slowest_imports'] = slowest_imports(workspace)
+        if not args.skip_gunicorn:
+            try:
+                results['worker_boot'] = measure_worker_boot(workspace, args.runs, args.workers)
+            except OSError as e:
+                results['worker_boot'] = {'error': str(e)}
+    finally:
+        remove_workspace(workspace)
+
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,4 +9,18 @@ pip install -r requirements.txt
 # Create uploads directory if it doesn't exist
 mkdir -p static/assets/uploads
 
+# Self-host subsetted Bootstrap, Font Awesome and Poppins. Seeding needs
+# network access; with an already seeded vendor_cache/ the build is offline.
+python vendor_assets.py seed || echo "Could not seed vendor assets; using existing cache"
+python vendor_assets.py build
+
+# Bundle theme CSS and extract critical CSS for public pages
+python css_bundles.py
+
+# Fingerprint static assets and precompress text assets
+python assets.py
+
+# Compile templates into the bytecode cache shared by the workers
+python template_cache.py
+
 echo "Build completed successfully!"
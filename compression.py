@@ -0,0 +1,264 @@
+"""WSGI middleware that compresses responses with brotli or gzip.
+
+Small bodies, non-text types (JPEG, PDF, fonts...) and responses that are
+already encoded pass through untouched. Responses of unknown length or
+larger than ``stream_threshold`` are compressed chunk by chunk as they are
+produced. Bodies of cacheable responses that carry an ETag are kept in a
+bounded LRU keyed by (path, ETag, coding), so a repeat hit is served
+without compressing again.
+"""
+import zlib
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'application/xml',
+    'application/rss+xml', 'application/atom+xml', 'application/manifest+json',
+    'image/svg+xml', 'image/x-icon'
+}
+
+
+def is_compressible(content_type):
+    """Text-like content types that benefit from compression"""
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def negotiate_encoding(accept_encoding, brotli_enabled=True):
+    """Pick br or gzip from an Accept-Encoding header, or None"""
+    accepted = {}
+    for part in (accept_encoding or '').lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding] = quality
+
+    if brotli_enabled and brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        return 'gzip'
+    return None
+
+
+def new_compressor(coding, level):
+    """Streaming compressor exposing compress()/flush()"""
+    if coding == 'br':
+        return brotli.Compressor(quality=min(level, 11))
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def compress_body(body, coding, level):
+    """Compress a complete body in one go"""
+    compressor = new_compressor(coding, level)
+    if coding == 'br':
+        return compressor.process(body) + compressor.finish()
+    return compressor.compress(body) + compressor.flush()
+
+
+class CompressedBodyCache:
+    """Byte-bounded LRU of compressed bodies"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+            self.entries[key] = body
+            self.current_bytes += len(body)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+
+class CompressionMiddleware:
+    """Negotiate and apply Content-Encoding for responses from a WSGI app"""
+
+    def __init__(self, app, min_size=500, level=6, stream_threshold=256 * 1024,
+                 cache_max_bytes=32 * 1024 * 1024, brotli_enabled=True):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.stream_threshold = stream_threshold
+        self.brotli_enabled = brotli_enabled
+        self.cache = CompressedBodyCache(cache_max_bytes)
+
+    def __call__(self, environ, start_response):
+        coding = negotiate_encoding(environ.get('HTTP_ACCEPT_ENCODING'), self.brotli_enabled)
+        if coding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        captured = {}
+        written = []
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = headers
+            captured['exc_info'] = exc_info
+            return written.append
+
+        app_iter = self.app(environ, capture_start_response)
+        status = captured.get('status', '500 INTERNAL SERVER ERROR')
+        headers = captured.get('headers', [])
+
+        if not self.should_compress(status, headers):
+            return self.passthrough(start_response, captured, app_iter, written)
+
+        header_map = {name.lower(): value for name, value in headers}
+        length = header_map.get('content-length')
+        length = int(length) if length and length.isdigit() else None
+        etag = header_map.get('etag')
+        cache_key = None
+        if etag and self.is_cacheable(status, header_map):
+            cache_key = (environ.get('PATH_INFO', ''), etag, coding)
+
+        if length is not None and length < self.min_size:
+            return self.passthrough(start_response, captured, app_iter, written)
+
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                close_iter(app_iter)
+                start_response(status, self.encoded_headers(headers, coding, len(cached)),
+                               captured.get('exc_info'))
+                return [cached]
+
+        if length is None or length > self.stream_threshold:
+            start_response(status, self.encoded_headers(headers, coding, None),
+                           captured.get('exc_info'))
+            return self.stream(app_iter, written, coding, cache_key)
+
+        body = b''.join(written) + b''.join(app_iter)
+        close_iter(app_iter)
+        if len(body) < self.min_size:
+            start_response(status, headers, captured.get('exc_info'))
+            return [body]
+
+        compressed = compress_body(body, coding, self.level)
+        if cache_key is not None:
+            self.cache.put(cache_key, compressed)
+        start_response(status, self.encoded_headers(headers, coding, len(compressed)),
+                       captured.get('exc_info'))
+        return [compressed]
+
+    def should_compress(self, status, headers):
+        """Only successful, text-like, not-yet-encoded, transformable responses"""
+        if not status.startswith('200'):
+            return False
+        header_map = {name.lower(): value for name, value in headers}
+        if 'content-encoding' in header_map:
+            return False
+        if 'no-transform' in header_map.get('cache-control', '').lower():
+            return False
+        return is_compressible(header_map.get('content-type'))
+
+    def is_cacheable(self, status, header_map):
+        """Shared caches may reuse the body of this response"""
+        cache_control = header_map.get('cache-control', '').lower()
+        return status.startswith('200') and 'no-store' not in cache_control \
+            and 'private' not in cache_control
+
+    def encoded_headers(self, headers, coding, length):
+        """Rewrite headers for the encoded representation"""
+        result = []
+        vary_seen = False
+        for name, value in headers:
+            lower = name.lower()
+            if lower == 'content-length':
+                continue
+            if lower == 'etag' and not value.startswith('W/'):
+                # The encoded body is a different byte sequence; a weak ETag
+                # keeps If-None-Match revalidation working
+                value = 'W/' + value
+            if lower == 'vary':
+                vary_seen = True
+                if 'accept-encoding' not in value.lower():
+                    value = f"{value}, Accept-Encoding"
+            result.append((name, value))
+        if not vary_seen:
+            result.append(('Vary', 'Accept-Encoding'))
+        result.append(('Content-Encoding', coding))
+        if length is not None:
+            result.append(('Content-Length', str(length)))
+        return result
+
+    def passthrough(self, start_response, captured, app_iter, written):
+        """Forward the response unchanged"""
+        start_response(captured.get('status', '500 INTERNAL SERVER ERROR'),
+                       captured.get('headers', []), captured.get('exc_info'))
+        if written:
+            return closing_chunks(written, app_iter)
+        return app_iter
+
+    def stream(self, app_iter, written, coding, cache_key):
+        """Compress chunks as the application yields them"""
+        compressor = new_compressor(coding, self.level)
+        process = compressor.process if coding == 'br' else compressor.compress
+        finish = compressor.finish if coding == 'br' else compressor.flush
+        parts = [] if cache_key is not None else None
+        try:
+            for chunk in prepend_chunks(written, app_iter):
+                if not chunk:
+                    continue
+                output = process(chunk)
+                if output:
+                    if parts is not None:
+                        parts.append(output)
+                    yield output
+            output = finish()
+            if parts is not None:
+                parts.append(output)
+                self.cache.put(cache_key, b''.join(parts))
+            yield output
+        finally:
+            close_iter(app_iter)
+
+
+def prepend_chunks(written, app_iter):
+    """Chunks passed to the legacy write() callable come first"""
+    yield from written
+    yield from app_iter
+
+
+def closing_chunks(written, app_iter):
+    """prepend_chunks() that closes the application iterable when done"""
+    try:
+        yield from prepend_chunks(written, app_iter)
+    finally:
+        close_iter(app_iter)
+
+
+def close_iter(app_iter):
+    """Close a WSGI iterable if it supports it"""
+    close = getattr(app_iter, 'close', None)
+    if close is not None:
+        close()
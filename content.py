@@ -0,0 +1,257 @@
+"""Project content, processed once when it is saved.
+
+``process(source, content_format)`` turns what the admin typed into the
+HTML the project page shows:
+
+* ``markdown`` is converted with the markdown package when it is
+  installed (otherwise it is shown as plain text); ``html`` without any
+  tags is plain text, whose blank-line separated paragraphs become
+  ``<p>`` elements;
+* the HTML is sanitised against ``ALLOWED_TAGS``/``ALLOWED_ATTRIBUTES``:
+  other tags are dropped but keep their text, ``script``/``style``/...
+  are dropped with their content, and only http(s), mailto and relative
+  URLs survive;
+* images get ``loading="lazy"`` and ``decoding="async"``, plus
+  ``width``/``height`` for files under static/ when Pillow can read them;
+* a plain-text excerpt and a reading time are extracted.
+
+The result is stored on the project (``content_html``, ``excerpt``,
+``reading_time``, ``content_hash``) by the dashboard. Projects saved
+before this, or edited by hand in data.json, are processed on first view
+and kept in the tenant cache under their content hash, so a view never
+processes the same content twice.
+"""
+import os
+import re
+import html
+import hashlib
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+import tenancy
+
+try:
+    import markdown
+except ImportError:
+    markdown = None
+
+# Bump when the output of process() changes, so stored results are redone
+PROCESSOR_VERSION = 1
+CONTENT_FORMATS = ('html', 'markdown')
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'caption', 'code', 'del', 'div', 'em',
+    'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img',
+    'kbd', 'li', 'mark', 'ol', 'p', 'pre', 's', 'small', 'span', 'strong', 'sub',
+    'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul'
+}
+ALLOWED_ATTRIBUTES = {
+    '*': {'class', 'title'},
+    'a': {'href', 'target', 'rel'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan', 'scope'},
+    'ol': {'start'}
+}
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_SCHEMES = {'', 'http', 'https', 'mailto'}
+# Dropped together with everything inside them
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript', 'svg', 'math'}
+VOID_TAGS = {'br', 'hr', 'img'}
+# Tags whose end separates words in the excerpt
+BLOCK_TAGS = {'p', 'div', 'li', 'br', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+              'blockquote', 'pre', 'tr', 'td', 'th', 'figcaption', 'caption'}
+
+TAG_PATTERN = re.compile(r'<[a-zA-Z/!]')
+
+
+def content_source(project):
+    """The text a project page shows: its content, else its description"""
+    return project.get('content') or project.get('description') or ''
+
+
+def content_hash(source, content_format='html'):
+    digest = hashlib.sha256(f"{PROCESSOR_VERSION}:{content_format}:".encode('utf-8') + source.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def safe_url(value):
+    """value if it is a URL we allow in href/src, else None"""
+    value = value.strip()
+    # Browsers ignore control characters and whitespace inside the scheme
+    scheme = urlsplit(re.sub(r'[\x00-\x20]+', '', value)).scheme.lower()
+    return value if scheme in ALLOWED_SCHEMES else None
+
+
+def image_size(src, static_folder):
+    """(width, height) of a local static image, or None"""
+    if not static_folder:
+        return None
+    path = urlsplit(src).path
+    if not path.lstrip('/').startswith('static/'):
+        return None
+    file_path = os.path.normpath(os.path.join(static_folder, path.lstrip('/')[len('static/'):]))
+    if not file_path.startswith(os.path.abspath(static_folder) + os.sep):
+        return None
+    try:
+        from PIL import Image
+
+        with Image.open(file_path) as image:
+            return image.size
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+class Sanitizer(HTMLParser):
+    """Re-emit HTML keeping allowlisted tags and attributes, collecting the text"""
+
+    def __init__(self, static_folder=None):
+        super().__init__(convert_charrefs=True)
+        self.static_folder = static_folder
+        self.output = []
+        self.text = []
+        self.open_tags = []
+        self.dropping = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.dropping or tag in DROP_CONTENT_TAGS:
+            if tag not in VOID_TAGS:
+                self.dropping.append(tag)
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+        self.output.append(self.render_tag(tag, attrs))
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.dropping:
+            if tag in self.dropping:
+                while self.dropping.pop() != tag:
+                    pass
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in self.open_tags:
+            return
+        # Close anything left open inside it, as a browser would
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.output.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.output.append(html.escape(data, quote=False))
+        self.text.append(data)
+
+    def render_tag(self, tag, attrs):
+        allowed = ALLOWED_ATTRIBUTES['*'] | ALLOWED_ATTRIBUTES.get(tag, set())
+        kept = {}
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES:
+                value = safe_url(value)
+                if value is None:
+                    continue
+            kept[name] = value
+        if tag == 'a' and kept.get('target') == '_blank':
+            kept['rel'] = 'noopener noreferrer'
+        if tag == 'img':
+            if 'src' not in kept:
+                return ''
+            kept['loading'] = 'lazy'
+            kept['decoding'] = 'async'
+            if 'width' not in kept and 'height' not in kept:
+                size = image_size(kept['src'], self.static_folder)
+                if size:
+                    kept['width'], kept['height'] = str(size[0]), str(size[1])
+        rendered = ''.join(f' {name}="{html.escape(value)}"' for name, value in kept.items())
+        return f'<{tag}{rendered}>'
+
+    def result(self):
+        self.close()
+        closing = ''.join(f'</{tag}>' for tag in reversed(self.open_tags))
+        return ''.join(self.output) + closing, ' '.join(''.join(self.text).split())
+
+
+def text_to_html(source):
+    """Plain text as paragraphs, single line breaks kept"""
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', source.replace('\r\n', '\n')) if p.strip()]
+    return ''.join(f"<p>{html.escape(p).replace(chr(10), '<br>')}</p>" for p in paragraphs)
+
+
+def markdown_available():
+    return markdown is not None
+
+
+def to_html(source, content_format):
+    if content_format == 'markdown':
+        if markdown is None:
+            return text_to_html(source)
+        return markdown.markdown(source, extensions=['extra', 'sane_lists'])
+    if not TAG_PATTERN.search(source):
+        return text_to_html(source)
+    return source
+
+
+def excerpt(text, length=EXCERPT_LENGTH):
+    """Plain text cut at a word boundary"""
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0].rstrip(' ,.;:')
+    return cut + '…'
+
+
+def process(source, content_format='html', static_folder=None):
+    """{'html', 'excerpt', 'reading_time', 'hash'} of a project's content"""
+    if content_format not in CONTENT_FORMATS:
+        content_format = 'html'
+    sanitizer = Sanitizer(static_folder)
+    sanitizer.feed(to_html(source, content_format))
+    rendered, text = sanitizer.result()
+    words = len(text.split())
+    return {
+        'html': rendered,
+        'excerpt': excerpt(text),
+        'reading_time': max(1, round(words / WORDS_PER_MINUTE)) if words else 0,
+        'hash': content_hash(source, content_format)
+    }
+
+
+def apply(project, static_folder=None):
+    """Process a project's content and store the result on it"""
+    result = process(content_source(project), project.get('content_format', 'html'), static_folder)
+    project['content_html'] = result['html']
+    project['excerpt'] = result['excerpt']
+    project['reading_time'] = result['reading_time']
+    project['content_hash'] = result['hash']
+    return project
+
+
+def rendered(project, static_folder=None):
+    """The processed content of a project: stored if current, else cached by hash"""
+    content_format = project.get('content_format', 'html')
+    source = content_source(project)
+    digest = content_hash(source, content_format)
+    if project.get('content_hash') == digest and 'content_html' in project:
+        return {'html': project['content_html'], 'excerpt': project.get('excerpt', ''),
+                'reading_time': project.get('reading_time', 0), 'hash': digest}
+    cached = tenancy.CACHE.get('content', digest, PROCESSOR_VERSION)
+    if cached is None:
+        cached = process(source, content_format, static_folder)
+        tenancy.CACHE.put('content', digest, PROCESSOR_VERSION, cached,
+                          len(cached['html']) + len(cached['excerpt']))
+    return cached
@@ -0,0 +1,221 @@
+"""Per-theme CSS bundles and critical (above-the-fold) CSS.
+
+``python css_bundles.py`` concatenates and minifies each theme with
+``css/style.css`` into ``static/dist/bundle-<theme>.css`` and extracts the
+rules needed to paint the top of each public page into
+``static/dist/critical-<page>-<theme>.css``. Public templates inline the
+critical CSS and load the full bundle asynchronously.
+"""
+import os
+import re
+
+from markupsafe import Markup
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+THEMES_DIR = os.path.join(STATIC_DIR, 'themes')
+BUNDLE_DIR = 'dist'
+
+# Stylesheets that make up a theme bundle, after the theme itself
+BUNDLE_SOURCES = ['css/style.css']
+
+# Pages that get critical CSS; above the fold is everything up to the first section
+CRITICAL_PAGES = {
+    'index': 'index.html',
+    'project_detail': 'project_detail.html'
+}
+
+# Tags present on every page, so selectors on them always apply
+ALWAYS_PRESENT_TAGS = {'html', 'body', '*'}
+
+# {path: (mtime_ns, content)}
+CRITICAL_CSS_CACHE = {}
+
+
+def theme_ids():
+    """Theme ids that have a stylesheet under static/themes"""
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(THEMES_DIR)
+                  if name.endswith('.css'))
+
+
+def bundle_filename(theme):
+    """Static filename of a theme bundle"""
+    return f"{BUNDLE_DIR}/bundle-{theme}.css"
+
+
+def critical_filename(page, theme):
+    """Static filename of a page's critical CSS for a theme"""
+    return f"{BUNDLE_DIR}/critical-{page}-{theme}.css"
+
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from a stylesheet"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    # Only collapse "prop: value" inside declaration blocks; in selectors a
+    # space before ":" is a descendant combinator
+    css = re.sub(r'\{([^{}]*)\}',
+                 lambda m: '{' + re.sub(r'\s*:\s*', ':', m.group(1)) + '}', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def split_rules(css):
+    """Split minified CSS into top-level (prelude, body) pairs"""
+    rules = []
+    depth = 0
+    start = 0
+    prelude = ''
+    for i, char in enumerate(css):
+        if char == '{':
+            if depth == 0:
+                prelude = css[start:i].strip()
+                start = i + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((prelude, css[start:i]))
+                start = i + 1
+    return rules
+
+
+def split_selectors(prelude):
+    """Split a selector list on top-level commas, leaving :is()/:not() intact"""
+    selectors = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(prelude):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:i])
+            start = i + 1
+    selectors.append(prelude[start:])
+    return selectors
+
+
+def above_the_fold_tokens(template_name):
+    """Collect tag names, classes and ids used above the fold in a template"""
+    with open(os.path.join(TEMPLATES_DIR, template_name), 'r', encoding='utf-8') as f:
+        source = f.read()
+
+    body_start = source.find('<body')
+    fold = source.find('</section>', body_start)
+    markup = source[body_start:fold if fold != -1 else len(source)]
+    # Drop Jinja expressions so "{{ ... }}" inside attributes doesn't add noise
+    markup = re.sub(r'\{\{.*?\}\}|\{%.*?%\}', ' ', markup, flags=re.S)
+
+    tags = set(ALWAYS_PRESENT_TAGS)
+    tags.update(t.lower() for t in re.findall(r'<([a-zA-Z][a-zA-Z0-9]*)', markup))
+    classes = set()
+    for value in re.findall(r'class="([^"]*)"', markup):
+        classes.update(value.split())
+    ids = set(re.findall(r'id="([^"]+)"', markup))
+    return tags, classes, ids
+
+
+def selector_matches(selector, tags, classes, ids):
+    """Check whether every simple selector in a compound selector can match"""
+    # Pseudo-classes/elements and attribute selectors don't narrow the check
+    stripped = re.sub(r'::?[a-zA-Z-]+(\([^)]*\))?', '', selector)
+    stripped = re.sub(r'\[[^\]]*\]', '', stripped)
+    for token in re.split(r'[\s>+~]+', stripped):
+        if not token:
+            continue
+        for part in re.findall(r'[.#]?[a-zA-Z0-9_-]+|\*', token):
+            if part.startswith('.'):
+                if part[1:] not in classes:
+                    return False
+            elif part.startswith('#'):
+                if part[1:] not in ids:
+                    return False
+            elif part.lower() not in tags:
+                return False
+    return True
+
+
+def extract_critical_css(css, tags, classes, ids):
+    """Keep only the rules of a minified stylesheet that apply above the fold"""
+    kept = []
+    for prelude, body in split_rules(css):
+        if prelude.startswith('@media') or prelude.startswith('@supports'):
+            inner = extract_critical_css(body, tags, classes, ids)
+            if inner:
+                kept.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith('@'):
+            # Keyframes and other at-rules arrive with the full bundle
+            continue
+        elif any(selector_matches(s, tags, classes, ids) for s in split_selectors(prelude)):
+            kept.append(f"{prelude}{{{body}}}")
+    return ''.join(kept)
+
+
+def build_css_bundles():
+    """Write the minified bundle and critical CSS for every theme"""
+    os.makedirs(os.path.join(STATIC_DIR, BUNDLE_DIR), exist_ok=True)
+
+    sources = []
+    for source in BUNDLE_SOURCES:
+        with open(os.path.join(STATIC_DIR, source), 'r', encoding='utf-8') as f:
+            sources.append(f.read())
+
+    page_tokens = {page: above_the_fold_tokens(template)
+                   for page, template in CRITICAL_PAGES.items()}
+
+    written = []
+    for theme in theme_ids():
+        with open(os.path.join(THEMES_DIR, f"{theme}.css"), 'r', encoding='utf-8') as f:
+            bundle = minify_css('\n'.join([f.read()] + sources))
+
+        with open(os.path.join(STATIC_DIR, bundle_filename(theme)), 'w', encoding='utf-8') as f:
+            f.write(bundle)
+        written.append(bundle_filename(theme))
+
+        for page, tokens in page_tokens.items():
+            critical = extract_critical_css(bundle, *tokens)
+            with open(os.path.join(STATIC_DIR, critical_filename(page, theme)), 'w', encoding='utf-8') as f:
+                f.write(critical)
+            written.append(critical_filename(page, theme))
+
+    return written
+
+
+def init_css_bundles(app):
+    """Expose bundle helpers to templates"""
+
+    def css_bundle(theme):
+        """Bundle filename for a theme, or None to fall back to separate stylesheets"""
+        if not app.config.get('CSS_BUNDLES', True):
+            return None
+        filename = bundle_filename(theme)
+        if os.path.isfile(os.path.join(app.static_folder, filename)):
+            return filename
+        return None
+
+    def critical_css(page, theme):
+        """Inline-ready critical CSS for a page, cached until the file changes"""
+        path = os.path.join(app.static_folder, critical_filename(page, theme))
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return ''
+        cached = CRITICAL_CSS_CACHE.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, 'r', encoding='utf-8') as f:
+            content = Markup(f.read().replace('</', '<\\/'))
+        CRITICAL_CSS_CACHE[path] = (mtime, content)
+        return content
+
+    app.jinja_env.globals['css_bundle'] = css_bundle
+    app.jinja_env.globals['critical_css'] = critical_css
+
+
+if __name__ == '__main__':
+    written = build_css_bundles()
+    print(f"Wrote {len(written)} CSS bundle files to static/{BUNDLE_DIR}/")
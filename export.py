@@ -0,0 +1,281 @@
+"""Static export of the public portfolio.
+
+``export_site()`` writes the read-only pages into ``<EXPORT_DIR>/`` so a
+static host can serve them, leaving ``/contact`` and ``/dashboard`` to
+the app:
+
+    index.html, cv-preview.html, project/<id>.html
+    robots.txt, sitemap.xml (and sitemap-<n>.xml), download-cv (the PDF)
+    static/...   assets, including the fingerprinted names pages link to
+
+Runs are incremental. Pages are only rendered when the data they show
+(everything but messages, clients and visitors), the theme or the
+templates changed, and a file is only written when its bytes differ.
+Static files are copied when their size or mtime changed, and pages of
+deleted projects are removed. The state lives in
+``export-manifest.json`` next to the files.
+
+``STATIC_EXPORT=true`` re-exports in the background after every
+dashboard save; ``python export.py --base-url https://example.com``
+exports once. Pages link with root-relative URLs, and sitemap.xml and
+robots.txt use ``EXPORT_BASE_URL`` (or the URL the save came from).
+"""
+import os
+import uuid
+import re
+import sys
+import fcntl
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+from contextlib import contextmanager
+
+import content
+import serialization
+import tenancy
+from assets import split_fingerprint, GENERATED_SUFFIXES
+
+STATIC_EXPORT = os.environ.get('STATIC_EXPORT', 'false').lower() in ('1', 'true', 'yes', 'on')
+EXPORT_DIR = os.environ.get('EXPORT_DIR', 'export')
+EXPORT_BASE_URL = os.environ.get('EXPORT_BASE_URL', '').rstrip('/')
+MANIFEST_FILE = 'export-manifest.json'
+LOCK_FILE = '.export.lock'
+
+# data.json sections no public page shows; changing them re-renders nothing
+PRIVATE_SECTIONS = ('messages', 'clients', 'visitors')
+
+STATIC_URL = re.compile(r'/static/[^"\'()\s?#<>]+')
+SITEMAP_PAGE = re.compile(r'<loc>[^<]*/(sitemap-\d+\.xml)</loc>')
+
+
+def export_dir():
+    """Export directory of the current tenant"""
+    return tenancy.tenant_path(EXPORT_DIR)
+
+
+@contextmanager
+def export_lock():
+    """One export at a time per tenant, across threads and worker processes"""
+    directory = export_dir()
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def digest(value):
+    return hashlib.sha256(serialization.dumps(value)).hexdigest()
+
+
+def content_etag(content):
+    return hashlib.sha256(content).hexdigest()[:32]
+
+
+def template_version(app):
+    """Changes whenever a template or the static asset manifest does"""
+    stamps = []
+    for folder in (os.path.join(app.root_path, app.template_folder), app.static_folder):
+        for root, _, names in os.walk(folder):
+            for name in names:
+                if name.endswith(('.html', '.json')):
+                    stat = os.stat(os.path.join(root, name))
+                    stamps.append([os.path.join(root, name), stat.st_mtime_ns, stat.st_size])
+    return digest(sorted(stamps))
+
+
+def pages(data, static_folder=None):
+    """[(output path, template, context)] of the public pages"""
+    listed = [('index.html', 'index.html', {'data': data}),
+              ('cv-preview.html', 'cv_preview.html', {'data': data})]
+    for project in data.get('projects', []):
+        if isinstance(project, dict) and 'id' in project:
+            listed.append((f"project/{project['id']}.html", 'project_detail.html',
+                           {'project': project, 'data': data,
+                            'project_content': content.rendered(project, static_folder)}))
+    return listed
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def remove_file(directory, name):
+    try:
+        os.remove(os.path.join(directory, name))
+    except FileNotFoundError:
+        pass
+
+
+def load_manifest(directory):
+    try:
+        return serialization.load_file(os.path.join(directory, MANIFEST_FILE))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def store(directory, name, content, previous, written):
+    """Write an output file unless its bytes are unchanged; returns its etag"""
+    etag = content_etag(content)
+    if previous.get(name) != etag or not os.path.exists(os.path.join(directory, name)):
+        write_file(os.path.join(directory, name), content)
+        written.append(name)
+    return etag
+
+
+def render_pages(app, data, version, directory, previous, written):
+    """Render pages whose inputs changed; returns {path: {'inputs', 'etag'}}"""
+    from flask import render_template
+
+    public = {key: value for key, value in data.items() if key not in PRIVATE_SECTIONS}
+    # Every page lists the projects and wears the theme, so all share one input digest
+    inputs = digest([public, version])
+    results = {}
+    for name, template, context in pages(data, app.static_folder):
+        entry = previous.get(name)
+        if entry and entry.get('inputs') == inputs and os.path.exists(os.path.join(directory, name)):
+            results[name] = entry
+            continue
+        html = render_template(template, **context).encode('utf-8')
+        etag = store(directory, name, html, {name: (entry or {}).get('etag')}, written)
+        results[name] = {'inputs': inputs, 'etag': etag}
+    for name in previous:
+        if name not in results:
+            remove_file(directory, name)
+    return results
+
+
+def fetch_files(app, base_url, directory, previous, written):
+    """robots.txt and the sitemap files, as the app serves them"""
+    results = {}
+
+    def fetch(url, name):
+        # Dispatched inside the current tenant, bypassing the tenant routing
+        with app.test_request_context(url, base_url=base_url + '/'):
+            response = app.full_dispatch_request()
+            response.direct_passthrough = False
+            if response.status_code == 200:
+                results[name] = store(directory, name, response.get_data(), previous, written)
+            content = response.get_data(as_text=True) if response.status_code == 200 else ''
+            response.close()
+        return content
+
+    for name in SITEMAP_PAGE.findall(fetch('/sitemap.xml', 'sitemap.xml')):
+        fetch(f'/{name}', name)
+    fetch('/robots.txt', 'robots.txt')
+    return results
+
+
+def copy_cv(cv_pdf, directory, previous, written):
+    """The pre-rendered CV PDF as download-cv; absent until the render job has run"""
+    if not cv_pdf or not os.path.exists(cv_pdf):
+        return {}
+    with open(cv_pdf, 'rb') as f:
+        return {'download-cv': store(directory, 'download-cv', f.read(), previous, written)}
+
+
+def copy_tree(source, target_root, prefix, previous, copied, skip=None):
+    """Copy files of source whose (mtime, size) changed to target_root/prefix/..."""
+    for root, dirs, names in os.walk(source):
+        if skip:
+            dirs[:] = [name for name in dirs if os.path.abspath(os.path.join(root, name)) != skip]
+        for name in names:
+            path = os.path.join(root, name)
+            relative = os.path.normpath(os.path.join(prefix, os.path.relpath(path, source)))
+            stat = os.stat(path)
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            target = os.path.join(target_root, relative)
+            if previous.get(relative) != stamp or not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(path, target)
+            copied[relative] = stamp
+
+
+def copy_static(app, directory, upload_folder, previous):
+    """Mirror static/ with only this tenant's uploads; returns {path: [mtime, size]}"""
+    copied = {}
+    uploads_root = os.path.abspath(os.path.join(app.root_path, app.config['UPLOAD_FOLDER']))
+    copy_tree(app.static_folder, directory, 'static', previous, copied, skip=uploads_root)
+    # upload_folder is the path kept in data.json (static/assets/uploads[/<tenant>])
+    copy_tree(upload_folder, directory, upload_folder, previous, copied)
+    for relative in previous:
+        if relative not in copied:
+            remove_file(directory, relative)
+    return copied
+
+
+def link_fingerprinted(app, directory, names):
+    """Create the fingerprinted asset names the exported pages link to"""
+    for name in names:
+        with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+            html = f.read()
+        for url in set(STATIC_URL.findall(html)):
+            filename = url[len('/static/'):]
+            original, fingerprint = split_fingerprint(filename)
+            if not fingerprint or filename.endswith(GENERATED_SUFFIXES):
+                continue
+            target = os.path.join(directory, 'static', filename)
+            source = os.path.join(app.static_folder, original)
+            # Named by content, so an existing copy is already right
+            if not os.path.exists(target) and os.path.exists(source):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(source, target)
+
+
+def export_site(app, base_url, data, upload_folder, cv_pdf=None):
+    """Bring the export directory up to date; returns a summary"""
+    base_url = (EXPORT_BASE_URL or base_url).rstrip('/')
+    directory = export_dir()
+    with export_lock():
+        manifest = load_manifest(directory)
+        version = digest([template_version(app), base_url])
+        written = []
+        with app.test_request_context('/', base_url=base_url + '/'):
+            page_entries = render_pages(app, data, version, directory, manifest.get('pages', {}), written)
+        link_fingerprinted(app, directory, page_entries)
+        static_entries = copy_static(app, directory, upload_folder, manifest.get('static', {}))
+        previous_files = manifest.get('files', {})
+        file_entries = fetch_files(app, base_url, directory, previous_files, written)
+        file_entries.update(copy_cv(cv_pdf, directory, previous_files, written))
+        for name in previous_files:
+            if name not in file_entries:
+                remove_file(directory, name)
+        manifest = {
+            'base_url': base_url,
+            'exported_at': datetime.now().isoformat(),
+            'pages': page_entries,
+            'files': file_entries,
+            'static': static_entries
+        }
+        write_file(os.path.join(directory, MANIFEST_FILE), serialization.dumps(manifest))
+    return {'directory': directory, 'written': written, 'pages': len(page_entries)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the public portfolio as static files')
+    parser.add_argument('--base-url', default=EXPORT_BASE_URL, help='public URL of the site')
+    parser.add_argument('--tenant', help='export one tenant (multi-tenant setups)')
+    parser.add_argument('--full', action='store_true', help='render every page again')
+    args = parser.parse_args()
+    if not args.base_url:
+        sys.exit('Set --base-url or EXPORT_BASE_URL')
+
+    import app as portfolio
+
+    with tenancy.use_tenant(args.tenant):
+        if args.full:
+            remove_file(export_dir(), MANIFEST_FILE)
+        with portfolio.app.app_context():
+            summary = portfolio.export_public_site(args.base_url)
+    print(f"{summary['directory']}: {summary['pages']} pages, {len(summary['written'])} files written")
+
+
+if __name__ == '__main__':
+    main()
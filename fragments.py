@@ -0,0 +1,75 @@
+"""Fragment caching for templates.
+
+    {% cache 'projects', data.projects %}
+        ... the project cards ...
+    {% endcache %}
+
+renders the block once and keeps the HTML in the tenant cache
+(tenancy.CACHE, so it is bounded by TENANT_CACHE_MB with LRU eviction).
+A fragment is identified by the template, its name, the page's theme
+(``current_theme``) and script root; the remaining arguments are the data
+the block shows and are digested into the version, so an edit re-renders
+the fragment while visitor counts and messages leave it alone. Pass
+everything the block reads. Blocks whose arguments can't be serialised
+render uncached. Hits and misses are counted in ``fragment_cache_total``;
+``FRAGMENT_CACHE=false`` renders every block.
+"""
+import hashlib
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from jinja2.runtime import Undefined
+
+import metrics
+import serialization
+import tenancy
+
+
+def fragment_version(values):
+    """Digest of the data a fragment renders, or None if it can't be serialised"""
+    try:
+        raw = serialization.dumps([None if isinstance(value, Undefined) else value for value in values])
+    except TypeError:
+        return None
+    return hashlib.sha256(raw).hexdigest()
+
+
+class FragmentCacheExtension(Extension):
+    """The {% cache name, data... %}...{% endcache %} tag"""
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache_enabled=True)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        values = []
+        while parser.stream.skip_if('comma'):
+            values.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        args = [nodes.ContextReference(), nodes.Const(parser.name), name, nodes.List(values)]
+        return nodes.CallBlock(self.call_method('render_fragment', args), [], [], body).set_lineno(lineno)
+
+    def render_fragment(self, context, template, name, values, caller):
+        version = fragment_version(values) if self.environment.fragment_cache_enabled else None
+        if version is None:
+            return caller()
+        request = context.get('request')
+        key = (template, name, context.get('current_theme'), getattr(request, 'script_root', ''))
+        cached = tenancy.CACHE.get('fragment', key, version)
+        if cached is not None:
+            metrics.inc('fragment_cache_total', fragment=name, outcome='hit')
+            return cached
+        metrics.inc('fragment_cache_total', fragment=name, outcome='miss')
+        html = caller()
+        tenancy.CACHE.put('fragment', key, version, html, len(html))
+        return html
+
+
+def init_fragments(app):
+    """Enable {% cache %} in the app's templates"""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache_enabled = app.config.get('FRAGMENT_CACHE', True)
@@ -0,0 +1,62 @@
+"""Gunicorn settings and startup hooks.
+
+Workers are threaded (``gthread``) by default so a slow PDF render or
+Telegram call holds one thread rather than a whole worker; set
+``GUNICORN_WORKER_CLASS=gevent`` (with gevent installed) for cooperative
+workers instead. The app is preloaded in the arbiter and forked into the
+workers, which are recycled after ``GUNICORN_MAX_REQUESTS`` requests
+(plus jitter so they don't all restart at once).
+
+Importing app.py only builds the Flask app; background services start
+here:
+
+* the arbiter runs the cron scheduler once it is ready; scheduled jobs
+  only enqueue work, so there is exactly one scheduler however many
+  workers run;
+* the arbiter compiles every template (through the shared bytecode
+  cache) before forking, so preloaded workers inherit them compiled;
+* each forked worker drops what it inherited from the arbiter (scheduler
+  handle, SQLite connections, metrics) and starts its own job worker
+  pools after it has booted, then renders the public pages once before
+  it accepts connections (``GUNICORN_WARM_UP=false`` skips that).
+
+Command line flags still override these settings.
+"""
+import os
+
+
+def env_bool(name, default):
+    return os.environ.get(name, default).lower() not in ('0', 'false', 'no', 'off')
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+preload_app = env_bool('GUNICORN_PRELOAD', 'true')
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+WARM_UP = env_bool('GUNICORN_WARM_UP', 'true')
+
+
+def when_ready(server):
+    import app
+    if preload_app:
+        app.template_cache.precompile(app.app)
+    app.start_scheduler()
+
+
+def post_fork(server, worker):
+    import app
+    app.reinit_after_fork()
+
+
+def post_worker_init(worker):
+    import app
+    app.start_background_services()
+    if WARM_UP:
+        app.warm_up()
@@ -0,0 +1,287 @@
+"""Cache invalidation across worker processes and hosts.
+
+In-memory caches are keyed on versions from this bus rather than
+trusted on their own: ``publish(key)`` bumps a key's version everywhere,
+``version(key)`` is the newest version this process has seen and
+``subscribe(callback)`` is called with ``(key, version)`` for every
+change, made here or elsewhere.
+
+Backends (``INVALIDATION_BACKEND``):
+
+* ``sqlite`` (default, one host): versions are rows of
+  ``INVALIDATION_DB`` stamped with a change sequence. Each process asks
+  for rows past the last sequence it saw at the start of every request,
+  and when a version is read more than ``INVALIDATION_POLL_INTERVAL``
+  seconds after the last look.
+* ``postgres`` (several hosts): versions are rows of a table in
+  ``INVALIDATION_DSN`` (default ``DATABASE_URL``) and each publish sends
+  ``NOTIFY``. A listener thread per process applies notifications as they
+  arrive and reloads every version after (re)connecting, so nothing is
+  missed while it was away. Uses psycopg2.
+
+Against a local database:
+
+    INVALIDATION_BACKEND=postgres INVALIDATION_DSN=postgresql:///portfolio \\
+        python invalidation.py listen          # in one shell
+    INVALIDATION_BACKEND=postgres INVALIDATION_DSN=postgresql:///portfolio \\
+        python invalidation.py publish data    # in another
+"""
+import os
+import sys
+import time
+import select
+import sqlite3
+import argparse
+import threading
+
+INVALIDATION_BACKEND = os.environ.get('INVALIDATION_BACKEND', 'sqlite').lower()
+INVALIDATION_DB = os.environ.get('INVALIDATION_DB', os.path.join('cache', 'invalidation.sqlite3'))
+INVALIDATION_DSN = os.environ.get('INVALIDATION_DSN', os.environ.get('DATABASE_URL', ''))
+INVALIDATION_POLL_INTERVAL = float(os.environ.get('INVALIDATION_POLL_INTERVAL', 1))
+CHANNEL = 'portfolio_invalidation'
+
+VERSIONS = {}  # {key: newest version seen by this process}
+SUBSCRIBERS = []
+STATE_LOCK = threading.Lock()
+BACKEND = [None]
+LAST_POLL = [0.0]
+LAST_ERROR = [None]
+
+
+class SQLiteBackend:
+    """Versions in a SQLite file shared by the processes of one host"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS versions (
+        key TEXT PRIMARY KEY,
+        version INTEGER NOT NULL,
+        seq INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS versions_seq ON versions (seq);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.last_seq = 0
+        self.poll_lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.SCHEMA)
+            self.local.conn = conn
+        return conn
+
+    def start(self):
+        self.poll()
+
+    def publish(self, key):
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            seq = conn.execute('SELECT COALESCE(MAX(seq), 0) + 1 FROM versions').fetchone()[0]
+            conn.execute('INSERT INTO versions (key, version, seq) VALUES (?, 1, ?) '
+                         'ON CONFLICT(key) DO UPDATE SET version = version + 1, seq = excluded.seq',
+                         (key, seq))
+            version = conn.execute('SELECT version FROM versions WHERE key = ?', (key,)).fetchone()[0]
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return version
+
+    def poll(self):
+        """Apply every change made since the last poll"""
+        with self.poll_lock:
+            rows = self.connection().execute(
+                'SELECT key, version, seq FROM versions WHERE seq > ? ORDER BY seq',
+                (self.last_seq,)).fetchall()
+            if rows:
+                self.last_seq = rows[-1][2]
+        # The database answers again; an earlier failed poll no longer counts
+        LAST_ERROR[0] = None
+        for key, version, _ in rows:
+            apply(key, version)
+
+
+class PostgresBackend:
+    """Versions in PostgreSQL, pushed to every process with LISTEN/NOTIFY"""
+
+    SCHEMA = 'CREATE TABLE IF NOT EXISTS cache_versions (key TEXT PRIMARY KEY, version BIGINT NOT NULL)'
+
+    def __init__(self, dsn):
+        if not dsn:
+            raise RuntimeError('INVALIDATION_BACKEND=postgres needs INVALIDATION_DSN or DATABASE_URL')
+        self.dsn = dsn
+        self.local = threading.local()
+        self.listener = None
+
+    def connect(self):
+        import psycopg2
+
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(self.SCHEMA)
+        return conn
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or conn.closed:
+            conn = self.local.conn = self.connect()
+        return conn
+
+    def start(self):
+        if self.listener is None or not self.listener.is_alive():
+            self.listener = threading.Thread(target=self.listen, name='invalidation-listener', daemon=True)
+            self.listener.start()
+
+    def publish(self, key):
+        with self.connection().cursor() as cursor:
+            cursor.execute('INSERT INTO cache_versions (key, version) VALUES (%s, 1) '
+                           'ON CONFLICT (key) DO UPDATE SET version = cache_versions.version + 1 '
+                           'RETURNING version', (key,))
+            version = cursor.fetchone()[0]
+            cursor.execute('SELECT pg_notify(%s, %s)', (CHANNEL, f"{version} {key}"))
+        return version
+
+    def poll(self):
+        # Changes arrive on the listener thread
+        self.start()
+
+    def listen(self):
+        """Listener thread body: apply notifications, reconnecting with backoff"""
+        delay = 1
+        while True:
+            conn = None
+            try:
+                conn = self.connect()
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                    # Catch up on whatever changed while not listening
+                    cursor.execute('SELECT key, version FROM cache_versions')
+                    for key, version in cursor.fetchall():
+                        apply(key, version)
+                LAST_ERROR[0] = None
+                delay = 1
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        version, _, key = conn.notifies.pop(0).payload.partition(' ')
+                        apply(key, int(version))
+            except Exception as e:
+                LAST_ERROR[0] = f"{type(e).__name__}: {e}"
+            finally:
+                # Every attempt opens a new connection; don't leave this one behind
+                if conn is not None:
+                    conn.close()
+            time.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+def backend():
+    """This process's backend, started on first use"""
+    if BACKEND[0] is None:
+        with STATE_LOCK:
+            if BACKEND[0] is None:
+                if INVALIDATION_BACKEND == 'postgres':
+                    BACKEND[0] = PostgresBackend(INVALIDATION_DSN)
+                else:
+                    BACKEND[0] = SQLiteBackend(INVALIDATION_DB)
+        BACKEND[0].start()
+        LAST_POLL[0] = time.monotonic()
+    return BACKEND[0]
+
+
+def reset_after_fork():
+    # The child has neither the parent's connections nor its listener thread
+    global STATE_LOCK
+    STATE_LOCK = threading.Lock()
+    BACKEND[0] = None
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def apply(key, version):
+    """Record a version seen from any source; subscribers hear about newer ones"""
+    with STATE_LOCK:
+        if version <= VERSIONS.get(key, 0):
+            return
+        VERSIONS[key] = version
+    for callback in list(SUBSCRIBERS):
+        callback(key, version)
+
+
+def poll():
+    """Pick up changes published by other processes"""
+    LAST_POLL[0] = time.monotonic()
+    backend().poll()
+
+
+def version(key):
+    """Newest known version of a key (0 if it never changed)"""
+    if time.monotonic() - LAST_POLL[0] >= INVALIDATION_POLL_INTERVAL:
+        poll()
+    return VERSIONS.get(key, 0)
+
+
+def publish(key):
+    """Bump a key's version for every process; returns the new version"""
+    new_version = backend().publish(key)
+    apply(key, new_version)
+    return new_version
+
+
+def subscribe(callback):
+    """Call callback(key, version) whenever a key changes"""
+    SUBSCRIBERS.append(callback)
+    return callback
+
+
+def stats():
+    return {'backend': INVALIDATION_BACKEND, 'keys': len(VERSIONS), 'error': LAST_ERROR[0]}
+
+
+def init_invalidation(app):
+    """Look for other processes' changes before each request"""
+
+    @app.before_request
+    def poll_invalidations():
+        try:
+            poll()
+        except Exception as e:
+            LAST_ERROR[0] = f"{type(e).__name__}: {e}"
+            app.logger.error(f"Invalidation poll failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish or watch cache invalidations')
+    commands = parser.add_subparsers(dest='command', required=True)
+    publish_command = commands.add_parser('publish', help='bump the version of a key')
+    publish_command.add_argument('key')
+    commands.add_parser('listen', help='print changes as they arrive')
+    args = parser.parse_args()
+
+    if args.command == 'publish':
+        print(publish(args.key))
+        return
+    subscribe(lambda key, new_version: print(f"{key} {new_version}", flush=True))
+    try:
+        while True:
+            poll()
+            time.sleep(min(INVALIDATION_POLL_INTERVAL, 1))
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
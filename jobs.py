@@ -0,0 +1,354 @@
+"""Persistent background job queue backed by SQLite.
+
+Functions registered with ``@task('name', queue=...)`` are queued as rows
+in ``<JOB_DIR>/jobs.sqlite3`` and run by per-queue pools of daemon worker
+threads (``JOB_QUEUES``, e.g. ``default:2,notifications:2,maintenance:1``)
+in every process that enqueues or calls ``start_workers()``. Workers in
+all processes share the database, so queued jobs survive restarts.
+
+* Higher ``priority`` runs first; ``delay`` (seconds) or ``run_at``
+  schedules a job for later.
+* An ``idempotency_key`` makes enqueueing the same work twice a no-op
+  while the first job is still kept (``JOB_RETENTION_HOURS``).
+* A claimed job is invisible to other workers for its visibility timeout;
+  if its worker dies it becomes claimable again.
+* A job fails when it raises or returns ``False``; it is retried after
+  ``JOB_RETRY_BASE * 2**attempt`` seconds and marked dead once it has
+  failed ``max_attempts`` times. Dead jobs can be retried or dropped from
+  the dashboard.
+* A job runs as the tenant that queued it (see tenancy.py); idempotency
+  keys are per tenant.
+"""
+import os
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+from datetime import datetime
+
+import metrics
+import serialization
+import tenancy
+
+JOB_DIR = os.environ.get('JOB_DIR', 'jobs')
+JOB_DB_FILE = 'jobs.sqlite3'
+JOB_QUEUES = os.environ.get('JOB_QUEUES', 'default:2,notifications:2,maintenance:1')
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BASE = float(os.environ.get('JOB_RETRY_BASE', 2))
+JOB_VISIBILITY_TIMEOUT = float(os.environ.get('JOB_VISIBILITY_TIMEOUT', 300))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1))
+JOB_RETENTION_HOURS = float(os.environ.get('JOB_RETENTION_HOURS', 24))
+
+STATUSES = ('queued', 'running', 'done', 'dead')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    queue TEXT NOT NULL,
+    task TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    visibility_timeout REAL NOT NULL,
+    run_at REAL NOT NULL,
+    locked_until REAL,
+    idempotency_key TEXT UNIQUE,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    tenant TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (queue, status, priority, run_at);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, finished_at);
+"""
+
+# Columns added after the first release, created on existing databases
+MIGRATIONS = {'tenant': 'ALTER TABLE jobs ADD COLUMN tenant TEXT'}
+
+TASKS = {}  # {name: {'func', 'queue', 'max_attempts', 'priority', 'visibility_timeout'}}
+
+WORKERS = {}  # {queue: [threads]}
+WORKERS_LOCK = threading.Lock()
+WAKE = {}  # {queue: threading.Event} so local enqueues don't wait for the poll
+RUNNING = {}  # {job id: task name} in this process
+LOCAL = threading.local()
+CONTEXT = [None]  # callable returning a context manager jobs run in
+LAST_PURGE = [0.0]
+AUTOSTART = [True]  # False in a process that only enqueues (the scheduler's)
+
+
+class JobFailed(Exception):
+    """Raised by a task to request a retry"""
+
+
+def queue_sizes():
+    """{queue: worker count} from JOB_QUEUES"""
+    sizes = {}
+    for part in JOB_QUEUES.split(','):
+        name, _, size = part.strip().partition(':')
+        if name:
+            sizes[name] = int(size or 1)
+    return sizes
+
+
+def connection():
+    """Per-thread SQLite connection to the job database"""
+    conn = getattr(LOCAL, 'conn', None)
+    if conn is None:
+        os.makedirs(JOB_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(JOB_DIR, JOB_DB_FILE), timeout=30,
+                               isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                try:
+                    conn.execute(statement)
+                except sqlite3.OperationalError:
+                    # Another process added it first
+                    pass
+        LOCAL.conn = conn
+    return conn
+
+
+def task(name, queue='default', max_attempts=None, priority=0, visibility_timeout=None):
+    """Register a function as a job task"""
+    def register(func):
+        TASKS[name] = {
+            'func': func,
+            'queue': queue,
+            'max_attempts': max_attempts or JOB_MAX_ATTEMPTS,
+            'priority': priority,
+            'visibility_timeout': visibility_timeout or JOB_VISIBILITY_TIMEOUT
+        }
+        return func
+    return register
+
+
+def enqueue(name, *args, delay=0, run_at=None, priority=None, idempotency_key=None, **kwargs):
+    """Queue a task call; returns the job id (the existing one for a repeated idempotency key)"""
+    spec = TASKS.get(name)
+    if spec is None:
+        raise KeyError(f"Unknown job task: {name}")
+    now = time.time()
+    job_id = uuid.uuid4().hex
+    tenant = tenancy.current_tenant()
+    if idempotency_key and tenant:
+        idempotency_key = f"{tenant}:{idempotency_key}"
+    conn = connection()
+    cursor = conn.execute(
+        'INSERT OR IGNORE INTO jobs (id, queue, task, payload, priority, max_attempts, '
+        'visibility_timeout, run_at, idempotency_key, created_at, tenant) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (job_id, spec['queue'], name, serialization.dumps({'args': list(args), 'kwargs': kwargs}),
+         spec['priority'] if priority is None else priority, spec['max_attempts'],
+         spec['visibility_timeout'], run_at if run_at is not None else now + delay,
+         idempotency_key, now, tenant))
+    if cursor.rowcount == 0:
+        row = conn.execute('SELECT id FROM jobs WHERE idempotency_key = ?', (idempotency_key,)).fetchone()
+        return row['id'] if row else None
+    metrics.inc('jobs_enqueued_total', task=name)
+    if AUTOSTART[0]:
+        start_workers()
+    WAKE.setdefault(spec['queue'], threading.Event()).set()
+    return job_id
+
+
+def claim(queue):
+    """Take the next due job of a queue, or None"""
+    now = time.time()
+    conn = connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE queue = ? AND ("
+            "(status = 'queued' AND run_at <= ?) OR (status = 'running' AND locked_until < ?)) "
+            "ORDER BY priority DESC, run_at LIMIT 1", (queue, now, now)).fetchone()
+        if row is None:
+            conn.execute('COMMIT')
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_until = ? WHERE id = ?",
+            (now + row['visibility_timeout'], row['id']))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    job = dict(row)
+    job['attempts'] += 1
+    return job
+
+
+def run_job(job):
+    """Execute one claimed job; retry or mark it dead on failure"""
+    spec = TASKS.get(job['task'])
+    payload = serialization.loads(job['payload'])
+    RUNNING[job['id']] = job['task']
+    started = time.perf_counter()
+    conn = connection()
+    try:
+        if spec is None:
+            raise JobFailed(f"No task registered as {job['task']}")
+        context = CONTEXT[0]() if CONTEXT[0] else None
+        with tenancy.use_tenant(job.get('tenant')):
+            if context is not None:
+                with context:
+                    result = spec['func'](*payload['args'], **payload['kwargs'])
+            else:
+                result = spec['func'](*payload['args'], **payload['kwargs'])
+        if result is False:
+            raise JobFailed('task returned False')
+        conn.execute("UPDATE jobs SET status = 'done', locked_until = NULL, finished_at = ?, "
+                     "last_error = NULL WHERE id = ?", (time.time(), job['id']))
+        metrics.inc('jobs_total', task=job['task'], outcome='success')
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}"
+        if job['attempts'] < job['max_attempts']:
+            retry_at = time.time() + JOB_RETRY_BASE * 2 ** (job['attempts'] - 1)
+            conn.execute("UPDATE jobs SET status = 'queued', locked_until = NULL, run_at = ?, "
+                         "last_error = ? WHERE id = ?", (retry_at, error, job['id']))
+            metrics.inc('jobs_total', task=job['task'], outcome='retry')
+        else:
+            conn.execute("UPDATE jobs SET status = 'dead', locked_until = NULL, finished_at = ?, "
+                         "last_error = ? WHERE id = ?", (time.time(), error, job['id']))
+            metrics.inc('jobs_total', task=job['task'], outcome='dead')
+    finally:
+        RUNNING.pop(job['id'], None)
+        metrics.observe('job_duration_seconds', time.perf_counter() - started, task=job['task'])
+
+
+def purge_finished():
+    """Drop finished jobs older than JOB_RETENTION_HOURS, at most once a minute"""
+    now = time.time()
+    if now - LAST_PURGE[0] < 60:
+        return
+    LAST_PURGE[0] = now
+    connection().execute("DELETE FROM jobs WHERE status = 'done' AND finished_at < ?",
+                         (now - JOB_RETENTION_HOURS * 3600,))
+
+
+def worker_loop(queue):
+    """Worker thread body: claim and run jobs, sleeping between polls when idle"""
+    wake = WAKE.setdefault(queue, threading.Event())
+    while True:
+        try:
+            job = claim(queue)
+        except sqlite3.Error:
+            job = None
+        if job is None:
+            try:
+                purge_finished()
+            except sqlite3.Error:
+                pass
+            wake.wait(JOB_POLL_INTERVAL)
+            wake.clear()
+            continue
+        run_job(job)
+
+
+def start_workers():
+    """Start the worker pools once per process"""
+    with WORKERS_LOCK:
+        for queue, size in queue_sizes().items():
+            threads = [w for w in WORKERS.get(queue, []) if w.is_alive()]
+            for i in range(len(threads), size):
+                worker = threading.Thread(target=worker_loop, args=(queue,),
+                                          name=f"job-{queue}-{i + 1}", daemon=True)
+                threads.append(worker)
+                worker.start()
+            WORKERS[queue] = threads
+
+
+def reset_after_fork():
+    """A forked child gets no threads, so drop the parent's pools and connections"""
+    global LOCAL, WORKERS_LOCK
+    LOCAL = threading.local()
+    WORKERS_LOCK = threading.Lock()
+    WORKERS.clear()
+    WAKE.clear()
+    RUNNING.clear()
+    AUTOSTART[0] = True
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def row_to_job(row):
+    """Job row as a template-friendly dict"""
+    job = dict(row)
+    job['payload'] = serialization.loads(job['payload'])
+    for field in ('run_at', 'created_at', 'finished_at'):
+        if job.get(field):
+            job[field] = datetime.fromtimestamp(job[field]).strftime('%Y-%m-%d %H:%M:%S')
+    return job
+
+
+def tenant_clause(tenant):
+    """SQL condition (and params) limiting rows to one tenant, if given"""
+    return ('tenant = ?', [tenant]) if tenant else ('1 = 1', [])
+
+
+def list_jobs(status=None, queue=None, limit=100, tenant=None):
+    """Most recent jobs, optionally filtered"""
+    clause, params = tenant_clause(tenant)
+    clauses = [clause]
+    if status:
+        clauses.append('status = ?')
+        params.append(status)
+    if queue:
+        clauses.append('queue = ?')
+        params.append(queue)
+    where = f"WHERE {' AND '.join(clauses)}"
+    rows = connection().execute(
+        f"SELECT * FROM jobs {where} ORDER BY created_at DESC LIMIT ?", params + [limit]).fetchall()
+    return [row_to_job(row) for row in rows]
+
+
+def dead_letters(tenant=None):
+    """Jobs that ran out of attempts, newest first"""
+    return list_jobs(status='dead', limit=200, tenant=tenant)
+
+
+def retry_dead_letter(job_id, tenant=None):
+    """Queue a dead job again with a fresh attempt count"""
+    clause, params = tenant_clause(tenant)
+    cursor = connection().execute(
+        "UPDATE jobs SET status = 'queued', attempts = 0, run_at = ?, finished_at = NULL "
+        f"WHERE id = ? AND status = 'dead' AND {clause}", [time.time(), job_id] + params)
+    if cursor.rowcount:
+        start_workers()
+    return cursor.rowcount > 0
+
+
+def pop_dead_letter(job_id, tenant=None):
+    """Delete a dead job; returns whether it existed"""
+    clause, params = tenant_clause(tenant)
+    cursor = connection().execute(f"DELETE FROM jobs WHERE id = ? AND status = 'dead' AND {clause}",
+                                  [job_id] + params)
+    return cursor.rowcount > 0
+
+
+def queue_stats(tenant=None):
+    """{queue: {status: count, 'delayed': n, 'workers': n}} across all processes"""
+    now = time.time()
+    clause, params = tenant_clause(tenant)
+    stats = {queue: dict.fromkeys(STATUSES + ('delayed',), 0) for queue in queue_sizes()}
+    rows = connection().execute(
+        "SELECT queue, CASE WHEN status = 'queued' AND run_at > ? THEN 'delayed' ELSE status END AS state, "
+        f"COUNT(*) AS n FROM jobs WHERE {clause} GROUP BY queue, state", [now] + params).fetchall()
+    for row in rows:
+        stats.setdefault(row['queue'], dict.fromkeys(STATUSES + ('delayed',), 0))[row['state']] = row['n']
+    for queue, counts in stats.items():
+        counts['workers'] = sum(1 for w in WORKERS.get(queue, []) if w.is_alive())
+    return stats
+
+
+def init_jobs(app):
+    """Run jobs inside the application context"""
+    CONTEXT[0] = app.app_context
@@ -0,0 +1,143 @@
+"""Append-only journal for incoming contact messages.
+
+The contact form only appends one line to ``<JOURNAL_DIR>/messages.jsonl``
+(fsynced) and returns; a background job later folds pending entries into
+data.json and trims them from the journal. Message ids come from a
+sequence file kept next to the journal, never below the highest id
+data.json already holds (an imported site may have raised it).
+"""
+import os
+import fcntl
+from contextlib import contextmanager
+
+import serialization
+import tenancy
+
+JOURNAL_DIR = os.environ.get('JOURNAL_DIR', 'journal')
+JOURNAL_FILE = 'messages.jsonl'
+SEQUENCE_FILE = 'messages.seq'
+
+
+def journal_dir():
+    """Journal directory of the current tenant"""
+    return tenancy.tenant_path(JOURNAL_DIR)
+
+
+@contextmanager
+def journal_lock(name='.journal.lock'):
+    """Exclusive lock shared by threads and worker processes"""
+    directory = journal_dir()
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def journal_path():
+    return os.path.join(journal_dir(), JOURNAL_FILE)
+
+
+def sequence_path():
+    return os.path.join(journal_dir(), SEQUENCE_FILE)
+
+
+def read_sequence():
+    try:
+        with open(sequence_path(), 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def write_sequence(last_id):
+    path = sequence_path()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(str(last_id))
+    os.replace(tmp_path, path)
+
+
+def allocate_id(initial_max):
+    """Next message id, above both the sequence and initial_max()"""
+    new_id = max(read_sequence(), initial_max()) + 1
+    write_sequence(new_id)
+    return new_id
+
+
+def advance_sequence(last_id):
+    """Make sure ids allocated from now on are above last_id"""
+    with journal_lock():
+        if read_sequence() < last_id:
+            write_sequence(last_id)
+
+
+def append_message(build, initial_max):
+    """Allocate an id, build the record and append it durably; returns the record"""
+    with journal_lock():
+        record = build(allocate_id(initial_max))
+        line = serialization.dumps(record) + b'\n'
+        fd = os.open(journal_path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    return record
+
+
+def pending_messages():
+    """Journaled messages not yet folded into data.json"""
+    try:
+        with open(journal_path(), 'rb') as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    records = []
+    for line in lines:
+        try:
+            records.append(serialization.loads(line))
+        except ValueError:
+            # A torn final line from a crash mid-write; the sender got an error
+            continue
+    return records
+
+
+def message_key(message):
+    return message.get('date'), message.get('email'), message.get('message')
+
+
+def apply_pending(data, next_id):
+    """Add pending messages to a loaded data.json; returns the highest journal id handled
+
+    A message data.json already holds was applied before a crash and is
+    skipped. One whose id was taken in the meantime, e.g. by an imported
+    site, is added under next_id() instead.
+    """
+    pending = pending_messages()
+    if not pending:
+        return 0
+    messages = data.setdefault('messages', [])
+    applied = {message_key(m) for m in messages}
+    ids = {m.get('id') for m in messages}
+    for message in pending:
+        if message_key(message) in applied:
+            continue
+        if message.get('id') in ids:
+            message = dict(message, id=next_id())
+        messages.append(message)
+        applied.add(message_key(message))
+        ids.add(message['id'])
+    return max(m.get('id', 0) for m in pending)
+
+
+def discard_through(through_id):
+    """Drop journal entries up to through_id once data.json holds them"""
+    with journal_lock():
+        remaining = [m for m in pending_messages() if m.get('id', 0) > through_id]
+        tmp_path = f"{journal_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(serialization.dumps(m) + b'\n' for m in remaining))
+        os.replace(tmp_path, journal_path())
@@ -0,0 +1,294 @@
+"""In-process metrics with Prometheus text exposition across gunicorn workers.
+
+Each process keeps counters, gauges and histograms in memory and
+periodically snapshots them to ``<METRICS_DIR>/metrics-<pid>-<token>.json``.
+The ``/metrics`` view merges every snapshot: counters and histograms are
+summed over all processes (snapshots of exited workers are folded into
+``metrics-archive.json`` so totals never go backwards), gauges only over
+processes that are still alive.
+"""
+import os
+import time
+import json
+import uuid
+import atexit
+import fcntl
+import threading
+from contextlib import contextmanager
+
+METRICS_DIR = os.environ.get('METRICS_DIR', 'metrics')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+ARCHIVE_FILE = 'metrics-archive.json'
+LOCK_FILE = '.metrics.lock'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name: (type, help)
+METRIC_DEFINITIONS = {
+    'http_requests_total': ('counter', 'HTTP requests by endpoint, method and status'),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by endpoint and method'),
+    'storage_reads_total': ('counter', 'Storage file reads'),
+    'storage_read_bytes_total': ('counter', 'Bytes read from storage files'),
+    'storage_writes_total': ('counter', 'Storage file writes'),
+    'storage_write_bytes_total': ('counter', 'Bytes written to storage files'),
+    'storage_operation_seconds': ('histogram', 'Time spent in load_data/save_data'),
+    'backups_total': ('counter', 'Backups created by type'),
+    'backup_duration_seconds': ('histogram', 'Time spent creating a backup'),
+    'backup_replications_total': ('counter', 'Backups uploaded to or fetched from the offsite bucket by outcome'),
+    'jobs_enqueued_total': ('counter', 'Background jobs queued by task'),
+    'jobs_total': ('counter', 'Background jobs run by task and outcome'),
+    'job_duration_seconds': ('histogram', 'Time spent running a background job'),
+    'job_queue_depth': ('gauge', 'Background jobs by queue and state (queued, delayed, running, dead)'),
+    'notifications_sent_total': ('counter', 'Notifications delivered by channel'),
+    'notification_failures_total': ('counter', 'Notifications that failed by channel'),
+    'notification_duration_seconds': ('histogram', 'Time spent delivering a notification'),
+    'pdf_render_seconds': ('histogram', 'Time spent rendering the CV PDF'),
+    'page_cache_total': ('counter', 'Public page renders served from or added to the tenant cache'),
+    'fragment_cache_total': ('counter', 'Template fragments served from or added to the tenant cache'),
+    'json_parse_seconds': ('histogram', 'Time spent parsing JSON data files by backend'),
+    'json_serialize_seconds': ('histogram', 'Time spent serialising JSON data files by backend')
+}
+
+PROCESS_TOKEN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+METRICS_LOCK = threading.Lock()
+COUNTERS = {}    # {(name, labels): value}
+GAUGES = {}      # {(name, labels): value}
+HISTOGRAMS = {}  # {(name, labels): [bucket counts..., sum, count]}
+LAST_FLUSH = [0.0]
+
+
+def label_key(labels):
+    """Hashable, ordered representation of a label set"""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """Increase a counter"""
+    key = (name, label_key(labels))
+    with METRICS_LOCK:
+        COUNTERS[key] = COUNTERS.get(key, 0) + value
+
+
+def gauge_add(name, delta, **labels):
+    """Move a gauge up or down"""
+    key = (name, label_key(labels))
+    with METRICS_LOCK:
+        GAUGES[key] = GAUGES.get(key, 0) + delta
+
+
+def set_gauge(totals, name, value, **labels):
+    """Put a gauge read at collection time (not kept per process) into merged totals"""
+    totals['gauges'][(name, label_key(labels))] = value
+
+
+def observe(name, value, **labels):
+    """Record a histogram observation"""
+    key = (name, label_key(labels))
+    with METRICS_LOCK:
+        series = HISTOGRAMS.get(key)
+        if series is None:
+            series = HISTOGRAMS[key] = [0] * (len(DEFAULT_BUCKETS) + 2)
+        for i, bound in enumerate(DEFAULT_BUCKETS):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe the duration of a block in seconds"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def snapshot():
+    """JSON-serialisable copy of this process's metrics"""
+    with METRICS_LOCK:
+        return {
+            'pid': os.getpid(),
+            'counters': [[n, list(map(list, l)), v] for (n, l), v in COUNTERS.items()],
+            'gauges': [[n, list(map(list, l)), v] for (n, l), v in GAUGES.items()],
+            'histograms': [[n, list(map(list, l)), list(v)] for (n, l), v in HISTOGRAMS.items()]
+        }
+
+
+def write_json_atomic(path, payload):
+    """Write JSON so readers never see a partial file"""
+    tmp_path = f"{path}.{PROCESS_TOKEN}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def flush(force=False):
+    """Persist this process's snapshot, at most every METRICS_FLUSH_INTERVAL seconds"""
+    now = time.monotonic()
+    if not force and now - LAST_FLUSH[0] < METRICS_FLUSH_INTERVAL:
+        return
+    LAST_FLUSH[0] = now
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        write_json_atomic(os.path.join(METRICS_DIR, f"metrics-{PROCESS_TOKEN}.json"), snapshot())
+    except OSError:
+        pass
+
+
+def reset_after_fork():
+    """A forked worker reports its own metrics, not a copy of its parent's"""
+    global PROCESS_TOKEN, METRICS_LOCK
+    PROCESS_TOKEN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    METRICS_LOCK = threading.Lock()
+    COUNTERS.clear()
+    GAUGES.clear()
+    HISTOGRAMS.clear()
+    LAST_FLUSH[0] = 0.0
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def pid_alive(pid):
+    """Check whether a process id still exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_into(totals, snap, include_gauges):
+    """Add one snapshot into running totals"""
+    for name, labels, value in snap.get('counters', []):
+        key = (name, tuple(map(tuple, labels)))
+        totals['counters'][key] = totals['counters'].get(key, 0) + value
+    if include_gauges:
+        for name, labels, value in snap.get('gauges', []):
+            key = (name, tuple(map(tuple, labels)))
+            totals['gauges'][key] = totals['gauges'].get(key, 0) + value
+    for name, labels, series in snap.get('histograms', []):
+        key = (name, tuple(map(tuple, labels)))
+        current = totals['histograms'].get(key)
+        if current is None:
+            totals['histograms'][key] = list(series)
+        else:
+            totals['histograms'][key] = [a + b for a, b in zip(current, series)]
+
+
+def read_json(path, default):
+    """Load a JSON file, tolerating it disappearing or being empty"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def collect():
+    """Merge the snapshots of all processes, folding exited ones into the archive"""
+    flush(force=True)
+    totals = {'counters': {}, 'gauges': {}, 'histograms': {}}
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+    with open(os.path.join(METRICS_DIR, LOCK_FILE), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = os.path.join(METRICS_DIR, ARCHIVE_FILE)
+        archive = {'counters': {}, 'gauges': {}, 'histograms': {}}
+        merge_into(archive, read_json(archive_path, {}), include_gauges=False)
+        archive_changed = False
+
+        for name in os.listdir(METRICS_DIR):
+            if not (name.startswith('metrics-') and name.endswith('.json')) or name == ARCHIVE_FILE:
+                continue
+            path = os.path.join(METRICS_DIR, name)
+            snap = read_json(path, None)
+            if snap is None:
+                continue
+            if pid_alive(snap.get('pid', -1)):
+                merge_into(totals, snap, include_gauges=True)
+            else:
+                merge_into(archive, snap, include_gauges=False)
+                os.remove(path)
+                archive_changed = True
+
+        if archive_changed:
+            write_json_atomic(archive_path, {
+                'counters': [[n, list(map(list, l)), v] for (n, l), v in archive['counters'].items()],
+                'histograms': [[n, list(map(list, l)), v] for (n, l), v in archive['histograms'].items()]
+            })
+
+    for kind in ('counters', 'histograms'):
+        for key, value in archive[kind].items():
+            if kind == 'counters':
+                totals[kind][key] = totals[kind].get(key, 0) + value
+            else:
+                current = totals[kind].get(key)
+                totals[kind][key] = value if current is None else [a + b for a, b in zip(current, value)]
+    return totals
+
+
+def format_labels(labels, extra=None):
+    """Render {k="v",...} with Prometheus escaping"""
+    pairs = list(labels) + (extra or [])
+    if not pairs:
+        return ''
+    rendered = ','.join(
+        '%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in pairs)
+    return '{' + rendered + '}'
+
+
+def render_prometheus(totals):
+    """Prometheus text exposition format (0.0.4)"""
+    lines = []
+    by_name = {}
+    for kind in ('counters', 'gauges', 'histograms'):
+        for (name, labels), value in totals[kind].items():
+            by_name.setdefault(name, []).append((labels, value))
+
+    for name in sorted(by_name):
+        metric_type, help_text = METRIC_DEFINITIONS.get(name, ('untyped', name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in sorted(by_name[name]):
+            if metric_type == 'histogram':
+                cumulative = 0
+                for bound, count in zip(DEFAULT_BUCKETS, value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{format_labels(labels, [('le', '+Inf')])} {value[-1]}")
+                lines.append(f"{name}_sum{format_labels(labels)} {value[-2]}")
+                lines.append(f"{name}_count{format_labels(labels)} {value[-1]}")
+            else:
+                lines.append(f"{name}{format_labels(labels)} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    """Record per-endpoint request counts and latency"""
+    from flask import g, request
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('request_started_at', None)
+        if started is not None:
+            endpoint = request.endpoint or 'unmatched'
+            observe('http_request_duration_seconds', time.perf_counter() - started,
+                    endpoint=endpoint, method=request.method)
+            inc('http_requests_total', endpoint=endpoint, method=request.method,
+                status=response.status_code)
+        flush()
+        return response
+
+    atexit.register(flush, True)
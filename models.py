@@ -0,0 +1,259 @@
+"""Typed records for the lists stored in data.json.
+
+Projects, messages, clients, skills and visitor hits are slotted
+dataclasses. ``from_dict`` validates and coerces a stored record once
+(numeric ``price`` and ``level``, ``date``/``created_at`` parsed to
+datetimes, boolean ``read``); ``to_dict`` turns it back into the JSON
+shape the templates and backups expect. Keys a record has that the model
+doesn't know about are kept in ``extra`` so nothing is lost on a round
+trip. ``get_records`` keeps the typed lists of each tenant's data.json in
+the process-wide tenant cache and rebuilds them only when the data
+version changes.
+"""
+import math
+from datetime import datetime
+from dataclasses import dataclass, field, fields
+from typing import Optional, Union
+
+import tenancy
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def parse_datetime(value):
+    """datetime from the stored format; unparseable strings are kept as they are"""
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def format_datetime(value):
+    """Stored form of a parsed datetime"""
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    return value if value is not None else ''
+
+
+def parse_price(value):
+    """Price as a number, or None when not set"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def valid_price(value):
+    """Whether a submitted price is empty or a plain non-negative number like 1500.50"""
+    if value is None or value == '':
+        return True
+    price = parse_price(value)
+    return price is not None and math.isfinite(price) and price >= 0
+
+
+def format_price(value):
+    """Whole prices are stored as integers, missing prices as ''"""
+    if value is None:
+        return ''
+    return int(value) if float(value).is_integer() else value
+
+
+def parse_int(value, default=0):
+    """int from a number or digit string"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_level(value):
+    """Skill level in 0-100; anything else counts as 0"""
+    level = parse_int(value)
+    return level if 0 <= level <= 100 else 0
+
+
+def parse_bool(value):
+    """bool from JSON booleans and their common string forms"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+class Record:
+    """from_dict()/to_dict() for the dataclasses below"""
+
+    __slots__ = ()
+
+    # {field name: (parse, format)}; other fields are copied as they are
+    CONVERTERS = {}
+    # Fields left out of to_dict() while they are None
+    OPTIONAL = ()
+
+    @classmethod
+    def from_dict(cls, raw):
+        parsers, _ = cls.converters()
+        values = {}
+        extra = {}
+        for name, value in raw.items():
+            if name in parsers:
+                parse = parsers[name]
+                values[name] = parse(value) if parse else value
+            else:
+                extra[name] = value
+        return cls(extra=extra, **values)
+
+    @classmethod
+    def converters(cls):
+        """({field: parse or None}, [(field, format or None)]) built once per class"""
+        cached = cls.__dict__.get('_converters')
+        if cached is None:
+            names = [f.name for f in fields(cls) if f.name != 'extra']
+            cached = ({n: cls.CONVERTERS.get(n, (None, None))[0] for n in names},
+                      [(n, cls.CONVERTERS.get(n, (None, None))[1]) for n in names])
+            type.__setattr__(cls, '_converters', cached)
+        return cached
+
+    def to_dict(self):
+        _, formatters = self.converters()
+        result = {}
+        for name, format_value in formatters:
+            value = getattr(self, name)
+            if value is None and name in self.OPTIONAL:
+                continue
+            result[name] = format_value(value) if format_value else value
+        if self.extra:
+            result.update(self.extra)
+        return result
+
+
+@dataclass(slots=True)
+class Skill(Record):
+    name: str = ''
+    level: int = 0
+    extra: dict = field(default_factory=dict)
+
+    CONVERTERS = {'level': (parse_level, int)}
+
+
+@dataclass(slots=True)
+class Project(Record):
+    id: int = 0
+    title: str = ''
+    short_description: str = ''
+    content: str = ''
+    content_format: Optional[str] = None
+    description: str = ''
+    image: str = 'static/assets/project-placeholder.svg'
+    demo_url: str = '#'
+    github_url: str = '#'
+    technologies: list = field(default_factory=list)
+    created_at: Optional[Union[datetime, str]] = None
+    updated_at: Optional[Union[datetime, str]] = None
+    extra: dict = field(default_factory=dict)
+
+    CONVERTERS = {'id': (parse_int, int), 'created_at': (parse_datetime, format_datetime),
+                  'updated_at': (parse_datetime, format_datetime)}
+    OPTIONAL = ('content_format', 'created_at', 'updated_at')
+
+
+@dataclass(slots=True)
+class Message(Record):
+    id: int = 0
+    name: str = ''
+    email: str = ''
+    message: str = ''
+    date: Optional[Union[datetime, str]] = None
+    read: bool = False
+    ip: str = 'unknown'
+    extra: dict = field(default_factory=dict)
+
+    CONVERTERS = {'id': (parse_int, int), 'date': (parse_datetime, format_datetime),
+                  'read': (parse_bool, bool)}
+
+
+@dataclass(slots=True)
+class Client(Record):
+    id: int = 0
+    name: str = ''
+    email: str = ''
+    phone: str = ''
+    company: str = ''
+    project_title: str = ''
+    project_description: str = ''
+    status: str = 'lead'
+    price: Optional[float] = None
+    deadline: str = ''
+    start_date: str = ''
+    notes: str = ''
+    payment_status: str = 'pending'
+    created_at: Optional[Union[datetime, str]] = None
+    status_updated_at: Optional[Union[datetime, str]] = None
+    extra: dict = field(default_factory=dict)
+
+    CONVERTERS = {'id': (parse_int, int), 'price': (parse_price, format_price),
+                  'created_at': (parse_datetime, format_datetime),
+                  'status_updated_at': (parse_datetime, format_datetime)}
+    OPTIONAL = ('status_updated_at',)
+
+
+@dataclass(slots=True)
+class VisitorHit(Record):
+    ip: str = 'unknown'
+    timestamp: Optional[Union[datetime, str]] = None
+    date: str = ''
+    extra: dict = field(default_factory=dict)
+
+    CONVERTERS = {'timestamp': (parse_datetime, format_datetime)}
+
+
+# data.json list -> record type
+COLLECTIONS = {
+    'projects': Project,
+    'messages': Message,
+    'clients': Client,
+    'skills': Skill
+}
+
+
+def collection_items(data, collection):
+    """Raw records of a collection, including the nested visitor hits"""
+    if collection == 'visitor_hits':
+        return (data.get('visitors') or {}).get('today', [])
+    return data.get(collection, [])
+
+
+def record_type(collection):
+    """Model class for a collection name"""
+    return VisitorHit if collection == 'visitor_hits' else COLLECTIONS[collection]
+
+
+def to_records(data, collection):
+    """Typed records of one collection of a loaded data.json document"""
+    model = record_type(collection)
+    return [model.from_dict(item) for item in collection_items(data, collection)
+            if isinstance(item, dict)]
+
+
+def coerce(collection, raw):
+    """Validated JSON form of one record, as written to data.json"""
+    return record_type(collection).from_dict(raw).to_dict()
+
+
+def get_records(collection, load, version, size=0):
+    """Typed records of the current data, rebuilt only when version changes
+
+    version is anything that changes with the data (None disables caching);
+    size is what the records count for against the tenant cache.
+    """
+    records = tenancy.CACHE.get('records', collection, version)
+    if records is not None:
+        return records
+    records = to_records(load(), collection)
+    tenancy.CACHE.put('records', collection, version, records, size)
+    return records
@@ -0,0 +1,155 @@
+"""Opt-in per-request profiling with cProfile.
+
+Nothing is registered unless ``PROFILING_ENABLED`` is set, so a disabled
+profiler costs nothing per request. When enabled, a request is profiled if
+a logged-in (non-demo) admin adds ``?_profile=1`` or an ``X-Profile: 1``
+header, or if it is picked by ``PROFILE_SAMPLE_RATE`` (0.0-1.0). Summaries
+of the last ``PROFILE_MAX_ENTRIES`` profiles are kept as JSON files in
+``PROFILE_DIR`` so every worker's profiles show up on the dashboard.
+
+One request per process is profiled at a time: since Python 3.12 only one
+profiler can be active per process, so a request that would overlap a
+profiled one runs unprofiled instead of waiting.
+"""
+import os
+import io
+import json
+import time
+import uuid
+import random
+import threading
+import pstats
+import cProfile
+from datetime import datetime
+
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_MAX_ENTRIES = int(os.environ.get('PROFILE_MAX_ENTRIES', 50))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_TOP_FUNCTIONS = 25
+# Held while a request is being profiled
+PROFILER_LOCK = threading.Lock()
+
+
+def profile_trigger(request, session):
+    """Why this request should be profiled, or None"""
+    if session.get('admin_logged_in') and not session.get('is_demo'):
+        if request.args.get('_profile') == '1' or request.headers.get('X-Profile') == '1':
+            return 'admin'
+    if PROFILE_SAMPLE_RATE and request.endpoint != 'static' and random.random() < PROFILE_SAMPLE_RATE:
+        return 'sampled'
+    return None
+
+
+def short_location(filename):
+    """Trim interpreter and project prefixes from a source path"""
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    if filename.startswith(os.getcwd() + os.sep):
+        return os.path.relpath(filename)
+    return filename
+
+
+def summarize_profile(profiler):
+    """Top functions by cumulative time"""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, function), (calls, primitive, tottime, cumtime, callers) in stats.stats.items():
+        if filename == __file__:
+            continue
+        rows.append({
+            'function': function,
+            'location': f"{short_location(filename)}:{line}",
+            'calls': calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3)
+        })
+    rows.sort(key=lambda r: r['cumtime_ms'], reverse=True)
+    return rows[:PROFILE_TOP_FUNCTIONS]
+
+
+def save_profile(entry):
+    """Store a profile summary and drop the oldest beyond PROFILE_MAX_ENTRIES"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:6]}.json"
+    with open(os.path.join(PROFILE_DIR, filename), 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False)
+
+    stored = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith('.json'))
+    for name in stored[:-PROFILE_MAX_ENTRIES]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except FileNotFoundError:
+            pass
+
+
+def list_profiles():
+    """Stored profiles, slowest first"""
+    profiles = []
+    if not os.path.isdir(PROFILE_DIR):
+        return profiles
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+        entry['id'] = name[:-len('.json')]
+        profiles.append(entry)
+    return sorted(profiles, key=lambda p: p.get('duration_ms', 0), reverse=True)
+
+
+def init_profiling(app):
+    """Register the profiling hooks when PROFILING_ENABLED is set"""
+    if not PROFILING_ENABLED:
+        return
+
+    from flask import g, request, session
+
+    @app.before_request
+    def start_profiler():
+        trigger = profile_trigger(request, session)
+        if trigger is None or not PROFILER_LOCK.acquire(blocking=False):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool already holds the process (Python 3.12+)
+            PROFILER_LOCK.release()
+            return
+        g.profile = (profiler, trigger, time.perf_counter())
+
+    @app.after_request
+    def stop_profiler(response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        profiler, trigger, started = profile
+        profiler.disable()
+        PROFILER_LOCK.release()
+        try:
+            save_profile({
+                'path': request.full_path.rstrip('?'),
+                'endpoint': request.endpoint,
+                'method': request.method,
+                'status': response.status_code,
+                'trigger': trigger,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'functions': summarize_profile(profiler)
+            })
+        except Exception as e:
+            app.logger.error(f"Error saving request profile: {str(e)}")
+        return response
+
+    @app.teardown_request
+    def discard_profiler(exc):
+        # after_request doesn't run for unhandled exceptions
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile[0].disable()
+            PROFILER_LOCK.release()
@@ -0,0 +1,156 @@
+"""Offsite copies of backups in an S3-compatible bucket.
+
+Backups live in ``backups/`` on the same disk as data.json, which
+Render/Heroku-style hosts wipe on every deploy. With ``BACKUP_S3_BUCKET``
+set (and boto3 installed) manual and scheduled backups are also uploaded
+to the bucket by a ``replicate_backup`` job on the maintenance queue; the
+automatic backup taken before every save stays local. Files are streamed
+from disk with multipart uploads of ``BACKUP_S3_PART_MB`` parts, at most
+``BACKUP_S3_CONCURRENCY`` parts at a time; failed requests are retried
+by botocore and failed jobs by the job queue.
+
+Objects are ``<BACKUP_S3_PREFIX><filename>`` for the main site and
+``<BACKUP_S3_PREFIX>tenants/<tenant>/<filename>`` for tenants, with the
+SHA-256 of the file in their metadata. The dashboard lists the bucket
+next to the local backups and fetches a backup only when it is restored
+or downloaded. Nothing here deletes offsite copies: the bucket needs a
+lifecycle rule that expires old objects.
+
+``BACKUP_S3_ENDPOINT`` points at any S3-compatible service (MinIO, R2,
+B2...); credentials come from the usual AWS variables or files.
+
+    python replication.py list [--tenant alice]
+    python replication.py push [--all] [--tenant alice]
+    python replication.py fetch backup_20250101_120000.json [--tenant alice]
+"""
+import os
+import uuid
+import hashlib
+import argparse
+
+import tenancy
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
+except ImportError:
+    boto3 = None
+
+BACKUP_S3_BUCKET = os.environ.get('BACKUP_S3_BUCKET', '')
+BACKUP_S3_PREFIX = os.environ.get('BACKUP_S3_PREFIX', 'portfolio-backups/')
+BACKUP_S3_ENDPOINT = os.environ.get('BACKUP_S3_ENDPOINT') or None
+BACKUP_S3_REGION = os.environ.get('BACKUP_S3_REGION') or None
+BACKUP_S3_CONCURRENCY = int(os.environ.get('BACKUP_S3_CONCURRENCY', 4))
+# S3 rejects parts under 5 MB (except the last)
+BACKUP_S3_PART_BYTES = max(5, int(os.environ.get('BACKUP_S3_PART_MB', 8))) * 1024 * 1024
+BACKUP_S3_RETRIES = int(os.environ.get('BACKUP_S3_RETRIES', 5))
+CHUNK_SIZE = 64 * 1024
+
+
+class ReplicationError(Exception):
+    """The bucket is not configured, unreachable or holds a damaged copy"""
+
+
+def enabled():
+    return bool(BACKUP_S3_BUCKET) and boto3 is not None
+
+
+def client():
+    if not enabled():
+        raise ReplicationError('Set BACKUP_S3_BUCKET and install boto3 to replicate backups')
+    config = Config(retries={'max_attempts': BACKUP_S3_RETRIES, 'mode': 'standard'},
+                    max_pool_connections=max(BACKUP_S3_CONCURRENCY, 1) + 2)
+    return boto3.client('s3', endpoint_url=BACKUP_S3_ENDPOINT, region_name=BACKUP_S3_REGION, config=config)
+
+
+def transfer_config():
+    return TransferConfig(multipart_threshold=BACKUP_S3_PART_BYTES, multipart_chunksize=BACKUP_S3_PART_BYTES,
+                          max_concurrency=max(BACKUP_S3_CONCURRENCY, 1), use_threads=BACKUP_S3_CONCURRENCY > 1)
+
+
+def tenant_prefix():
+    """Key prefix of the current tenant's backups"""
+    tenant = tenancy.current_tenant()
+    return f"{BACKUP_S3_PREFIX}tenants/{tenant}/" if tenant else BACKUP_S3_PREFIX
+
+
+def object_key(filename):
+    return tenant_prefix() + filename
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def upload(path, filename=None):
+    """Copy a local backup to the bucket; returns its key"""
+    key = object_key(filename or os.path.basename(path))
+    extra = {'ContentType': 'application/json', 'Metadata': {'sha256': file_sha256(path)}}
+    client().upload_file(path, BACKUP_S3_BUCKET, key, ExtraArgs=extra, Config=transfer_config())
+    return key
+
+
+def list_remote():
+    """[{'filename', 'size', 'modified'}] of the current tenant's offsite backups"""
+    s3 = client()
+    backups = []
+    # Delimiter keeps the main site's listing out of tenants/
+    for page in s3.get_paginator('list_objects_v2').paginate(
+            Bucket=BACKUP_S3_BUCKET, Prefix=tenant_prefix(), Delimiter='/'):
+        for item in page.get('Contents', []):
+            filename = item['Key'][len(tenant_prefix()):]
+            if filename.endswith('.json') and filename != 'backups.json':
+                backups.append({'filename': filename, 'size': item['Size'], 'modified': item['LastModified']})
+    return sorted(backups, key=lambda backup: backup['modified'], reverse=True)
+
+
+def fetch(filename, path):
+    """Download an offsite backup to path, checking it against its stored hash"""
+    s3 = client()
+    key = object_key(filename)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        expected = s3.head_object(Bucket=BACKUP_S3_BUCKET, Key=key).get('Metadata', {}).get('sha256')
+        s3.download_file(BACKUP_S3_BUCKET, key, tmp_path, Config=transfer_config())
+        if expected and file_sha256(tmp_path) != expected:
+            raise ReplicationError(f"Offsite copy of {filename} does not match its hash")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offsite backups in an S3-compatible bucket')
+    parser.add_argument('command', choices=('list', 'push', 'fetch'))
+    parser.add_argument('filename', nargs='?', help='backup to fetch')
+    parser.add_argument('--all', action='store_true', help='push every local backup, not only missing ones')
+    parser.add_argument('--tenant', help='tenant to work on (multi-tenant setups)')
+    args = parser.parse_args()
+
+    import app as portfolio
+
+    with tenancy.use_tenant(args.tenant):
+        if args.command == 'list':
+            for backup in list_remote():
+                print(f"{backup['modified']:%Y-%m-%d %H:%M:%S}  {backup['size']:>10}  {backup['filename']}")
+        elif args.command == 'push':
+            remote = set() if args.all else {backup['filename'] for backup in list_remote()}
+            for backup in portfolio.get_backups_list():
+                path = os.path.join(portfolio.backup_dir(), backup['filename'])
+                if backup['filename'] not in remote and os.path.exists(path):
+                    print(upload(path))
+        else:
+            if not args.filename:
+                parser.error('fetch needs a backup filename')
+            print(fetch(os.path.basename(args.filename), os.path.join(portfolio.backup_dir(), os.path.basename(args.filename))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Copy-on-write sandboxes for demo sessions.
+
+Each demo login gets a sandbox id. Its reads see a shared, read-only base
+document (``DEMO_BASE_FILE`` if present, otherwise one the app builds)
+with the session's overlay on top; its writes only store the top-level
+sections that differ from the base, in a SQLite table shared by all
+worker processes. Sandboxes idle for ``DEMO_SANDBOX_TTL`` seconds are
+dropped, and when all overlays together exceed ``DEMO_SANDBOX_MAX_MB``
+the least recently used go first. One overlay may not grow past
+``DEMO_SANDBOX_SESSION_KB``. Nothing here touches data.json or backups.
+Each tenant has its own base; sandbox ids are unique across tenants.
+"""
+import os
+import time
+import uuid
+import sqlite3
+import threading
+
+import serialization
+import tenancy
+
+DEMO_SANDBOX_DB = os.environ.get('DEMO_SANDBOX_DB', os.path.join('cache', 'demo_sandbox.sqlite3'))
+DEMO_SANDBOX_TTL = float(os.environ.get('DEMO_SANDBOX_TTL', 3600))
+DEMO_SANDBOX_MAX_BYTES = int(float(os.environ.get('DEMO_SANDBOX_MAX_MB', 32)) * 1024 * 1024)
+DEMO_SANDBOX_SESSION_BYTES = int(float(os.environ.get('DEMO_SANDBOX_SESSION_KB', 512)) * 1024)
+DEMO_BASE_FILE = os.environ.get('DEMO_BASE_FILE', 'demo_data.json')
+# How long a built (not file-backed) base is reused before it is rebuilt
+DEMO_BASE_REFRESH = float(os.environ.get('DEMO_BASE_REFRESH', 300))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS overlays (
+    sandbox_id TEXT PRIMARY KEY,
+    overlay BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    touched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS overlays_touched ON overlays (touched_at);
+"""
+
+LOCAL = threading.local()
+BASE_LOCK = threading.Lock()
+
+
+class SandboxFull(Exception):
+    """A demo session's changes exceed DEMO_SANDBOX_SESSION_KB"""
+
+
+def connection():
+    """Per-thread SQLite connection to the overlay database"""
+    conn = getattr(LOCAL, 'conn', None)
+    if conn is None:
+        os.makedirs(os.path.dirname(DEMO_SANDBOX_DB) or '.', exist_ok=True)
+        conn = sqlite3.connect(DEMO_SANDBOX_DB, timeout=30, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        LOCAL.conn = conn
+    return conn
+
+
+def reset_after_fork():
+    global LOCAL, BASE_LOCK
+    LOCAL = threading.local()
+    BASE_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def new_sandbox_id():
+    return uuid.uuid4().hex
+
+
+def base_document(build):
+    """(raw bytes, {section: serialized value}) of the shared base"""
+    base_file = tenancy.tenant_path(DEMO_BASE_FILE)
+    try:
+        stat = os.stat(base_file)
+        version = ('file', stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        version = ('built', int(time.time() // DEMO_BASE_REFRESH))
+    with BASE_LOCK:
+        # Kept in the tenant cache, so a tenant's base goes when it idles
+        cached = tenancy.CACHE.get('demo_base', 'base', version)
+        if cached is not None:
+            return cached
+        if version[0] == 'file':
+            with open(base_file, 'rb') as f:
+                raw = f.read()
+            document = serialization.loads(raw)
+        else:
+            document = build()
+            raw = serialization.dumps(document)
+        sections = {key: serialization.dumps(value) for key, value in document.items()}
+        tenancy.CACHE.put('demo_base', 'base', version, (raw, sections),
+                          len(raw) + sum(len(value) for value in sections.values()))
+        return raw, sections
+
+
+def load(sandbox_id, build):
+    """The sandbox's view of data.json: a fresh copy of the base plus its overlay"""
+    raw, _ = base_document(build)
+    data = serialization.loads(raw)
+    conn = connection()
+    row = conn.execute('SELECT overlay, touched_at FROM overlays WHERE sandbox_id = ?',
+                       (sandbox_id,)).fetchone()
+    if row is not None:
+        now = time.time()
+        # Reads keep a sandbox alive too; refresh at most once a minute
+        if now - row[1] > 60:
+            conn.execute('UPDATE overlays SET touched_at = ? WHERE sandbox_id = ?', (now, sandbox_id))
+        overlay = serialization.loads(row[0])
+        data.update(overlay['set'])
+        for key in overlay['deleted']:
+            data.pop(key, None)
+    return data
+
+
+def save(sandbox_id, data, build):
+    """Store the sections of data that differ from the base"""
+    _, sections = base_document(build)
+    overlay = {
+        'set': {key: value for key, value in data.items()
+                if sections.get(key) != serialization.dumps(value)},
+        'deleted': [key for key in sections if key not in data]
+    }
+    blob = serialization.dumps(overlay)
+    if len(blob) > DEMO_SANDBOX_SESSION_BYTES:
+        raise SandboxFull(f"Demo changes are limited to {DEMO_SANDBOX_SESSION_BYTES // 1024} KB")
+    connection().execute(
+        'INSERT INTO overlays (sandbox_id, overlay, size, touched_at) VALUES (?, ?, ?, ?) '
+        'ON CONFLICT(sandbox_id) DO UPDATE SET overlay = excluded.overlay, size = excluded.size, '
+        'touched_at = excluded.touched_at', (sandbox_id, blob, len(blob), time.time()))
+    evict()
+    return len(blob)
+
+
+def discard(sandbox_id):
+    connection().execute('DELETE FROM overlays WHERE sandbox_id = ?', (sandbox_id,))
+
+
+def evict(now=None):
+    """Drop idle sandboxes, then the least recently used while over the size cap"""
+    now = now or time.time()
+    conn = connection()
+    conn.execute('DELETE FROM overlays WHERE touched_at < ?', (now - DEMO_SANDBOX_TTL,))
+    total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM overlays').fetchone()[0]
+    if total <= DEMO_SANDBOX_MAX_BYTES:
+        return
+    for sandbox_id, size in conn.execute(
+            'SELECT sandbox_id, size FROM overlays ORDER BY touched_at').fetchall():
+        conn.execute('DELETE FROM overlays WHERE sandbox_id = ?', (sandbox_id,))
+        total -= size
+        if total <= DEMO_SANDBOX_MAX_BYTES:
+            break
+
+
+def stats():
+    """{'sandboxes': n, 'bytes': total overlay size}"""
+    count, total = connection().execute(
+        'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM overlays').fetchone()
+    return {'sandboxes': count, 'bytes': total}
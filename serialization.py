@@ -0,0 +1,96 @@
+"""JSON parsing and serialisation for the data files.
+
+Uses orjson when installed, then msgspec, then the standard library. All
+backends write the same compact form -- UTF-8 without ASCII escaping, no
+insignificant whitespace, keys in insertion order -- so files written by
+one can be read by any other, and files in the older indented format
+still load. Pretty output is only produced for human-facing downloads.
+Parse and serialise times are recorded in the ``json_parse_seconds`` and
+``json_serialize_seconds`` histograms.
+"""
+import os
+import json
+import time
+import uuid
+
+import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = 'orjson'
+elif msgspec is not None:
+    BACKEND = 'msgspec'
+    MSGSPEC_ENCODER = msgspec.json.Encoder()
+    MSGSPEC_DECODER = msgspec.json.Decoder()
+else:
+    BACKEND = 'json'
+
+
+def loads(raw):
+    """Parse JSON from bytes or str; errors are json.JSONDecodeError"""
+    started = time.perf_counter()
+    try:
+        if BACKEND == 'orjson':
+            return orjson.loads(raw)
+        if BACKEND == 'msgspec':
+            try:
+                return MSGSPEC_DECODER.decode(raw)
+            except msgspec.DecodeError as e:
+                # Callers catch json.JSONDecodeError whichever backend is in use
+                raise json.JSONDecodeError(str(e), raw if isinstance(raw, str) else '', 0) from e
+        return json.loads(raw)
+    finally:
+        metrics.observe('json_parse_seconds', time.perf_counter() - started, backend=BACKEND)
+
+
+def dumps(obj):
+    """Compact UTF-8 encoded JSON"""
+    started = time.perf_counter()
+    try:
+        if BACKEND == 'orjson':
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        if BACKEND == 'msgspec':
+            return MSGSPEC_ENCODER.encode(obj)
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    finally:
+        metrics.observe('json_serialize_seconds', time.perf_counter() - started, backend=BACKEND)
+
+
+def dumps_pretty(obj):
+    """Indented UTF-8 encoded JSON for people to read"""
+    if BACKEND == 'orjson':
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def load_file(path):
+    """Read and parse a JSON file"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def dump_file(path, obj):
+    """Serialise obj to path in the compact form; returns the bytes written
+
+    The file is replaced atomically: readers in other threads and
+    processes see the old content or the new one, never a truncated file.
+    """
+    payload = dumps(obj)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return len(payload)
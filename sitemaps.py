@@ -0,0 +1,219 @@
+"""Sitemap files generated once per content version.
+
+The home page and project URLs are hashed together with the site URL;
+only when that digest changes is the XML rewritten under
+``<SITEMAP_DIR>/<site>/``, next to a ``manifest.json`` holding the digest,
+the ETag of each file and the home page's last change. Projects carry
+their own ``updated_at`` (falling back to ``created_at``); projects with
+neither get no ``<lastmod>`` rather than a made-up one. Above
+``SITEMAP_MAX_URLS`` URLs (50,000, the protocol limit) the URLs go into
+``sitemap-<n>.xml`` files and ``sitemap.xml`` becomes a sitemap index.
+
+The app passes one canonical URL per tenant (``SITEMAP_BASE_URL``), so a
+site normally has one directory. Without it, every Host a client sends
+is a site of its own; each tenant keeps the ``SITEMAP_MAX_SITES`` most
+recently generated ones and the oldest are removed.
+"""
+import os
+import uuid
+import fcntl
+import shutil
+import hashlib
+from datetime import datetime
+from contextlib import contextmanager
+from xml.sax.saxutils import escape
+
+import serialization
+import tenancy
+from models import parse_datetime
+
+SITEMAP_DIR = os.environ.get('SITEMAP_DIR', os.path.join('cache', 'sitemap'))
+SITEMAP_MAX_URLS = int(os.environ.get('SITEMAP_MAX_URLS', 50000))
+SITEMAP_MAX_SITES = max(1, int(os.environ.get('SITEMAP_MAX_SITES', 4)))
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = '.sitemap.lock'
+INDEX_NAME = 'sitemap.xml'
+
+# data.json fields shown on the home page
+HOME_FIELDS = ('name', 'title', 'description', 'photo', 'about', 'skills', 'contact', 'social')
+
+
+@contextmanager
+def sitemap_lock():
+    """Serialise sitemap writers across threads and worker processes"""
+    os.makedirs(SITEMAP_DIR, exist_ok=True)
+    with open(os.path.join(SITEMAP_DIR, LOCK_FILE), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def digest(value):
+    return hashlib.sha256(serialization.dumps(value)).hexdigest()
+
+
+def tenant_dir():
+    """Directory holding the sites of the current tenant"""
+    return os.path.join(SITEMAP_DIR, tenancy.current_tenant() or '_site')
+
+
+def site_dir(base_url):
+    """Directory holding the files of one site URL"""
+    return os.path.join(tenant_dir(), hashlib.sha256(base_url.encode('utf-8')).hexdigest()[:12])
+
+
+def evict_sites(keep):
+    """Remove the tenant's least recently generated sites so keep fits in SITEMAP_MAX_SITES"""
+    parent = tenant_dir()
+    if not os.path.isdir(parent):
+        return
+    sites = []
+    for name in os.listdir(parent):
+        directory = os.path.join(parent, name)
+        if directory != keep and os.path.isdir(directory):
+            manifest = os.path.join(directory, MANIFEST_FILE)
+            sites.append((os.path.getmtime(manifest if os.path.exists(manifest) else directory), directory))
+    sites.sort()
+    for _, directory in sites[:max(0, len(sites) - SITEMAP_MAX_SITES + 1)]:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def lastmod(value):
+    """W3C date of a stored timestamp, or None"""
+    parsed = parse_datetime(value)
+    return parsed.strftime('%Y-%m-%d') if isinstance(parsed, datetime) else None
+
+
+def project_urls(data, base_url):
+    """[(loc, lastmod)] for every project"""
+    return [(f"{base_url}/project/{project['id']}",
+             lastmod(project.get('updated_at') or project.get('created_at')))
+            for project in data.get('projects', []) if isinstance(project, dict) and 'id' in project]
+
+
+def render_urlset(urls):
+    """<urlset> document for [(loc, lastmod, changefreq, priority)]"""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for loc, modified, changefreq, priority in urls:
+        lines.append('<url>')
+        lines.append(f'<loc>{escape(loc)}</loc>')
+        if modified:
+            lines.append(f'<lastmod>{modified}</lastmod>')
+        lines.append(f'<changefreq>{changefreq}</changefreq>')
+        lines.append(f'<priority>{priority}</priority>')
+        lines.append('</url>')
+    lines.append('</urlset>')
+    return '\n'.join(lines).encode('utf-8')
+
+
+def render_index(sitemaps):
+    """<sitemapindex> document for [(loc, lastmod)]"""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for loc, modified in sitemaps:
+        lines.append('<sitemap>')
+        lines.append(f'<loc>{escape(loc)}</loc>')
+        if modified:
+            lines.append(f'<lastmod>{modified}</lastmod>')
+        lines.append('</sitemap>')
+    lines.append('</sitemapindex>')
+    return '\n'.join(lines).encode('utf-8')
+
+
+def load_manifest(directory):
+    try:
+        return serialization.load_file(os.path.join(directory, MANIFEST_FILE))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_file(path, content):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def build_files(base_url, urls):
+    """{file name: XML bytes}; one urlset, or chunks plus an index"""
+    if len(urls) <= SITEMAP_MAX_URLS:
+        return {INDEX_NAME: render_urlset(urls)}
+    files, chunks = {}, []
+    for start in range(0, len(urls), SITEMAP_MAX_URLS):
+        chunk = urls[start:start + SITEMAP_MAX_URLS]
+        name = f"sitemap-{len(chunks) + 1}.xml"
+        files[name] = render_urlset(chunk)
+        chunks.append((f"{base_url}/{name}", max((u[1] for u in chunk if u[1]), default=None)))
+    files[INDEX_NAME] = render_index(chunks)
+    return files
+
+
+def generate(data, base_url, now=None):
+    """Write the sitemap files of base_url if its content changed; returns the manifest"""
+    directory = site_dir(base_url)
+    home_digest = digest({key: data.get(key) for key in HOME_FIELDS})
+    projects = project_urls(data, base_url)
+    content_digest = digest([base_url, home_digest, projects])
+
+    with sitemap_lock():
+        manifest = load_manifest(directory)
+        if manifest.get('digest') == content_digest and all(
+                os.path.exists(os.path.join(directory, name)) for name in manifest.get('files', {})):
+            return manifest
+
+        # The home page lists the projects, so it changes with them; a
+        # first build has no history and dates it by the newest project
+        project_digest = digest(projects)
+        if not manifest:
+            home_lastmod = max((modified for _, modified in projects if modified),
+                               default=None) or (now or datetime.now()).strftime('%Y-%m-%d')
+        elif manifest.get('home_digest') != home_digest or manifest.get('project_digest') != project_digest:
+            home_lastmod = (now or datetime.now()).strftime('%Y-%m-%d')
+        else:
+            home_lastmod = manifest['home_lastmod']
+
+        urls = [(f"{base_url}/", home_lastmod, 'weekly', '1.0')]
+        urls.extend((loc, modified, 'monthly', '0.8') for loc, modified in projects)
+        files = build_files(base_url, urls)
+
+        if not os.path.isdir(directory):
+            evict_sites(directory)
+        os.makedirs(directory, exist_ok=True)
+        for name, content in files.items():
+            write_file(os.path.join(directory, name), content)
+        for name in os.listdir(directory):
+            if name.endswith('.xml') and name not in files:
+                os.remove(os.path.join(directory, name))
+
+        manifest = {
+            'base_url': base_url,
+            'digest': content_digest,
+            'home_digest': home_digest,
+            'project_digest': project_digest,
+            'home_lastmod': home_lastmod,
+            'url_count': len(urls),
+            'generated_at': (now or datetime.now()).isoformat(),
+            'files': {name: hashlib.sha256(content).hexdigest()[:32] for name, content in files.items()}
+        }
+        write_file(os.path.join(directory, MANIFEST_FILE), serialization.dumps(manifest))
+    return manifest
+
+
+def get_sitemap(base_url, source_version, load):
+    """Manifest for base_url; data is only loaded when source_version changed"""
+    # Memoised per tenant so unchanged data skips the digest
+    manifest = tenancy.CACHE.get('sitemap', base_url, source_version)
+    # Another host's sitemap may have evicted the files since
+    if manifest is not None and os.path.exists(os.path.join(site_dir(base_url), MANIFEST_FILE)):
+        return manifest
+    manifest = generate(load(), base_url)
+    tenancy.CACHE.put('sitemap', base_url, source_version, manifest, 1024 + 64 * len(manifest['files']))
+    return manifest
+
+
+def sitemap_path(base_url, name):
+    """Absolute path of a generated file (send_file resolves relative paths against the app)"""
+    return os.path.abspath(os.path.join(site_dir(base_url), name))
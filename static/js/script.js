@@ -170,6 +170,129 @@ document.addEventListener('DOMContentLoaded', function() {
         scrollObserver.observe(element);
     });
 
+    // ==========================================
+    // PROJECT GRID: LOAD MORE ON SCROLL
+    // ==========================================
+
+    const projectGrid = document.getElementById('projectGrid');
+    const projectsMore = document.getElementById('projectsMore');
+
+    function createElement(tag, className, text) {
+        const element = document.createElement(tag);
+        if (className) element.className = className;
+        if (text) element.textContent = text;
+        return element;
+    }
+
+    function projectLinkButton(href, className, iconClass) {
+        const link = createElement('a', className);
+        link.href = href;
+        link.target = '_blank';
+        link.addEventListener('click', event => event.stopPropagation());
+        link.appendChild(createElement('i', iconClass));
+        return link;
+    }
+
+    // Same markup as the cards rendered in index.html
+    function buildProjectCard(project) {
+        const column = createElement('div', 'col-lg-4 col-md-6 mb-4');
+        const card = createElement('div', 'project-card h-100');
+        card.style.cursor = 'pointer';
+        card.addEventListener('click', () => { window.location.href = project.url; });
+
+        const imageWrap = createElement('div', 'project-image');
+        const image = document.createElement('img');
+        image.src = project.image_url;
+        image.alt = project.title;
+        image.loading = 'lazy';
+        imageWrap.appendChild(image);
+
+        const overlay = createElement('div', 'project-overlay');
+        const buttons = createElement('div', 'text-center');
+        const details = createElement('div', 'btn btn-light me-2');
+        details.appendChild(createElement('i', 'fas fa-eye'));
+        details.appendChild(document.createTextNode(' View Details'));
+        buttons.appendChild(details);
+        if (project.demo_url && project.demo_url !== '#') {
+            buttons.appendChild(projectLinkButton(project.demo_url, 'btn btn-light me-2', 'fas fa-external-link-alt'));
+        }
+        if (project.github_url && project.github_url !== '#') {
+            buttons.appendChild(projectLinkButton(project.github_url, 'btn btn-light', 'fab fa-github'));
+        }
+        overlay.appendChild(buttons);
+        imageWrap.appendChild(overlay);
+        card.appendChild(imageWrap);
+
+        const content = createElement('div', 'project-content');
+        content.appendChild(createElement('h5', '', project.title));
+        content.appendChild(createElement('p', '', project.short_description));
+        if (project.technologies && project.technologies.length) {
+            const tech = createElement('div', 'project-tech');
+            project.technologies.forEach(name => {
+                tech.appendChild(createElement('span', 'badge bg-primary me-1 mb-1', name));
+            });
+            content.appendChild(tech);
+        }
+        card.appendChild(content);
+        column.appendChild(card);
+        return column;
+    }
+
+    if (projectGrid && projectsMore) {
+        const moreButton = projectsMore.querySelector('button');
+        let loadingProjects = false;
+
+        function loadMoreProjects() {
+            const cursor = projectsMore.dataset.cursor;
+            if (loadingProjects || !cursor) return;
+            loadingProjects = true;
+            moreButton.disabled = true;
+
+            fetch(projectsMore.dataset.api + '?cursor=' + encodeURIComponent(cursor),
+                  { headers: { 'Accept': 'application/json' } })
+                .then(response => {
+                    if (!response.ok) throw new Error('HTTP ' + response.status);
+                    return response.json();
+                })
+                .then(page => {
+                    page.projects.forEach(project => {
+                        const column = buildProjectCard(project);
+                        projectGrid.appendChild(column);
+                        const card = column.firstChild;
+                        card.style.opacity = '0';
+                        card.style.transform = 'translateY(30px)';
+                        card.style.transition = 'opacity 0.6s ease, transform 0.6s ease';
+                        scrollObserver.observe(card);
+                    });
+                    if (page.next_cursor) {
+                        projectsMore.dataset.cursor = page.next_cursor;
+                        // Re-observing fires again if the end of the grid is still in view
+                        moreObserver.unobserve(projectsMore);
+                        moreObserver.observe(projectsMore);
+                    } else {
+                        moreObserver.disconnect();
+                        projectsMore.remove();
+                    }
+                })
+                .catch(error => {
+                    // Leave the button for a manual retry
+                    console.error('Could not load more projects:', error);
+                })
+                .finally(() => {
+                    loadingProjects = false;
+                    moreButton.disabled = false;
+                });
+        }
+
+        // Start fetching a little before the end of the grid comes into view
+        const moreObserver = new IntersectionObserver((entries) => {
+            if (entries.some(entry => entry.isIntersecting)) loadMoreProjects();
+        }, { rootMargin: '400px 0px' });
+
+        moreObserver.observe(projectsMore);
+        moreButton.addEventListener('click', loadMoreProjects);
+    }
+
     // ==========================================
     // CONTACT FORM HANDLING
     // ==========================================
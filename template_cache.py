@@ -0,0 +1,77 @@
+"""Compiled templates shared by every worker.
+
+Jinja compiles a template to Python the first time it is rendered, which
+made the first requests of each fresh worker slow. Templates now go
+through a ``FileSystemBytecodeCache`` in ``TEMPLATE_CACHE_DIR`` that all
+workers (and restarts) share; entries carry a checksum of their source,
+so an edited template is simply recompiled.
+
+``python template_cache.py`` compiles every template into that cache
+(build.sh runs it). Under gunicorn the arbiter also loads them all before
+forking, so preloaded workers start with the compiled templates in
+memory, and each worker renders the public pages once before it takes
+traffic (see gunicorn.conf.py).
+"""
+import os
+import sys
+import time
+
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', os.path.join('cache', 'jinja'))
+TEMPLATE_EXTENSIONS = ('.html', '.xml', '.txt')
+
+
+def init_template_cache(app):
+    """Read and write compiled templates in TEMPLATE_CACHE_DIR"""
+    directory = os.path.abspath(TEMPLATE_CACHE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+def precompile(app):
+    """Load every template, compiling those missing from the bytecode cache
+
+    Returns (compiled names, names that failed to compile).
+    """
+    compiled, failed = [], []
+    for name in app.jinja_env.list_templates(extensions=[ext.lstrip('.') for ext in TEMPLATE_EXTENSIONS]):
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateSyntaxError as e:
+            app.logger.error(f"Template {name} does not compile: {e}")
+            failed.append(name)
+            continue
+        compiled.append(name)
+    return compiled, failed
+
+
+def warm_up(app, paths, base_url='http://localhost/'):
+    """Render paths once in this process; returns {path: status}"""
+    results = {}
+    for path in paths:
+        environ = {'portfolio.warmup': True}
+        with app.test_request_context(path, base_url=base_url, environ_base=environ):
+            try:
+                response = app.full_dispatch_request()
+                results[path] = response.status_code
+                response.close()
+            except Exception as e:
+                app.logger.error(f"Warm-up of {path} failed: {e}")
+                results[path] = None
+    return results
+
+
+def main():
+    import app as portfolio
+
+    started = time.monotonic()
+    compiled, failed = precompile(portfolio.app)
+    print(f"Compiled {len(compiled)} templates into {TEMPLATE_CACHE_DIR} "
+          f"in {time.monotonic() - started:.2f}s")
+    if failed:
+        sys.exit(f"Failed to compile: {', '.join(failed)}")
+
+
+if __name__ == '__main__':
+    main()
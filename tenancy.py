@@ -0,0 +1,342 @@
+"""Serving many portfolios from one app.
+
+With ``TENANT_ROUTING`` unset the app is single-tenant and every path is
+the one it always was (data.json, backups/, ... in the working
+directory). With ``TENANT_ROUTING=host`` the tenant is taken from the Host
+header (``alice.example.com`` is ``alice`` when ``TENANT_DOMAIN`` is
+``example.com``, otherwise the whole host name); with
+``TENANT_ROUTING=path`` from the first segment after
+``TENANT_PATH_PREFIX`` (``/t/alice/...``), which moves into SCRIPT_NAME so
+``url_for`` keeps generating prefixed links. A tenant exists once
+``<TENANTS_DIR>/<tenant>/`` does; ``python tenancy.py create`` makes one.
+
+``tenant_path()`` maps a storage path into the current tenant's
+directory, so data.json, backups, security logs, notification configs,
+the message journal and archive are namespaced per tenant; uploads go
+to a per-tenant folder under static/. Jobs remember the tenant that
+queued them.
+
+``CACHE`` holds per-tenant derived state (typed records, rendered
+pages) for the whole process, bounded by ``TENANT_CACHE_MB`` and dropping
+entries unused for ``TENANT_CACHE_IDLE`` seconds, so thousands of idle
+tenants cost nothing but their files.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import serialization
+
+TENANT_ROUTING = os.environ.get('TENANT_ROUTING', '').lower()
+TENANTS_DIR = os.environ.get('TENANTS_DIR', 'tenants')
+TENANT_DOMAIN = os.environ.get('TENANT_DOMAIN', '').lower().strip('.')
+TENANT_PATH_PREFIX = '/' + os.environ.get('TENANT_PATH_PREFIX', '/t').strip('/')
+TENANT_CACHE_MAX_BYTES = int(float(os.environ.get('TENANT_CACHE_MB', 64)) * 1024 * 1024)
+TENANT_CACHE_IDLE = float(os.environ.get('TENANT_CACHE_IDLE', 900))
+TENANT_CONFIG_FILE = 'tenant.json'
+
+TENANT_ID = re.compile(r'^[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$')
+
+CURRENT = contextvars.ContextVar('tenant', default=None)
+
+
+def multi_tenant():
+    return TENANT_ROUTING in ('host', 'path')
+
+
+def current_tenant():
+    """Id of the tenant being served, or None when single-tenant"""
+    return CURRENT.get()
+
+
+@contextmanager
+def use_tenant(tenant):
+    """Run a block (a job, a cron run) as one tenant"""
+    token = CURRENT.set(tenant)
+    try:
+        yield
+    finally:
+        CURRENT.reset(token)
+
+
+def tenant_root(tenant=None):
+    tenant = tenant or current_tenant()
+    return os.path.join(TENANTS_DIR, tenant) if tenant else '.'
+
+
+def tenant_path(path, tenant=None):
+    """A storage path inside the current tenant's namespace"""
+    tenant = tenant or current_tenant()
+    if not tenant:
+        return path
+    if os.path.isabs(path):
+        # Directories configured outside the tree get a per-tenant subdirectory
+        return os.path.join(path, 'tenants', tenant)
+    return os.path.join(TENANTS_DIR, tenant, path)
+
+
+def tenant_key(name, tenant=None):
+    """Invalidation key of something a tenant owns ('data', 'config')"""
+    tenant = tenant or current_tenant()
+    return f"{tenant}:{name}" if tenant else name
+
+
+def key_tenant(key):
+    """Tenant a tenant_key() belongs to"""
+    tenant, separator, _ = key.partition(':')
+    return tenant if separator else None
+
+
+def tenant_exists(tenant):
+    return bool(TENANT_ID.match(tenant or '')) and os.path.isdir(os.path.join(TENANTS_DIR, tenant))
+
+
+def list_tenants():
+    """Tenants background work runs for; [None] when single-tenant"""
+    return provisioned_tenants() if multi_tenant() else [None]
+
+
+def provisioned_tenants():
+    """Ids of all tenant directories"""
+    try:
+        names = os.listdir(TENANTS_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names if tenant_exists(name))
+
+
+def load_config(tenant=None):
+    """A tenant's tenant.json (admin credentials), or {}"""
+    try:
+        return serialization.load_file(os.path.join(tenant_root(tenant), TENANT_CONFIG_FILE))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_config(config, tenant=None):
+    serialization.dump_file(os.path.join(tenant_root(tenant), TENANT_CONFIG_FILE), config)
+
+
+def resolve(environ):
+    """(tenant, script_name, path_info) of a request; tenant is None if unknown"""
+    script_name = environ.get('SCRIPT_NAME', '')
+    path_info = environ.get('PATH_INFO', '')
+    if TENANT_ROUTING == 'host':
+        host = (environ.get('HTTP_HOST') or environ.get('SERVER_NAME') or '').lower()
+        host = host.rsplit(':', 1)[0] if not host.endswith(']') else host
+        if TENANT_DOMAIN:
+            if not host.endswith('.' + TENANT_DOMAIN):
+                return None, script_name, path_info
+            host = host[:-len(TENANT_DOMAIN) - 1]
+        return host.replace('.', '-'), script_name, path_info
+    prefix = '' if TENANT_PATH_PREFIX == '/' else TENANT_PATH_PREFIX
+    if not path_info.startswith(prefix + '/'):
+        return None, script_name, path_info
+    tenant, _, rest = path_info[len(prefix) + 1:].partition('/')
+    return tenant, f"{script_name}{prefix}/{tenant}", '/' + rest
+
+
+class TenantMiddleware:
+    """Pick the tenant of each request and serve it in that tenant's namespace"""
+
+    def __init__(self, app, shared_paths=('/healthz', '/readyz', '/metrics')):
+        self.app = app
+        # Process-level endpoints answered without a tenant
+        self.shared_paths = shared_paths
+
+    def __call__(self, environ, start_response):
+        if not multi_tenant():
+            return self.app(environ, start_response)
+        tenant, script_name, path_info = resolve(environ)
+        if not tenant_exists(tenant):
+            if environ.get('PATH_INFO') in self.shared_paths:
+                return self.app(environ, start_response)
+            start_response('404 NOT FOUND', [('Content-Type', 'text/plain; charset=utf-8')])
+            return [b'Unknown portfolio\n']
+        environ['SCRIPT_NAME'] = script_name
+        environ['PATH_INFO'] = path_info
+        environ['portfolio.tenant'] = tenant
+        with use_tenant(tenant):
+            body = self.app(environ, start_response)
+        if isinstance(body, (list, tuple)):
+            return body
+        # Streamed bodies run after this returns; they still belong to the tenant
+        return TenantBody(body, tenant)
+
+
+class TenantBody:
+    """Iterate and close a WSGI response body as the tenant that produced it"""
+
+    def __init__(self, body, tenant):
+        self.body = body
+        self.tenant = tenant
+        self.iterator = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with use_tenant(self.tenant):
+            if self.iterator is None:
+                self.iterator = iter(self.body)
+            return next(self.iterator)
+
+    def close(self):
+        close = getattr(self.body, 'close', None)
+        if close is not None:
+            with use_tenant(self.tenant):
+                close()
+
+
+class TenantCache:
+    """Byte-bounded LRU of per-tenant values that also drops idle entries"""
+
+    def __init__(self, max_bytes, idle_seconds):
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.current_bytes = 0
+        # (tenant, kind, name) -> [version, value, size, last used]
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.next_sweep = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind, name, version):
+        """Cached value for the current tenant if it is still at version"""
+        key = (current_tenant(), kind, name)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or version is None or entry[0] != version:
+                self.misses += 1
+                return None
+            entry[3] = now
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.sweep(now)
+            return entry[1]
+
+    def put(self, kind, name, version, value, size):
+        if version is None or size > self.max_bytes:
+            return
+        key = (current_tenant(), kind, name)
+        now = time.monotonic()
+        with self.lock:
+            self.discard(key)
+            self.entries[key] = [version, value, size, now]
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self.discard(next(iter(self.entries)))
+            self.sweep(now)
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+    def sweep(self, now):
+        """Drop entries idle past the limit; the oldest are at the front"""
+        if now < self.next_sweep:
+            return
+        self.next_sweep = now + min(self.idle_seconds, 60)
+        while self.entries:
+            key, entry = next(iter(self.entries.items()))
+            if now - entry[3] < self.idle_seconds:
+                break
+            self.discard(key)
+
+    def drop_tenant(self, tenant, keep=()):
+        """Drop a tenant's entries, except those of the kinds in keep"""
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == tenant and key[1] not in keep]:
+                self.discard(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.current_bytes,
+                    'tenants': len({key[0] for key in self.entries}),
+                    'hits': self.hits, 'misses': self.misses}
+
+
+CACHE = TenantCache(TENANT_CACHE_MAX_BYTES, TENANT_CACHE_IDLE)
+
+
+def init_tenancy(app):
+    """Route requests to tenants and keep path-routed tenants' sessions apart"""
+    from flask import request
+    from flask.sessions import SecureCookieSessionInterface
+
+    class TenantSessionInterface(SecureCookieSessionInterface):
+        def get_cookie_path(self, app):
+            # /t/alice/ and /t/bob/ each get their own login cookie
+            if request.environ.get('portfolio.tenant') and request.script_root:
+                return request.script_root + '/'
+            return super().get_cookie_path(app)
+
+    app.session_interface = TenantSessionInterface()
+    app.wsgi_app = TenantMiddleware(app.wsgi_app)
+
+
+def reset_after_fork():
+    # A worker starts with an empty cache rather than the arbiter's copy
+    global CACHE
+    CACHE = TenantCache(TENANT_CACHE_MAX_BYTES, TENANT_CACHE_IDLE)
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def create_tenant(tenant, username, password, document=None):
+    """Provision a tenant directory with its admin login and a data.json"""
+    from werkzeug.security import generate_password_hash
+
+    if not TENANT_ID.match(tenant):
+        raise ValueError('Tenant ids are lowercase letters, digits and dashes')
+    root = os.path.join(TENANTS_DIR, tenant)
+    if os.path.exists(root):
+        raise FileExistsError(f"Tenant {tenant} already exists")
+    for name in ('backups', 'security'):
+        os.makedirs(os.path.join(root, name))
+    save_config({'admin_username': username,
+                 'admin_password_hash': generate_password_hash(password)}, tenant)
+    if document is not None:
+        serialization.dump_file(os.path.join(root, 'data.json'), document)
+    return root
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage portfolio tenants')
+    commands = parser.add_subparsers(dest='command', required=True)
+    create = commands.add_parser('create', help='provision a tenant')
+    create.add_argument('tenant')
+    create.add_argument('--username', default='admin')
+    create.add_argument('--password', required=True)
+    create.add_argument('--data', help='data.json to start from (default: empty portfolio)')
+    commands.add_parser('list', help='list provisioned tenants')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for tenant in provisioned_tenants():
+            print(tenant)
+        return
+    document = serialization.load_file(args.data) if args.data else None
+    try:
+        print(create_tenant(args.tenant, args.username, args.password, document))
+    except (ValueError, FileExistsError) as e:
+        sys.exit(str(e))
+
+
+if __name__ == '__main__':
+    main()
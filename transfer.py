@@ -0,0 +1,276 @@
+"""Whole-site archives for moving a portfolio between nodes.
+
+An archive is a gzip-compressed tar:
+
+    manifest.json          format, version, and name/size/sha256 of every file
+    uploads/<path>         uploaded files the data refers to
+    backups/backups.json   backup metadata (and backups/<file> if asked for)
+    config/<name>.json     Telegram/SMTP settings (only if asked for)
+    data.json              last, so everything it refers to is already there
+
+``stream_archive()`` produces it as a generator of compressed chunks: each
+file is read ``CHUNK_SIZE`` bytes at a time, so memory use does not grow
+with the site. ``unpack_archive()`` reads one from any file object the
+same way. It checks every member against the manifest (name, size and
+hash), writes uploads and backups in place and skips the ones the target
+already has with the same hash; data.json, metadata and config are
+staged for the caller to apply once the whole archive has checked out.
+It yields progress events as it goes.
+
+    python transfer.py export site.tar.gz [--backups] [--config]
+    python transfer.py import site.tar.gz
+"""
+import os
+import uuid
+import sys
+import time
+import zlib
+import tarfile
+import hashlib
+import argparse
+from datetime import datetime
+
+import serialization
+
+ARCHIVE_FORMAT = 'portfolio-archive'
+ARCHIVE_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+CHUNK_SIZE = 64 * 1024
+TRANSFER_MAX_BYTES = int(float(os.environ.get('TRANSFER_MAX_MB', 2048)) * 1024 * 1024)
+# Names an archive may contain, by top-level part
+ARCHIVE_SECTIONS = ('data.json', 'uploads', 'backups', 'config')
+# Written straight to their destination; everything else is staged
+BLOB_SECTIONS = ('uploads', 'backups')
+BACKUP_METADATA_NAME = 'backups/backups.json'
+PROGRESS_INTERVAL = 1024 * 1024
+
+
+class ArchiveError(Exception):
+    """The archive is malformed, incomplete or does not match its manifest"""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def valid_name(name):
+    """Relative, normalised and inside one of the archive sections"""
+    if not name or name.startswith('/') or '\\' in name or name != os.path.normpath(name):
+        return False
+    parts = name.split('/')
+    if '..' in parts:
+        return False
+    return name == 'data.json' or (parts[0] in ARCHIVE_SECTIONS and len(parts) > 1)
+
+
+def build_manifest(sources, **extra):
+    """Manifest of [(archive name, path or bytes)]; extra keys are stored as given"""
+    files = []
+    for name, source in sources:
+        if isinstance(source, bytes):
+            size, digest = len(source), hashlib.sha256(source).hexdigest()
+        else:
+            size, digest = os.path.getsize(source), file_sha256(source)
+        files.append({'name': name, 'size': size, 'sha256': digest})
+    return {
+        'format': ARCHIVE_FORMAT,
+        'version': ARCHIVE_VERSION,
+        'created_at': datetime.now().isoformat(),
+        **extra,
+        'files': files
+    }
+
+
+def tar_header(name, size, mtime):
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(mtime)
+    info.mode = 0o644
+    return info.tobuf(tarfile.PAX_FORMAT)
+
+
+def stream_archive(sources, manifest):
+    """Compressed tar chunks of the manifest followed by the sources, in order"""
+    # wbits 31: a gzip stream that `tar xz` and tarfile both read
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    now = time.time()
+
+    def member(name, chunks, size):
+        yield compressor.compress(tar_header(name, size, now))
+        for chunk in chunks:
+            yield compressor.compress(chunk)
+        if size % tarfile.BLOCKSIZE:
+            yield compressor.compress(b'\0' * (tarfile.BLOCKSIZE - size % tarfile.BLOCKSIZE))
+
+    def file_chunks(path, size):
+        # Stop at the size the manifest promised even if the file grew since
+        remaining = size
+        with open(path, 'rb') as f:
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise ArchiveError(f"{path} shrank while it was being archived")
+                remaining -= len(chunk)
+                yield chunk
+
+    manifest_bytes = serialization.dumps(manifest)
+    parts = [member(MANIFEST_NAME, [manifest_bytes], len(manifest_bytes))]
+    for (name, source), entry in zip(sources, manifest['files']):
+        if isinstance(source, bytes):
+            parts.append(member(name, [source], entry['size']))
+        else:
+            parts.append(member(name, file_chunks(source, entry['size']), entry['size']))
+    for part in parts:
+        for chunk in part:
+            if chunk:
+                yield chunk
+    yield compressor.compress(b'\0' * tarfile.BLOCKSIZE * 2) + compressor.flush()
+
+
+def read_manifest(tar):
+    member = tar.next()
+    if member is None or member.name != MANIFEST_NAME or not member.isreg() or member.size > 16 * 1024 * 1024:
+        raise ArchiveError('Not a portfolio archive: manifest.json must come first')
+    try:
+        manifest = serialization.loads(tar.extractfile(member).read())
+    except ValueError:
+        raise ArchiveError('manifest.json is not valid JSON')
+    if not isinstance(manifest, dict) or manifest.get('format') != ARCHIVE_FORMAT:
+        raise ArchiveError('Not a portfolio archive')
+    if manifest.get('version') != ARCHIVE_VERSION:
+        raise ArchiveError(f"Unsupported archive version {manifest.get('version')}")
+    files = manifest.get('files')
+    if not isinstance(files, list) or not all(
+            isinstance(entry, dict) and valid_name(entry.get('name')) and isinstance(entry.get('size'), int)
+            and isinstance(entry.get('sha256'), str) for entry in files):
+        raise ArchiveError('manifest.json lists invalid files')
+    return manifest
+
+
+def copy_member(source, path, entry):
+    """Write a member to path through a temporary file, checking its hash"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                f.write(chunk)
+        if digest.hexdigest() != entry['sha256']:
+            raise ArchiveError(f"{entry['name']} does not match its hash in the manifest")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def unpack_archive(fileobj, destination, staging_dir):
+    """Unpack an archive stream, yielding progress events
+
+    destination(name) is where a blob (uploads/..., backups/...) goes, or
+    None to refuse it; data.json, backups.json and config go to
+    staging_dir/<name>. Events are
+    {'file', 'done', 'total', 'skipped'}; the last one also has
+    'complete': True with the counts. Raises ArchiveError.
+    """
+    try:
+        tar = tarfile.open(fileobj=fileobj, mode='r|gz')
+    except (tarfile.TarError, OSError) as e:
+        raise ArchiveError(f"Not a gzip tar archive: {e}")
+    written = skipped = done = 0
+    try:
+        manifest = read_manifest(tar)
+        expected = {entry['name']: entry for entry in manifest['files']}
+        total = sum(entry['size'] for entry in expected.values())
+        if total > TRANSFER_MAX_BYTES:
+            raise ArchiveError(f"Archive holds {total} bytes, more than TRANSFER_MAX_MB allows")
+        seen = set()
+        last_report = 0
+        # Not `for member in tar`: that would start over with the manifest
+        for member in iter(tar.next, None):
+            entry = expected.get(member.name)
+            if entry is None or member.name in seen or not member.isreg() or member.size != entry['size']:
+                raise ArchiveError(f"Unexpected archive member {member.name}")
+            seen.add(member.name)
+            section = member.name.split('/')[0]
+            if section in BLOB_SECTIONS and member.name != BACKUP_METADATA_NAME:
+                path = destination(member.name)
+                if path is None:
+                    raise ArchiveError(f"Unexpected archive member {member.name}")
+            else:
+                path = os.path.join(staging_dir, member.name)
+            is_skipped = os.path.isfile(path) and file_sha256(path) == entry['sha256']
+            if is_skipped:
+                # The rest of the member is read past by the next iteration
+                skipped += 1
+            else:
+                copy_member(tar.extractfile(member), path, entry)
+                written += 1
+            done += member.size
+            if done - last_report >= PROGRESS_INTERVAL or done == total:
+                last_report = done
+                yield {'file': member.name, 'done': done, 'total': total, 'skipped': is_skipped}
+        missing = set(expected) - seen
+        if missing:
+            raise ArchiveError(f"Archive is incomplete; missing {', '.join(sorted(missing)[:5])}")
+    except (tarfile.TarError, EOFError, zlib.error) as e:
+        raise ArchiveError(f"Archive is damaged: {e}")
+    finally:
+        tar.close()
+    yield {'complete': True, 'done': done, 'total': total, 'files': len(seen),
+           'written': written, 'skipped': skipped, 'manifest': manifest}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export or import a whole-site archive')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_command = commands.add_parser('export', help='write an archive (- for stdout)')
+    export_command.add_argument('path')
+    export_command.add_argument('--backups', action='store_true', help='include backup files')
+    export_command.add_argument('--config', action='store_true', help='include Telegram/SMTP settings')
+    export_command.add_argument('--tenant', help='tenant to export (multi-tenant setups)')
+    import_command = commands.add_parser('import', help='unpack an archive (- for stdin)')
+    import_command.add_argument('path')
+    import_command.add_argument('--tenant', help='tenant to import into (multi-tenant setups)')
+    args = parser.parse_args()
+
+    import app as portfolio
+    import tenancy
+
+    with tenancy.use_tenant(args.tenant):
+        if args.command == 'export':
+            sources, manifest = portfolio.site_archive(args.backups, args.config)
+            out = sys.stdout.buffer if args.path == '-' else open(args.path, 'wb')
+            try:
+                for chunk in stream_archive(sources, manifest):
+                    out.write(chunk)
+            finally:
+                if out is not sys.stdout.buffer:
+                    out.close()
+            print(f"Exported {len(manifest['files'])} files", file=sys.stderr)
+            return
+
+        source = sys.stdin.buffer if args.path == '-' else open(args.path, 'rb')
+        try:
+            with portfolio.app.app_context():
+                for event in portfolio.import_site_archive(source):
+                    if event.get('complete'):
+                        print(f"\nImported {event['files']} files: {event['written']} written, "
+                              f"{event['skipped']} already present", file=sys.stderr)
+                    else:
+                        percent = 100 * event['done'] // max(event['total'], 1)
+                        print(f"\r{percent:3d}% {event['file'][:60]:<60}", end='', file=sys.stderr)
+        except ArchiveError as e:
+            sys.exit(f"\nImport failed: {e}")
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+
+
+if __name__ == '__main__':
+    main()
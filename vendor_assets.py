@@ -0,0 +1,404 @@
+"""Self-hosted, subsetted copies of the Bootstrap, Font Awesome and Poppins assets.
+
+Templates reference third-party stylesheets and scripts through
+``{{ vendor_url('https://cdn...') }}``. Until vendored copies exist the
+helper returns the CDN URL unchanged; after a build it points at
+``static/vendor/...`` instead.
+
+    python vendor_assets.py seed      # download CDN files into vendor_cache/ (needs network)
+    python vendor_assets.py build     # offline: subset the cache into static/vendor/
+    python vendor_assets.py rewrite   # wrap CDN URLs in templates with vendor_url()
+
+``build`` tree-shakes Bootstrap CSS against the classes used in templates,
+scripts and ``app.py``, keeps only the Font Awesome icons referenced there,
+and keeps only the latin Poppins faces for weights the stylesheets use.
+Class names a template assembles at render time are invisible to that
+scan: write them out in full, or list them in ``KEEP_CLASSES``.
+When fontTools is installed the icon fonts are also cut down to the used
+glyphs; otherwise they are copied whole.
+"""
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+from urllib.parse import urljoin
+
+from css_bundles import split_rules, split_selectors, minify_css
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:
+    font_subset = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+CACHE_DIR = os.path.join(BASE_DIR, 'vendor_cache')
+CACHE_INDEX = os.path.join(CACHE_DIR, 'index.json')
+VENDOR_DIR = 'vendor'
+VENDOR_MANIFEST = os.path.join(STATIC_DIR, VENDOR_DIR, 'vendor-manifest.json')
+
+CDN_URL_PATTERN = re.compile(
+    r'https://(?:cdn\.jsdelivr\.net|cdnjs\.cloudflare\.com|fonts\.googleapis\.com)/[^"\'\s)]+')
+BOOTSTRAP_PATTERN = re.compile(r'/bootstrap@([\d.]+)/dist/(css|js)/([\w.]+)$')
+FONT_AWESOME_PATTERN = re.compile(r'/font-awesome/([\d.]+)/css/([\w.]+)$')
+
+# Google Fonts serves woff2 with unicode-range subsets only to modern browsers
+FONTS_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                    '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+FONT_SUBSETS = {'latin', 'latin-ext'}
+
+# Classes Bootstrap's JavaScript adds at runtime; they never appear in markup
+BOOTSTRAP_RUNTIME_CLASSES = {
+    'show', 'showing', 'hiding', 'fade', 'collapse', 'collapsing', 'collapse-horizontal',
+    'active', 'disabled', 'modal-open', 'modal-backdrop', 'modal-static', 'offcanvas-backdrop',
+    'dropdown-menu-end', 'dropdown-menu-start', 'tooltip', 'tooltip-inner', 'tooltip-arrow',
+    'popover', 'popover-arrow', 'popover-header', 'popover-body', 'bs-tooltip-auto',
+    'bs-tooltip-top', 'bs-tooltip-bottom', 'bs-tooltip-start', 'bs-tooltip-end',
+    'bs-popover-auto', 'carousel-item-next', 'carousel-item-prev', 'carousel-item-start',
+    'carousel-item-end', 'is-valid', 'is-invalid', 'was-validated', 'toast', 'hide'
+}
+
+# Classes templates build from parts (alert-{{ ... }}), which the token scan
+# can't see; VENDOR_KEEP_CLASSES adds more, comma-separated
+KEEP_CLASSES = {
+    'alert-success', 'alert-danger', 'alert-warning', 'alert-info',
+    'fa-check-circle', 'fa-exclamation-circle'
+} | {name.strip() for name in os.environ.get('VENDOR_KEEP_CLASSES', '').split(',') if name.strip()}
+
+FONT_WEIGHT_NAMES = {'normal': '400', 'bold': '700'}
+
+# {path: (mtime_ns, manifest)}
+VENDOR_MANIFEST_CACHE = {}
+
+
+def usage_sources():
+    """Files whose contents decide which classes, icons and weights are used"""
+    paths = []
+    for root, dirs, files in os.walk(TEMPLATES_DIR):
+        paths.extend(os.path.join(root, name) for name in files if name.endswith('.html'))
+    js_dir = os.path.join(STATIC_DIR, 'js')
+    paths.extend(os.path.join(js_dir, name) for name in os.listdir(js_dir) if name.endswith('.js'))
+    paths.append(os.path.join(BASE_DIR, 'app.py'))
+    return paths
+
+
+def read_text(path):
+    """Read a UTF-8 text file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def write_file(path, content):
+    """Write text or bytes, creating parent directories"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mode = 'wb' if isinstance(content, bytes) else 'w'
+    with open(path, mode, **({} if mode == 'wb' else {'encoding': 'utf-8'})) as f:
+        f.write(content)
+
+
+def template_cdn_urls():
+    """All CDN URLs referenced by templates"""
+    urls = set()
+    for root, dirs, files in os.walk(TEMPLATES_DIR):
+        for name in files:
+            if name.endswith('.html'):
+                urls.update(CDN_URL_PATTERN.findall(read_text(os.path.join(root, name))))
+    return sorted(urls)
+
+
+def load_cache_index():
+    """Map of seeded URL -> cached file name"""
+    try:
+        with open(CACHE_INDEX, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def cached_path(url, index=None):
+    """Local path of a seeded URL, or None when it hasn't been seeded"""
+    index = load_cache_index() if index is None else index
+    name = index.get(url)
+    return os.path.join(CACHE_DIR, name) if name else None
+
+
+def seed(urls=None):
+    """Download CDN assets and the fonts they reference into vendor_cache/"""
+    import requests
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    index = load_cache_index()
+    pending = list(urls or template_cdn_urls())
+    fetched = 0
+
+    while pending:
+        url = pending.pop(0)
+        if url in index and os.path.exists(os.path.join(CACHE_DIR, index[url])):
+            continue
+        headers = {'User-Agent': FONTS_USER_AGENT}
+        response = requests.get(url, headers=headers, timeout=30)
+        response.raise_for_status()
+
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '-' + \
+            os.path.basename(url.split('?')[0])
+        write_file(os.path.join(CACHE_DIR, name), response.content)
+        index[url] = name
+        fetched += 1
+
+        # Stylesheets pull in fonts; fetch those too (woff2 only)
+        if 'css' in response.headers.get('Content-Type', '') or url.endswith('.css') or 'css2?' in url:
+            for ref in re.findall(r'url\(([^)]+)\)', response.text):
+                ref = ref.strip('\'"')
+                if ref.endswith('.woff2'):
+                    pending.append(urljoin(url, ref))
+
+    write_file(CACHE_INDEX, json.dumps(index, indent=2, sort_keys=True))
+    return fetched
+
+
+def used_tokens():
+    """Every class-like word appearing in templates, scripts and app.py, plus KEEP_CLASSES"""
+    tokens = set(KEEP_CLASSES)
+    for path in usage_sources():
+        tokens.update(re.findall(r'[A-Za-z][\w-]*', read_text(path)))
+    return tokens
+
+
+def selector_classes_used(selector, classes):
+    """True if every class in a selector is in use"""
+    # Classes inside :not() only exclude elements, so they don't need to exist
+    selector = re.sub(r':not\([^)]*\)', '', selector)
+    return all(c in classes for c in re.findall(r'\.(-?[_a-zA-Z][\w-]*)', selector))
+
+
+def tree_shake_css(css, classes):
+    """Drop rules whose selectors need classes nobody uses"""
+    kept = []
+    for prelude, body in split_rules(css):
+        if prelude.startswith(('@media', '@supports', '@layer')):
+            inner = tree_shake_css(body, classes)
+            if inner:
+                kept.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith('@'):
+            kept.append(f"{prelude}{{{body}}}")
+        else:
+            selectors = [s for s in split_selectors(prelude) if selector_classes_used(s, classes)]
+            if selectors:
+                kept.append(f"{','.join(selectors)}{{{body}}}")
+    return ''.join(kept)
+
+
+def build_bootstrap(url, source, classes):
+    """Tree-shaken Bootstrap CSS, or the bundle JS copied as-is"""
+    version, kind, filename = BOOTSTRAP_PATTERN.search(url).groups()
+    target = f"{VENDOR_DIR}/bootstrap-{version}/{filename}"
+    if kind == 'css':
+        content = tree_shake_css(minify_css(read_text(source)), classes)
+        write_file(os.path.join(STATIC_DIR, target), content)
+    else:
+        os.makedirs(os.path.dirname(os.path.join(STATIC_DIR, target)), exist_ok=True)
+        shutil.copyfile(source, os.path.join(STATIC_DIR, target))
+    return target
+
+
+def icon_rule_names(prelude, body):
+    """Icon names defined by a Font Awesome rule, or [] for structural rules"""
+    if 'content:' not in body and '--fa:' not in body:
+        return []
+    names = []
+    for selector in split_selectors(prelude):
+        match = re.fullmatch(r'\.(fa-[\w-]+)(?:::?before)?', selector.strip())
+        if not match:
+            return []
+        names.append(match.group(1))
+    return names
+
+
+def subset_font(source, target, codepoints):
+    """Write a woff2 font reduced to codepoints, or copy it when fontTools is missing"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if font_subset is None or not codepoints:
+        shutil.copyfile(source, target)
+        return False
+    options = font_subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    font = font_subset.load_font(source, options)
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    font_subset.save_font(font, target, options)
+    return True
+
+
+def build_font_awesome(url, source, tokens, index):
+    """Font Awesome CSS reduced to the used icons, plus its (subsetted) webfonts"""
+    version, filename = FONT_AWESOME_PATTERN.search(url).groups()
+    base = f"{VENDOR_DIR}/font-awesome-{version}"
+    css = minify_css(read_text(source))
+
+    kept = []
+    codepoints = set()
+    for prelude, body in split_rules(css):
+        names = icon_rule_names(prelude, body)
+        if names:
+            used = [n for n in names if n in tokens]
+            if not used:
+                continue
+            prelude = ','.join(f".{n}:before" for n in used)
+            for value in re.findall(r'"\\([0-9a-fA-F]+)"', body):
+                codepoints.add(int(value, 16))
+        kept.append(f"{prelude}{{{body}}}")
+    css = ''.join(kept)
+
+    # Keep the woff2 source only and vendor each referenced font
+    def replace_src(match):
+        woff2 = re.search(r'url\(([^)]+\.woff2)\)', match.group(0))
+        if not woff2:
+            return match.group(0)
+        ref = woff2.group(1).strip('\'"')
+        font_source = cached_path(urljoin(url, ref), index)
+        if font_source:
+            subset_font(font_source, os.path.join(STATIC_DIR, base, 'webfonts', os.path.basename(ref)), codepoints)
+        return f'src:url(../webfonts/{os.path.basename(ref)}) format("woff2")'
+
+    css = re.sub(r'src:[^;}]+', replace_src, css)
+    target = f"{base}/css/{filename}"
+    write_file(os.path.join(STATIC_DIR, target), css)
+    return target
+
+
+def used_font_weights():
+    """Numeric font weights referenced by local and vendored stylesheets"""
+    weights = {'400'}
+    sources = usage_sources()
+    for root, dirs, files in os.walk(STATIC_DIR):
+        sources.extend(os.path.join(root, name) for name in files if name.endswith('.css'))
+    for path in sources:
+        for value in re.findall(r'font-weight\s*:\s*([a-z0-9]+)', read_text(path)):
+            weights.add(FONT_WEIGHT_NAMES.get(value, value))
+    return weights
+
+
+def build_google_fonts(url, source, weights, index):
+    """Poppins faces for used weights and latin subsets, served locally"""
+    css = read_text(source)
+    blocks = re.findall(r'/\*\s*([\w-]+)\s*\*/\s*(@font-face\s*\{[^}]*\})', css)
+    kept = []
+    for subset, block in blocks:
+        weight = re.search(r'font-weight:\s*(\d+)', block)
+        if subset not in FONT_SUBSETS or (weight and weight.group(1) not in weights):
+            continue
+        font_url = re.search(r'url\(([^)]+)\)', block).group(1).strip('\'"')
+        font_source = cached_path(font_url, index)
+        if not font_source:
+            continue
+        font_name = hashlib.sha1(font_url.encode('utf-8')).hexdigest()[:12] + '.woff2'
+        target_font = os.path.join(STATIC_DIR, VENDOR_DIR, 'fonts', font_name)
+        os.makedirs(os.path.dirname(target_font), exist_ok=True)
+        shutil.copyfile(font_source, target_font)
+        kept.append(block.replace(font_url, f"../fonts/{font_name}"))
+
+    target = f"{VENDOR_DIR}/css/fonts-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:10]}.css"
+    write_file(os.path.join(STATIC_DIR, target), minify_css('\n'.join(kept)))
+    return target
+
+
+def build():
+    """Produce subsetted vendor assets from the seeded cache; no network access"""
+    index = load_cache_index()
+    tokens = used_tokens()
+    classes = tokens | BOOTSTRAP_RUNTIME_CLASSES
+    manifest = {}
+    missing = []
+
+    urls = template_cdn_urls()
+    # Bootstrap first so its kept font-weight rules count towards Poppins weights
+    ordered = sorted(urls, key=lambda u: 'fonts.googleapis.com' in u)
+    weights = None
+    for url in ordered:
+        source = cached_path(url, index)
+        if not source or not os.path.exists(source):
+            missing.append(url)
+            continue
+        if BOOTSTRAP_PATTERN.search(url):
+            manifest[url] = build_bootstrap(url, source, classes)
+        elif FONT_AWESOME_PATTERN.search(url):
+            manifest[url] = build_font_awesome(url, source, tokens, index)
+        elif 'fonts.googleapis.com' in url:
+            if weights is None:
+                weights = used_font_weights()
+            manifest[url] = build_google_fonts(url, source, weights, index)
+
+    write_file(VENDOR_MANIFEST, json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest, missing
+
+
+def rewrite_templates():
+    """Wrap literal CDN URLs in templates with vendor_url(); safe to re-run"""
+    pattern = re.compile(r'(?<=")(' + CDN_URL_PATTERN.pattern + r')(?=")')
+    changed = []
+    for root, dirs, files in os.walk(TEMPLATES_DIR):
+        for name in files:
+            if not name.endswith('.html'):
+                continue
+            path = os.path.join(root, name)
+            source = read_text(path)
+            updated = pattern.sub(lambda m: "{{ vendor_url('%s') }}" % m.group(1), source)
+            if updated != source:
+                write_file(path, updated)
+                changed.append(os.path.relpath(path, BASE_DIR))
+    return changed
+
+
+def load_vendor_manifest():
+    """CDN URL -> vendored static filename, cached until the manifest changes"""
+    try:
+        mtime = os.stat(VENDOR_MANIFEST).st_mtime_ns
+    except OSError:
+        return {}
+    cached = VENDOR_MANIFEST_CACHE.get(VENDOR_MANIFEST)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        manifest = json.loads(read_text(VENDOR_MANIFEST))
+    except json.JSONDecodeError:
+        manifest = {}
+    VENDOR_MANIFEST_CACHE[VENDOR_MANIFEST] = (mtime, manifest)
+    return manifest
+
+
+def init_vendor_assets(app):
+    """Expose vendor_url() to templates"""
+    from flask import url_for
+
+    def vendor_url(url):
+        """Local URL for a vendored CDN asset, or the CDN URL itself"""
+        if not app.config.get('VENDOR_ASSETS', True):
+            return url
+        filename = load_vendor_manifest().get(url)
+        if filename and os.path.isfile(os.path.join(app.static_folder, filename)):
+            return url_for('static', filename=filename)
+        return url
+
+    app.jinja_env.globals['vendor_url'] = vendor_url
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'build'
+    if command == 'seed':
+        print(f"Seeded {seed()} files into {os.path.relpath(CACHE_DIR, BASE_DIR)}/")
+    elif command == 'build':
+        manifest, missing = build()
+        print(f"Vendored {len(manifest)} assets into static/{VENDOR_DIR}/")
+        for url in missing:
+            print(f"  not seeded, still served from CDN: {url}")
+    elif command == 'rewrite':
+        for path in rewrite_templates():
+            print(f"Rewrote {path}")
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,90 @@
+"""Visitor counters, kept out of data.json.
+
+Every home page view counts a visit. Stored in data.json, that made each
+view a full save: an automatic backup, a new data version published to
+every worker, and the record, page and sitemap caches keyed on it thrown
+away. The counters now live in ``visitors.json`` in the tenant's
+directory, written under a lock shared by threads and worker processes;
+data.json only changes when its content does.
+
+A ``visitors`` section left in an older data.json seeds the file the
+first time it is read; after that data.json's copy is ignored. Site
+archives carry the counters inside their data.json. Demo sandboxes keep
+counting in their own document (``add_hit``).
+"""
+import os
+import fcntl
+from datetime import datetime
+from contextlib import contextmanager
+
+import models
+import serialization
+import tenancy
+
+VISITORS_FILE = 'visitors.json'
+LOCK_FILE = '.visitors.lock'
+
+
+def empty():
+    return {'total': 0, 'today': [], 'unique_ips': []}
+
+
+@contextmanager
+def visitors_lock():
+    """Exclusive lock shared by threads and worker processes"""
+    path = tenancy.tenant_path(LOCK_FILE)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def add_hit(counters, ip, now=None):
+    """Count a visit from ip in a counters dict; returns the new total"""
+    now = (now or datetime.now()).replace(microsecond=0)
+    today = now.strftime('%Y-%m-%d')
+    counters['total'] = counters.get('total', 0) + 1
+    counters['today'] = [v for v in counters.get('today', []) if v.get('date') == today]
+    counters['today'].append(models.VisitorHit(ip=ip, timestamp=now, date=today).to_dict())
+    unique_ips = counters.get('unique_ips')
+    unique_ips = set(unique_ips) if isinstance(unique_ips, list) else set()
+    unique_ips.add(ip)
+    counters['unique_ips'] = list(unique_ips)
+    return counters['total']
+
+
+def load(initial=None):
+    """Counters of the current tenant; initial() gives data.json's old section, if any"""
+    try:
+        return serialization.load_file(tenancy.tenant_path(VISITORS_FILE))
+    except FileNotFoundError:
+        legacy = initial() if initial else None
+        return dict(empty(), **legacy) if isinstance(legacy, dict) else empty()
+
+
+def stored():
+    """Whether the current tenant has a visitors.json yet"""
+    return os.path.exists(tenancy.tenant_path(VISITORS_FILE))
+
+
+def write(counters):
+    # Readers don't take the lock; dump_file replaces the file atomically
+    serialization.dump_file(tenancy.tenant_path(VISITORS_FILE), counters)
+
+
+def record_hit(ip, initial=None, now=None):
+    """Count a visit for the current tenant; returns the new total"""
+    with visitors_lock():
+        counters = load(initial)
+        total = add_hit(counters, ip, now)
+        write(counters)
+    return total
+
+
+def replace(counters):
+    """Overwrite the current tenant's counters, e.g. with an imported site's"""
+    with visitors_lock():
+        write(dict(empty(), **counters))